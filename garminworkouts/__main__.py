@@ -1,44 +1,57 @@
 #!/usr/bin/env python3
 
 import argparse
+import contextlib
 import glob
+import itertools
 import logging
+import multiprocessing
 import os
+import re
+import sys
 
+import yaml
+
+from garminworkouts import cleanup, compiler, daemon, jobqueue, mirror, validator
 from garminworkouts.config import configreader
+from garminworkouts.fit.decoder import iter_decode_files
+from garminworkouts.fit.encoder import encode_workout
+from garminworkouts.garmin.cache import ResponseCache
 from garminworkouts.garmin.garminclient import GarminClient
+from garminworkouts.garmin.metrics import Metrics
+from garminworkouts.garmin.session import account_cookie_jar
+from garminworkouts.journal import ImportJournal
+from garminworkouts.manifest import BuildManifest
 from garminworkouts.models.workout import Workout, RunningWorkout
+from garminworkouts.models.workoutindex import AmbiguousWorkoutError, WorkoutIndex
+from garminworkouts.models.workoutrecord import WorkoutRecord
+from garminworkouts.plan.calendar import TrainingCalendar
+from garminworkouts.plan.generator import PlanGenerator
+from garminworkouts.utils import jsoncodec
+from garminworkouts.utils.memprofile import MemoryProfiler
+from garminworkouts.utils.ratelimit import RateLimiter
+from garminworkouts.watcher import create_watcher, wait_for_changes
 from garminworkouts.utils.validators import writeable_dir
 from getpass import getpass
 import datetime
 
 # import account
 
+_RUN_DAY_OFFSETS = {
+    'recovery run a': 0,
+    'recovery run b': 1,
+    'speed run': 2,
+    'recovery run c': 3,
+    'long run': 4,
+}
+
 
 def command_import_run(args):
     workout_files = glob.glob(r'running_workouts/*.yaml')
-
-    workout_configs = [configreader.read_config(workout_file) for workout_file in workout_files]
     target_pace = configreader.read_config(os.path.join(r'running_workouts/pace', args.pace))
-    workouts = [RunningWorkout(workout_config, target_pace) for workout_config in workout_configs]
-
-    with _garmin_client(args) as connection:
-        existing_workouts_by_name = {Workout.extract_workout_name(w): w for w in connection.list_workouts()}
 
-        for workout in workouts:
-            workout_name = workout.get_workout_name()
-            existing_workout = existing_workouts_by_name.get(workout_name)
-
-            if existing_workout:
-                workout_id = Workout.extract_workout_id(existing_workout)
-                workout_owner_id = Workout.extract_workout_owner_id(existing_workout)
-                payload = workout.create_workout(workout_id, workout_owner_id)
-                logging.info("Updating workout '%s'", workout_name)
-                connection.update_workout(workout_id, payload)
-            else:
-                payload = workout.create_workout()
-                logging.info("Creating workout '%s'", workout_name)
-                connection.save_workout(payload)
+    _import_incremental(args, workout_files, {"pace": target_pace},
+                        lambda workout_config: RunningWorkout(workout_config, target_pace))
 
 
 def import_run_workout(connection, workout_files_dir, pace_file, start_date=None):
@@ -48,23 +61,8 @@ def import_run_workout(connection, workout_files_dir, pace_file, start_date=None
     target_pace = configreader.read_config(pace_file)
     workouts = [RunningWorkout(workout_config, target_pace) for workout_config in workout_configs]
 
-    existing_workouts_by_name = {Workout.extract_workout_name(w): w for w in connection.list_workouts()}
+    _import_workouts(connection, workouts)
 
-    for workout in workouts:
-        workout_name = workout.get_workout_name()
-        existing_workout = existing_workouts_by_name.get(workout_name)
-
-        if existing_workout:
-            workout_id = Workout.extract_workout_id(existing_workout)
-            workout_owner_id = Workout.extract_workout_owner_id(existing_workout)
-            payload = workout.create_workout(workout_id, workout_owner_id)
-            logging.info("Updating workout '%s'", workout_name)
-            connection.update_workout(workout_id, payload)
-        else:
-            payload = workout.create_workout()
-            logging.info("Creating workout '%s'", workout_name)
-            connection.save_workout(payload)
-    
     if start_date is not None:
         schedule_run_workout(connection, workout_files_dir, pace_file, start_date)
 
@@ -76,63 +74,325 @@ def schedule_run_workout(connection, workout_files_dir, pace_file, start_date):
     target_pace = configreader.read_config(pace_file)
     workouts = [RunningWorkout(workout_config, target_pace) for workout_config in workout_configs]
 
-    existing_workouts_by_name = {Workout.extract_workout_name(w): w for w in connection.list_workouts()}
+    index = WorkoutIndex(connection.list_workout_records())
 
-    for workout in workouts:
-        workout_name = workout.get_workout_name()
-        existing_workout = existing_workouts_by_name.get(workout_name)
+    # workout names like "01wtg speed run", start date is the first day of that week
+    calendar = TrainingCalendar(start_date, _RUN_DAY_OFFSETS, name_pattern=r"^\S+ (?P<workout>.+)$")
+    workout_names = [workout.get_workout_name() for workout in workouts]
 
-        day_delta = {
-            'recovery run a':0,
-            'recovery run b':1,
-            'speed run':2,
-            'recovery run c':3,
-            'long run':4,
-        }
+    for workout, workout_name, date in zip(workouts, workout_names, calendar.dates(workout_names)):
+        if date is None:
+            logging.warning("Workout '%s' has no day in the training week, not scheduled", workout_name)
+            continue
+        try:
+            existing_workout = index.match(workout_name, workout.get_external_id())
+        except AmbiguousWorkoutError as e:
+            logging.error("Workout '%s' not scheduled, %s", workout_name, e)
+            continue
+        connection.schedule_workout(existing_workout.workout_id, date)
 
-        def get_date():
-            run_workout_time = ' '.join(workout_name.split()[1:])
-            date = start_date + datetime.timedelta(days=day_delta[run_workout_time])
-            return date.strftime("%Y-%m-%d")
 
-        existing_workout = existing_workouts_by_name.get(workout_name)
-        workout_id = Workout.extract_workout_id(existing_workout)
-        connection.schedule_workout(workout_id, get_date())
+def command_import(args):
+    parameters = {"ftp": args.ftp, "target_power_diff": args.target_power_diff}
 
+    def build_workout(workout_config):
+        return Workout(workout_config, args.ftp, args.target_power_diff)
 
-def command_import(args):
-    workout_files = glob.glob(args.workout)
+    if args.watch:
+        _watch_import(args, parameters, build_workout)
+    else:
+        _import_incremental(args, glob.glob(args.workout), parameters, build_workout)
 
-    workout_configs = [configreader.read_config(workout_file) for workout_file in workout_files]
-    workouts = [Workout(workout_config, args.ftp, args.target_power_diff) for workout_config in workout_configs]
 
+def _import_incremental(args, workout_files, parameters, build_workout):
+    # without --manifest every file is changed and the whole glob is imported
+    manifest = BuildManifest(args.manifest)
+
+    with _memory_phase(args, "build"):
+        changed = _changed_workouts(manifest, workout_files, parameters, build_workout)
+        workouts = _workouts_to_push(manifest, changed)
+    # filled while pushing, workouts pushed before a failure are recorded too
+    imported = set()
+    try:
+        if workouts:
+            with _garmin_client(args) as connection, _import_journal(args) as journal, _memory_phase(args, "import"):
+                _import_workouts(connection, workouts, journal, imported=imported)
+    finally:
+        _record_imported(manifest, parameters, changed, imported)
+
+
+def _watch_import(args, parameters, build_workout):
+    manifest = BuildManifest(args.manifest)
+    directory = _glob_root(args.workout)
+    watcher = create_watcher([directory])
+    watched = [directory]
+
+    # the session and the catalog stay warm, every round pushes only the workouts affected by the changes
     with _garmin_client(args) as connection:
-        existing_workouts_by_name = {Workout.extract_workout_name(w): w for w in connection.list_workouts()}
+        index = WorkoutIndex(connection.list_workout_records())
+        _log_duplicates(index)
+        try:
+            while True:
+                try:
+                    changed = _changed_workouts(manifest, glob.glob(args.workout), parameters, build_workout)
+                    imported = set()
+                    try:
+                        _import_workouts(connection, _workouts_to_push(manifest, changed), index=index,
+                                         imported=imported)
+                    finally:
+                        _record_imported(manifest, parameters, changed, imported)
+                except (OSError, yaml.YAMLError, KeyError, TypeError, ValueError, AttributeError) as e:
+                    logging.error("Import failed, waiting for next change: %s: %s", type(e).__name__, e)
+
+                # workouts may include files from anywhere, their directories are watched as they show up
+                unwatched = _unwatched_directories(manifest.directories(), watched)
+                if unwatched:
+                    watcher.add_directories(unwatched)
+                    watched.extend(unwatched)
+                logging.info("Watching '%s' for changes", "', '".join(watched))
+                changed_files = wait_for_changes(watcher, args.debounce)
+                logging.info("Changed: %s", ", ".join(sorted(changed_files)))
+                manifest.invalidate()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+
+
+def _unwatched_directories(directories, watched):
+    # watchers cover subdirectories too, a directory below a watched one is not added again
+    watched = [os.path.abspath(directory) for directory in watched]
+    unwatched = []
+    for directory in sorted(directories, key=lambda directory: len(os.path.abspath(directory))):
+        path = os.path.abspath(directory)
+        if os.path.isdir(path) and not any(os.path.commonpath([path, root]) == root for root in watched):
+            unwatched.append(directory)
+            watched.append(path)
+    return unwatched
+
+
+def _glob_root(pattern):
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if re.search(r"[*?[]", part):
+            break
+        parts.append(part)
+    root = os.sep.join(parts) if parts != [""] else os.sep
+    return root if os.path.isdir(root) else (os.path.dirname(root) or os.curdir)
+
+
+def _changed_workouts(manifest, workout_files, parameters, build_workout):
+    changed = []
+    for workout_file, workout_config, include_graph in manifest.changed_sources(workout_files, parameters):
+        workout = compiler.compile_workout(build_workout(workout_config))
+        changed.append((workout_file, include_graph, workout, workout.content_hash))
+    logging.info("%d of %d workout file(s) changed", len(changed), len(workout_files))
+    return changed
+
+
+def _workouts_to_push(manifest, changed):
+    return [workout for _, _, workout, payload_hash in changed
+            if manifest.payload_hash(workout.get_workout_name()) != payload_hash]
+
+
+def _record_imported(manifest, parameters, changed, imported):
+    for workout_file, include_graph, workout, payload_hash in changed:
+        workout_name = workout.get_workout_name()
+        if workout_name in imported or manifest.payload_hash(workout_name) == payload_hash:
+            manifest.record(workout_file, include_graph, parameters, {workout_name: payload_hash})
+    manifest.save()
+
 
-        for workout in workouts:
-            workout_name = workout.get_workout_name()
-            existing_workout = existing_workouts_by_name.get(workout_name)
+def _import_workouts(connection, workouts, journal=None, index=None, imported=None):
+    journal = journal if journal is not None else ImportJournal()
+    if index is None:
+        index = WorkoutIndex(connection.list_workout_records())
+        _log_duplicates(index)
 
+    imported = imported if imported is not None else set()
+    for workout in workouts:
+        workout_name = workout.get_workout_name()
+        if journal.is_done("import", workout_name):
+            logging.info("Skipping workout '%s', already imported", workout_name)
+            imported.add(workout_name)
+            continue
+
+        try:
+            existing_workout = index.match(workout_name, workout.get_external_id())
+        except AmbiguousWorkoutError as e:
+            logging.error("Skipping workout '%s', %s", workout_name, e)
+            continue
+
+        with journal.operation("import", workout_name):
             if existing_workout:
-                workout_id = Workout.extract_workout_id(existing_workout)
-                workout_owner_id = Workout.extract_workout_owner_id(existing_workout)
+                workout_id = existing_workout.workout_id
+                workout_owner_id = existing_workout.owner_id
                 payload = workout.create_workout(workout_id, workout_owner_id)
                 logging.info("Updating workout '%s'", workout_name)
                 connection.update_workout(workout_id, payload)
+                index.add(existing_workout._replace(workout_name=workout_name, description=payload.get("description")))
             else:
-                payload = workout.create_workout()
                 logging.info("Creating workout '%s'", workout_name)
-                connection.save_workout(payload)
+                created = connection.save_workout(workout.create_workout_bytes())
+                if created and "workoutId" in created:
+                    index.add(WorkoutRecord.from_json(created))
+        imported.add(workout_name)
+    return imported
+
+
+def _log_duplicates(index):
+    for key, duplicates in index.duplicates().items():
+        for value, records in duplicates.items():
+            logging.warning("Duplicated workout %s '%s': %s", key, value,
+                            ", ".join(str(record.workout_id) for record in records))
+
+
+def _import_journal(args):
+    journal = ImportJournal(args.journal, args.resume)
+    if args.resume:
+        logging.info("Resuming import, %d unfinished operation(s) in journal", len(journal.pending()))
+    return journal
+
+
+def command_compile(args):
+    target_pace = configreader.read_config(args.pace) if args.pace else None
+    # workouts are built one at a time, only their payload bytes are kept until the bundle is written
+    errors = []
+    workouts = compiler.iter_workouts(args.workout, args.ftp, args.target_power_diff, target_pace, errors)
+
+    try:
+        with _memory_phase(args, "build"):
+            compiled = compiler.compile_workouts(workouts, errors)
+    except compiler.CompileError as e:
+        for error in e.errors:
+            logging.error(error)
+        sys.exit(1)
+
+    with _memory_phase(args, "write"):
+        compiler.write_bundle(compiled, args.output)
+    logging.info("Compiled %d workout(s) into '%s'", len(compiled), args.output)
+
+
+def command_plan(args):
+    generator = PlanGenerator(configreader.read_config(args.template))
+
+    with _memory_phase(args, "generate"):
+        try:
+            if args.pace:
+                athletes = [os.path.splitext(os.path.basename(pace_file))[0] for pace_file in args.pace]
+                plans = generator.running_workouts([configreader.read_config(pace_file) for pace_file in args.pace])
+            else:
+                athletes = ["ftp-%d" % ftp for ftp in args.ftp]
+                plans = generator.cycling_workouts(args.ftp, args.target_power_diff)
+        except (ValueError, ZeroDivisionError) as e:
+            # targets out of range, e.g. an FTP over 999 W or a pace of 0:00
+            logging.error("%s: %s: %s", args.template, type(e).__name__, e)
+            sys.exit(1)
+
+    for athlete, workouts in zip(athletes, plans):
+        try:
+            compiled = compiler.compile_workouts([(args.template, workout) for workout in workouts])
+        except compiler.CompileError as e:
+            for error in e.errors:
+                logging.error(error)
+            sys.exit(1)
+
+        bundle = os.path.join(args.directory, athlete) + ".bundle"
+        compiler.write_bundle(compiled, bundle)
+        logging.info("Generated %d workout(s) into '%s'", len(compiled), bundle)
+
+
+def command_validate(args):
+    workout_files = sorted({file for pattern in args.workout for file in glob.glob(pattern)})
+    if args.shard:
+        shard_index, shard_count = args.shard
+        workout_files = validator.shard_files(workout_files, shard_index, shard_count)
+    target_pace = configreader.read_config(args.pace) if args.pace else None
+
+    results = validator.validate_files(workout_files, args.ftp, target_pace, args.processes)
+    errors = sum(len(result["errors"]) for result in results)
+
+    if args.format == "json":
+        print(jsoncodec.dumps({
+            "files": len(results),
+            "workouts": sum(result["workouts"] for result in results),
+            "errors": errors,
+            "results": results
+        }).decode())
+    else:
+        for result in results:
+            for error in result["errors"]:
+                workout = " '%s'" % error["workout"] if error["workout"] else ""
+                print("%s:%s %s" % (result["file"], workout, error["message"]))
+        logging.info("Validated %d file(s), %d error(s)", len(results), errors)
+
+    if errors:
+        sys.exit(1)
+
+
+def _shard(value):
+    match = re.match(r"^(\d+)/(\d+)$", value)
+    if not match or not 0 <= int(match.group(1)) < int(match.group(2)):
+        raise argparse.ArgumentTypeError("Shard must be given as INDEX/COUNT e.g: 0/4, but was %s" % value)
+    return int(match.group(1)), int(match.group(2))
+
+
+def command_push(args):
+    with _garmin_client(args) as connection, _import_journal(args) as journal:
+        _import_workouts(connection, compiler.read_bundle(args.bundle), journal)
 
 
 def command_export(args):
     with _garmin_client(args) as connection:
-        for workout in connection.list_workouts():
-            workout_id = Workout.extract_workout_id(workout)
-            workout_name = Workout.extract_workout_name(workout)
+        for workout in connection.list_workout_records():
+            workout_id = workout.workout_id
+            workout_name = workout.workout_name
             file = os.path.join(args.directory, str(workout_id)) + ".fit"
             logging.info("Exporting workout '%s' into '%s'", workout_name, file)
-            connection.download_workout(workout_id, file)
+            connection.download_workout(workout_id, file, workout.update_date)
+
+
+def command_fit(args):
+    # sorted, numbered file names stay the same between runs
+    workout_files = sorted(glob.glob(args.workout))
+    workout_configs = [configreader.read_config(workout_file) for workout_file in workout_files]
+
+    if args.pace:
+        target_pace = configreader.read_config(args.pace)
+        workouts = [RunningWorkout(workout_config, target_pace) for workout_config in workout_configs]
+    else:
+        workouts = [Workout(workout_config, args.ftp, args.target_power_diff) for workout_config in workout_configs]
+
+    written = set()
+    for workout in workouts:
+        workout_name = workout.get_workout_name()
+        base_name = re.sub(r"[^\w.-]+", "_", workout_name)
+        file_name = base_name
+        # different names may sanitize to the same file, later workouts get a numbered one instead of overwriting it
+        for suffix in itertools.count(2):
+            if file_name.lower() not in written:
+                break
+            file_name = "%s_%d" % (base_name, suffix)
+        written.add(file_name.lower())
+        file = os.path.join(args.directory, file_name) + ".fit"
+        if file_name != base_name:
+            logging.warning("Workout '%s' has the same file name as another workout, encoding it into '%s'",
+                            workout_name, file)
+        else:
+            logging.info("Encoding workout '%s' into '%s'", workout_name, file)
+        with open(file, "wb") as f:
+            f.write(encode_workout(workout.create_workout()))
+
+
+def command_decode(args):
+    for file, workout_config in iter_decode_files(sorted(glob.glob(args.file))):
+        if args.directory:
+            yaml_file = os.path.join(args.directory, os.path.splitext(os.path.basename(file))[0]) + ".yaml"
+            logging.info("Decoding '%s' into '%s'", file, yaml_file)
+            with open(yaml_file, "w") as f:
+                yaml.safe_dump(workout_config, f, default_flow_style=None, sort_keys=False)
+        else:
+            print(yaml.safe_dump(workout_config, explicit_start=True, default_flow_style=None, sort_keys=False), end="")
 
 
 def command_list(args):
@@ -149,9 +409,38 @@ def command_schedule(args):
 
 
 def command_get(args):
+    if len(args.id) == 1 and not (args.name or args.all or args.output or args.state):
+        with _garmin_client(args) as connection:
+            workout = connection.get_workout(args.id[0])
+            Workout.print_workout_json(workout)
+        return
+
+    state = mirror.read_state(args.state)
     with _garmin_client(args) as connection:
-        workout = connection.get_workout(args.id)
-        Workout.print_workout_json(workout)
+        with _memory_phase(args, "list"):
+            if args.name or args.all or args.state:
+                records = mirror.select_records(connection.list_workout_records(), args.id, args.name, args.all)
+            else:
+                # plain ids are fetched without listing the catalog
+                records = (WorkoutRecord(workout_id, None) for workout_id in args.id)
+            if args.state:
+                records = mirror.changed_records(records, state)
+            records = list(records)
+
+        workouts = mirror.fetch_workouts(connection, [record.workout_id for record in records], args.workers,
+                                         {record.workout_id: record.update_date for record in records})
+        written = []
+        try:
+            with (open(args.output, "wb") if args.output else contextlib.nullcontext(sys.stdout.buffer)) as f, \
+                    _memory_phase(args, "fetch"):
+                for record, workout in zip(records, workouts):
+                    mirror.write_ndjson([workout], f)
+                    written.append(record)
+        finally:
+            if args.state:
+                state.update((str(record.workout_id), record.update_date) for record in written)
+                mirror.write_state(args.state, state)
+            logging.info("Fetched %d of %d workout(s)", len(written), len(records))
 
 
 def command_delete(args):
@@ -160,6 +449,251 @@ def command_delete(args):
         connection.delete_workout(args.id)
 
 
+def command_serve(args):
+    if args.port and not daemon.is_loopback(args.host):
+        logging.error("--host must be a loopback address but was '%s'", args.host)
+        sys.exit(1)
+
+    # one client signs in again with the same credentials whenever the workspace is reset
+    client = _garmin_client(args)
+    workspace = daemon.Workspace(lambda: client)
+    workspace.catalog()
+    runner = daemon.JobRunner(_JOBS, workspace)
+    address = _daemon_address(args)
+    token_file = _daemon_token_file(args)
+    server = daemon.create_server(runner, address, daemon.write_token(token_file))
+    logging.info("Serving jobs on %s, token in %s", address, token_file)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        runner.close()
+        workspace.close()
+        os.remove(token_file)
+        if not isinstance(address, tuple):
+            os.remove(address)
+
+
+def command_submit(args):
+    params = dict(param.split("=", 1) for param in args.param)
+    try:
+        token = daemon.read_token(_daemon_token_file(args))
+        job = daemon.submit_job(_daemon_address(args), token, args.type, params, args.wait)
+    except (OSError, daemon.DaemonError) as e:
+        logging.error("Job not submitted: %s", e)
+        sys.exit(1)
+    print(jsoncodec.dumps(job).decode())
+    if job["status"] == daemon.FAILED:
+        sys.exit(1)
+
+
+def command_jobs(args):
+    try:
+        job = daemon.get_job(_daemon_address(args), daemon.read_token(_daemon_token_file(args)), args.id)
+    except (OSError, daemon.DaemonError) as e:
+        logging.error("Job not found: %s", e)
+        sys.exit(1)
+    print(jsoncodec.dumps(job).decode())
+
+
+def _daemon_address(args):
+    return (args.host, args.port) if args.port else args.socket
+
+
+def _daemon_token_file(args):
+    return args.token_file or daemon.token_file(args.socket)
+
+
+def _job_import(workspace, params):
+    if params.get("pace"):
+        target_pace = workspace.config(params["pace"])
+        parameters = {"pace": target_pace}
+
+        def build_workout(workout_config):
+            return RunningWorkout(workout_config, target_pace)
+    else:
+        ftp = int(params["ftp"])
+        target_power_diff = float(params.get("target_power_diff", 0.05))
+        parameters = {"ftp": ftp, "target_power_diff": target_power_diff}
+
+        def build_workout(workout_config):
+            return Workout(workout_config, ftp, target_power_diff)
+
+    # the manifest stays in memory, files are hashed again but only changed ones are parsed and pushed
+    manifest = workspace.manifest
+    manifest.invalidate()
+    changed = _changed_workouts(manifest, glob.glob(params["workout"]), parameters, build_workout)
+    imported = set()
+    try:
+        _import_workouts(workspace.connection(), _workouts_to_push(manifest, changed), index=workspace.catalog(),
+                         imported=imported)
+    finally:
+        _record_imported(manifest, parameters, changed, imported)
+    return {"changed": len(changed), "imported": sorted(imported)}
+
+
+def _job_export(workspace, params):
+    directory = writeable_dir(params["directory"])
+    connection = workspace.connection()
+    exported = []
+    for record in list(workspace.catalog()):
+        file = os.path.join(directory, str(record.workout_id)) + ".fit"
+        logging.info("Exporting workout '%s' into '%s'", record.workout_name, file)
+        connection.download_workout(record.workout_id, file, record.update_date)
+        exported.append(file)
+    return {"exported": exported}
+
+
+def _job_schedule(workspace, params):
+    workout_id = params.get("workout_id")
+    if workout_id is None:
+        record = workspace.catalog().match(params["workout"])
+        if record is None:
+            raise LookupError("Workout '%s' not found" % params["workout"])
+        workout_id = record.workout_id
+    workspace.connection().schedule_workout(workout_id, params["date"])
+    return {"workout_id": workout_id, "date": params["date"]}
+
+
+def _job_delete(workspace, params):
+    workout_id = int(params["id"])
+    logging.info("Deleting workout '%s'", workout_id)
+    workspace.connection().delete_workout(workout_id)
+    workspace.catalog().remove(workout_id)
+    return {"deleted": workout_id}
+
+
+def _job_refresh(workspace, params):
+    workspace.refresh()
+    return {"workouts": len(workspace.catalog())}
+
+
+_JOBS = {
+    "import": _job_import,
+    "export": _job_export,
+    "schedule": _job_schedule,
+    "delete": _job_delete,
+    "refresh": _job_refresh
+}
+
+
+def command_enqueue(args):
+    if args.operation == "import":
+        params = [{"name": workout.name, "payload": workout.payload, "hash": workout.content_hash}
+                  for workout in compiler.read_bundle(args.bundle)]
+    elif args.operation == "schedule":
+        params = [{"workout_id": workout_id, "date": args.date} for workout_id in args.id]
+    else:
+        params = [{"id": workout_id} for workout_id in args.id]
+
+    with jobqueue.JobQueue(args.queue) as queue:
+        job_ids = queue.enqueue_many([(args.account, args.operation, job_params, args.priority)
+                                      for job_params in params])
+    logging.info("Queued %d %s job(s) for '%s' into '%s'", len(job_ids), args.operation, args.account, args.queue)
+
+
+def command_work(args):
+    accounts = configreader.read_config(args.accounts) if args.accounts else {}
+    # worker processes get only plain options, every one of them opens the queue and signs in on its own
+    worker_args = argparse.Namespace(**{name: getattr(args, name) for name in (
+        "connect_url", "sso_url", "cookie_jar", "pool_size", "cache_dir", "cache_size", "queue", "lease",
+        "max_attempts", "until_empty")})
+    if args.processes == 1:
+        _work(worker_args, accounts)
+        return
+
+    processes = [multiprocessing.Process(target=_work, args=(worker_args, accounts)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def _work(args, accounts):
+    def workspace_factory(account):
+        if account not in accounts:
+            raise LookupError("Account '%s' has no password in the accounts file" % account)
+        return daemon.Workspace(lambda: _garmin_client(args, {"username": account, "password": accounts[account]}))
+
+    with jobqueue.JobQueue(args.queue, args.lease, args.max_attempts) as queue:
+        worker = jobqueue.QueueWorker(queue, _QUEUE_JOBS, workspace_factory)
+        try:
+            processed = worker.run(args.until_empty)
+            logging.info("Worker %s processed %d job(s)", worker.worker, processed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+
+
+def command_queue(args):
+    with jobqueue.JobQueue(args.queue) as queue:
+        if args.retry_dead:
+            logging.info("Queued %d dead job(s) again", queue.retry_dead())
+        if args.purge:
+            logging.info("Removed %d done job(s)", queue.purge())
+        if args.dead:
+            for job, error in queue.dead_letters():
+                print("{0} {1:10} {2:20} {3}".format(job.job_id, job.operation, job.account, error))
+            return
+        counts = queue.counts()
+        for status in (jobqueue.QUEUED, jobqueue.LEASED, jobqueue.DONE, jobqueue.DEAD):
+            print("{0:8} {1}".format(status, counts.get(status, 0)))
+
+
+def _queue_import(workspace, params):
+    workout = compiler.CompiledWorkout(params["name"], params["payload"], params["hash"])
+    imported = _import_workouts(workspace.connection(), [workout], index=workspace.catalog())
+    if workout.get_workout_name() not in imported:
+        raise LookupError("Workout '%s' not imported, it matches more than one workout" % workout.get_workout_name())
+    return {"imported": workout.get_workout_name()}
+
+
+_QUEUE_JOBS = {
+    "import": _queue_import,
+    "schedule": _job_schedule,
+    "delete": _job_delete
+}
+
+
+def command_gc(args):
+    library_external_ids = None
+    if args.delete_orphans:
+        library_files = sorted(glob.glob(args.library))
+        if not library_files:
+            # an empty library would make every tagged workout an orphan
+            logging.error("No workout files match '%s'", args.library)
+            sys.exit(1)
+        library_external_ids = set()
+        for _, workout_config in compiler.read_workout_configs(library_files):
+            if workout_config.get("id") is not None:
+                library_external_ids.add(str(workout_config["id"]))
+
+    with _garmin_client(args) as connection:
+        with _memory_phase(args, "list"):
+            index = WorkoutIndex(connection.list_workout_records())
+            garbage = cleanup.find_garbage(index, library_external_ids)
+
+        for record, reason in garbage:
+            print("{0} {1:20} {2}".format(record.workout_id, record.workout_name, reason))
+        if args.dry_run or not garbage:
+            logging.info("%d of %d workout(s) would be deleted", len(garbage), len(index))
+            return
+
+        failures = cleanup.delete_workouts(connection, [record for record, _ in garbage], args.workers,
+                                           RateLimiter(args.rate, burst=args.workers))
+        logging.info("Deleted %d of %d workout(s)", len(garbage) - len(failures), len(garbage))
+        if failures:
+            sys.exit(1)
+
+
+def _memory_phase(args, name):
+    profiler = getattr(args, "profiler", None)
+    return profiler.phase(name) if profiler is not None else contextlib.nullcontext()
+
+
 def _garmin_client(args, account=None):
     
     if account:
@@ -176,8 +710,10 @@ def _garmin_client(args, account=None):
         # password=account.PASSWORD,
         username = username,
         password = password,
-        # cookie_jar=args.cookie_jar
-        cookie_jar=None
+        cookie_jar=account_cookie_jar(getattr(args, "cookie_jar", None), username),
+        metrics=getattr(args, "metrics", None),
+        pool_size=getattr(args, "pool_size", None),
+        cache=ResponseCache(getattr(args, "cache_size", 256), getattr(args, "cache_dir", None))
     )
     print(args.connect_url)
     print(args.sso_url)
@@ -186,6 +722,33 @@ def _garmin_client(args, account=None):
 
 
 def main():
+    parser = _parser()
+    args = parser.parse_args()
+    _check_arguments(parser, args)
+
+    logging_level = logging.DEBUG if args.debug else logging.INFO
+    logging.basicConfig(level=logging_level)
+
+    args.metrics = Metrics()
+    if args.metrics_port:
+        args.metrics.start_http_server(args.metrics_port)
+
+    args.profiler = MemoryProfiler(args.memprofile_top)
+    if args.memprofile:
+        args.profiler.start()
+
+    try:
+        with args.profiler.phase(args.func.__name__[len("command_"):]):
+            args.func(args)
+    finally:
+        if args.metrics_file:
+            args.metrics.write_textfile(args.metrics_file)
+        if args.memprofile:
+            args.profiler.stop()
+            print(args.profiler.format_report(), file=sys.stderr)
+
+
+def _parser():
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
                                      description="Manage Garmin Connect workout(s)")
     # parser.add_argument("--username", "-u", required=True, help="Garmin Connect account username")
@@ -194,6 +757,17 @@ def main():
     parser.add_argument("--connect-url", default="https://connect.garmin.com", help="Garmin Connect url")
     parser.add_argument("--sso-url", default="https://sso.garmin.com", help="Garmin SSO url")
     parser.add_argument("--debug", action='store_true', help="Enables more detailed messages")
+    parser.add_argument("--metrics-file", help="Write request metrics in OpenMetrics text format into file on exit")
+    parser.add_argument("--metrics-port", type=int, help="Expose request metrics over HTTP on localhost port")
+    parser.add_argument("--cache-dir",
+                        help="Directory keeping fetched workouts between runs, unchanged workouts are not downloaded")
+    parser.add_argument("--cache-size", default=256, type=int, help="Number of responses cached in memory")
+    parser.add_argument("--pool-size", type=int,
+                        help="Number of kept-alive HTTP connections per host, match it with the number of workers")
+    parser.add_argument("--memprofile", action='store_true',
+                        help="Trace memory allocations and report peak usage and top allocation sites per phase")
+    parser.add_argument("--memprofile-top", default=10, type=int,
+                        help="Number of allocation sites reported per phase")
 
     subparsers = parser.add_subparsers(title="Commands")
 
@@ -205,14 +779,87 @@ def main():
                                help="FTP to calculate absolute target power from relative value")
     parser_import.add_argument("--target-power-diff", default=0.05, type=float,
                                help="Percent of target power to calculate final target power range")
+    _add_journal_arguments(parser_import)
+    _add_manifest_argument(parser_import)
+    parser_import.add_argument("--watch", action='store_true',
+                               help="Keep running and import workouts again when their files or includes change")
+    parser_import.add_argument("--debounce", default=0.5, type=float,
+                               help="Seconds without further changes before a watched change is imported")
     parser_import.set_defaults(func=command_import)
 
+    parser_compile = subparsers.add_parser("compile",
+                                           description="Build and validate workout(s) from file(s) into a bundle of "
+                                                       "payloads ready to push into Garmin Connect")
+    parser_compile.add_argument("workout",
+                                help="File(s) with workout(s) to compile, "
+                                     "wildcards are supported e.g: sample_workouts/*.yaml")
+    parser_compile.add_argument("--output", "-o", required=True, help="Bundle file to write")
+    parser_compile.add_argument("--ftp", type=int,
+                                help="FTP to calculate absolute target power from relative value")
+    parser_compile.add_argument("--target-power-diff", default=0.05, type=float,
+                                help="Percent of target power to calculate final target power range")
+    parser_compile.add_argument("--pace", help="File with target paces, compiles running workouts instead of cycling")
+    parser_compile.set_defaults(func=command_compile)
+
+    parser_plan = subparsers.add_parser("plan",
+                                        description="Generate all weeks of a parametric plan template for one or more "
+                                                    "athletes into bundle(s) ready to push into Garmin Connect")
+    parser_plan.add_argument("template", help="Plan template file e.g: sample_plans/10k.yaml")
+    parser_plan.add_argument("directory", type=writeable_dir,
+                             help="Destination directory where one bundle per athlete will be written")
+    parser_plan.add_argument("--pace", action="append",
+                             help="File with target paces of an athlete, may be repeated")
+    parser_plan.add_argument("--ftp", action="append", type=int, help="FTP of an athlete, may be repeated")
+    parser_plan.add_argument("--target-power-diff", default=0.05, type=float,
+                             help="Percent of target power to calculate final target power range")
+    parser_plan.set_defaults(func=command_plan)
+
+    parser_validate = subparsers.add_parser("validate",
+                                            description="Validate workout(s) from file(s) without Garmin Connect")
+    parser_validate.add_argument("workout", nargs="+",
+                                 help="File(s) with workout(s) to validate, "
+                                      "wildcards are supported e.g: sample_workouts/*.yaml")
+    parser_validate.add_argument("--ftp", default=250, type=int,
+                                 help="FTP to calculate absolute target power from relative value")
+    parser_validate.add_argument("--pace", help="File with target paces referenced by running workouts")
+    parser_validate.add_argument("--shard", type=_shard,
+                                 help="Validate only one shard of the files given as INDEX/COUNT e.g: 0/4")
+    parser_validate.add_argument("--processes", default=1, type=int, help="Number of validating processes")
+    parser_validate.add_argument("--format", choices=["text", "json"], default="text", help="Output format")
+    parser_validate.set_defaults(func=command_validate)
+
+    parser_push = subparsers.add_parser("push", description="Import compiled bundle into Garmin Connect")
+    parser_push.add_argument("bundle", help="Bundle file written by compile command")
+    _add_journal_arguments(parser_push)
+    parser_push.set_defaults(func=command_push)
+
     parser_export = subparsers.add_parser("export",
                                           description="Export all workouts from Garmin Connect and save into directory")
     parser_export.add_argument("directory", type=writeable_dir,
                                help="Destination directory where workout(s) will be exported")
     parser_export.set_defaults(func=command_export)
 
+    parser_fit = subparsers.add_parser("fit",
+                                       description="Encode workout(s) from file(s) into FIT files "
+                                                   "without Garmin Connect")
+    parser_fit.add_argument("workout",
+                            help="File(s) with workout(s) to encode, "
+                                 "wildcards are supported e.g: sample_workouts/*.yaml")
+    parser_fit.add_argument("directory", type=writeable_dir,
+                            help="Destination directory where FIT file(s) will be written")
+    parser_fit.add_argument("--ftp", type=int,
+                            help="FTP to calculate absolute target power from relative value")
+    parser_fit.add_argument("--target-power-diff", default=0.05, type=float,
+                            help="Percent of target power to calculate final target power range")
+    parser_fit.add_argument("--pace", help="File with target paces, encodes running workouts instead of cycling")
+    parser_fit.set_defaults(func=command_fit)
+
+    parser_decode = subparsers.add_parser("decode", description="Decode FIT workout file(s) into workout definitions")
+    parser_decode.add_argument("file", help="FIT file(s) to decode, wildcards are supported e.g: export/*.fit")
+    parser_decode.add_argument("--directory", type=writeable_dir,
+                               help="Destination directory for YAML file(s), printed as YAML stream if not set")
+    parser_decode.set_defaults(func=command_decode)
+
     parser_list = subparsers.add_parser("list", description="List all workouts")
     parser_list.set_defaults(func=command_list)
 
@@ -222,25 +869,143 @@ def main():
     parser_schedule.set_defaults(func=command_schedule)
 
     parser_get = subparsers.add_parser("get", description="Get workout")
-    parser_get.add_argument("--id", required=True, help="Workout id, use list command to get workouts identifiers")
+    parser_get.add_argument("--id", action="append", default=[],
+                            help="Workout id, use list command to get workouts identifiers, may be repeated")
+    parser_get.add_argument("--name", help="Get all workouts with name matching the wildcard e.g: 'Sweet Spot*'")
+    parser_get.add_argument("--all", action='store_true', help="Get all workouts")
+    parser_get.add_argument("--output", "-o",
+                            help="File to write workout definitions as NDJSON, written to standard output if not set")
+    parser_get.add_argument("--state",
+                            help="File recording the updateDate of mirrored workouts, only changed workouts are got")
+    parser_get.add_argument("--workers", default=4, type=int, help="Number of concurrent requests")
     parser_get.set_defaults(func=command_get)
 
     parser_delete = subparsers.add_parser("delete", description="Delete workout")
     parser_delete.add_argument("--id", required=True, help="Workout id, use list command to get workouts identifiers")
     parser_delete.set_defaults(func=command_delete)
 
+    parser_gc = subparsers.add_parser("gc",
+                                      description="Delete copies of workouts sharing the same external id and, "
+                                                  "with --delete-orphans, tagged workouts no longer defined in the "
+                                                  "local library")
+    parser_gc.add_argument("--library",
+                           help="File(s) with workout(s) to keep, wildcards are supported e.g: sample_workouts/*.yaml")
+    parser_gc.add_argument("--delete-orphans", action='store_true',
+                           help="Also delete workouts tagged with an external id not defined in --library")
+    parser_gc.add_argument("--dry-run", action='store_true', help="Only list workouts which would be deleted")
+    parser_gc.add_argument("--workers", default=4, type=int, help="Number of concurrent deletes")
+    parser_gc.add_argument("--rate", default=2.0, type=float, help="Maximum number of deletes per second")
+    parser_gc.set_defaults(func=command_gc)
+
+    parser_serve = subparsers.add_parser("serve",
+                                         description="Keep the session, the workout catalog and parsed files warm "
+                                                     "and run import, export, schedule and delete jobs submitted "
+                                                     "over a Unix socket or HTTP")
+    _add_daemon_arguments(parser_serve)
+    parser_serve.set_defaults(func=command_serve)
+
+    parser_submit = subparsers.add_parser("submit", description="Submit a job to the serve daemon")
+    parser_submit.add_argument("type", choices=sorted(_JOBS), help="Job type")
+    parser_submit.add_argument("--param", action="append", default=[],
+                               help="Job parameter as KEY=VALUE, may be repeated e.g: "
+                                    "--param workout='sample_workouts/*.yaml' --param ftp=250")
+    parser_submit.add_argument("--wait", action='store_true', help="Wait until the job is done and print its result")
+    _add_daemon_arguments(parser_submit)
+    parser_submit.set_defaults(func=command_submit)
+
+    parser_jobs = subparsers.add_parser("jobs", description="Print status and result of a job of the serve daemon")
+    parser_jobs.add_argument("id", help="Job id printed by submit command")
+    _add_daemon_arguments(parser_jobs)
+    parser_jobs.set_defaults(func=command_jobs)
+
+    parser_enqueue = subparsers.add_parser("enqueue",
+                                           description="Add one job per workout to the persistent job queue, "
+                                                       "drained by work command")
+    parser_enqueue.add_argument("operation", choices=sorted(_QUEUE_JOBS), help="Operation")
+    parser_enqueue.add_argument("--account", required=True, help="Garmin Connect account username")
+    parser_enqueue.add_argument("--bundle", help="Bundle file written by compile command, required by import")
+    parser_enqueue.add_argument("--id", action="append", default=[],
+                                help="Workout id to schedule or delete, may be repeated")
+    parser_enqueue.add_argument("--date", help="Date to which schedule the workout(s)")
+    parser_enqueue.add_argument("--priority", default=0, type=int, help="Jobs with higher priority run first")
+    _add_queue_argument(parser_enqueue)
+    parser_enqueue.set_defaults(func=command_enqueue)
+
+    parser_work = subparsers.add_parser("work", description="Run queued jobs, retrying failed ones with backoff")
+    parser_work.add_argument("--accounts", help="YAML file mapping account usernames to passwords")
+    parser_work.add_argument("--processes", default=1, type=int, help="Number of worker processes")
+    parser_work.add_argument("--until-empty", action='store_true',
+                             help="Stop when no job is queued or running instead of waiting for new jobs")
+    parser_work.add_argument("--lease", default=300, type=float,
+                             help="Seconds after which a job of a worker that died is run by another worker")
+    parser_work.add_argument("--max-attempts", default=5, type=int,
+                             help="Attempts before a failing job is moved to the dead letters")
+    _add_queue_argument(parser_work)
+    parser_work.set_defaults(func=command_work)
+
+    parser_queue = subparsers.add_parser("queue", description="Print the number of jobs in the queue by status")
+    parser_queue.add_argument("--dead", action='store_true', help="Print dead jobs and their last error")
+    parser_queue.add_argument("--retry-dead", action='store_true', help="Queue dead jobs again")
+    parser_queue.add_argument("--purge", action='store_true', help="Remove done jobs")
+    _add_queue_argument(parser_queue)
+    parser_queue.set_defaults(func=command_queue)
+
     parser_import = subparsers.add_parser("import_run", description="Import workout(s) from file(s) into Garmin Connect")
     parser_import.add_argument("pace",
                                help="File(s) with workout(s) to import, "
                                     "wildcards are supported e.g: sample_workouts/*.yaml")
+    _add_journal_arguments(parser_import)
+    _add_manifest_argument(parser_import)
     parser_import.set_defaults(func=command_import_run)
 
-    args = parser.parse_args()
+    return parser
 
-    logging_level = logging.DEBUG if args.debug else logging.INFO
-    logging.basicConfig(level=logging_level)
 
-    args.func(args)
+def _check_arguments(parser, args):
+    if getattr(args, "watch", False) and args.journal:
+        parser.error("--watch can not be combined with --journal")
+    if getattr(args, "resume", False) and not args.journal:
+        parser.error("--resume requires --journal")
+    if getattr(args, "func", None) is command_get and not (args.id or args.name or args.all):
+        parser.error("--id, --name or --all is required")
+    if getattr(args, "func", None) in (command_fit, command_compile, command_plan) and not (args.ftp or args.pace):
+        parser.error("--ftp or --pace is required")
+    if getattr(args, "func", None) is command_gc and args.delete_orphans and not args.library:
+        parser.error("--delete-orphans requires --library")
+    if getattr(args, "func", None) is command_enqueue:
+        if args.operation == "import" and not args.bundle:
+            parser.error("--bundle is required by import")
+        if args.operation != "import" and not args.id:
+            parser.error("--id is required by %s" % args.operation)
+        if args.operation == "schedule" and not args.date:
+            parser.error("--date is required by schedule")
+
+
+def _add_queue_argument(parser):
+    parser.add_argument("--queue", default="garminworkouts-queue.db", help="SQLite file of the job queue")
+
+
+def _add_daemon_arguments(parser):
+    parser.add_argument("--socket", default=".garminworkouts.sock", help="Unix socket of the serve daemon")
+    parser.add_argument("--port", type=int, help="Use HTTP on this port instead of the Unix socket")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Host of the serve daemon HTTP API, only loopback addresses are served")
+    parser.add_argument("--token-file",
+                        help="File with the token of the serve daemon, readable by its owner only, "
+                             "defaults to the socket file name with .token suffix")
+
+
+def _add_manifest_argument(parser):
+    parser.add_argument("--manifest",
+                        help="File recording source, include and payload hashes of imported workouts, "
+                             "only workouts changed since the previous import are imported")
+
+
+def _add_journal_arguments(parser):
+    parser.add_argument("--journal", help="Append-only file recording every planned operation and its outcome")
+    parser.add_argument("--resume", action='store_true',
+                        help="Replay only operations the journal does not record as done")
+
 
 def import_running_workout(args, account, pace_file, wtg, start_date):
     workout_files = os.path.join('nike_42k', f'{wtg:02}', '*.yaml')
@@ -309,4 +1074,4 @@ def main2():
 
 
 if __name__ == "__main__":
-    main2()
+    main()
@@ -0,0 +1,51 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from garminworkouts.models.workoutindex import extract_external_id
+
+DUPLICATE = "duplicate"
+ORPHAN = "orphan"
+
+
+def find_garbage(index, library_external_ids=None):
+    garbage = {}
+
+    # only workouts sharing an external ID are copies of each other, the most recently updated one is kept
+    for records in index.duplicates()["external_id"].values():
+        _collect_duplicates(garbage, records)
+
+    # orphans are only known when compared against the local library, untagged workouts are never orphans
+    if library_external_ids is not None:
+        for record in index:
+            if record.workout_id in garbage:
+                continue
+            external_id = extract_external_id(record.description)
+            if external_id is not None and external_id not in library_external_ids:
+                garbage[record.workout_id] = (record, ORPHAN)
+
+    return sorted(garbage.values(), key=lambda item: item[0].workout_id)
+
+
+def _collect_duplicates(garbage, records):
+    kept = max(records, key=lambda record: (record.update_date or "", record.workout_id))
+    for record in records:
+        if record is not kept:
+            garbage[record.workout_id] = (record, DUPLICATE)
+
+
+def delete_workouts(connection, records, workers=4, rate_limiter=None):
+    def delete(record):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        logging.info("Deleting workout %s '%s'", record.workout_id, record.workout_name)
+        connection.delete_workout(record.workout_id)
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(record, executor.submit(delete, record)) for record in records]
+        for record, future in futures:
+            error = future.exception()
+            if error is not None:
+                logging.error("Failed to delete workout %s '%s': %s", record.workout_id, record.workout_name, error)
+                failures[record.workout_id] = error
+    return failures
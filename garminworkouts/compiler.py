@@ -0,0 +1,162 @@
+import glob
+
+import yaml
+
+from garminworkouts.config import configreader
+from garminworkouts.models.workout import Workout, RunningWorkout
+from garminworkouts.models.workoutindex import extract_external_id
+from garminworkouts.utils import jsoncodec
+
+BUNDLE_FORMAT = "garminworkouts-bundle/1"
+
+_BUILD_ERRORS = (KeyError, TypeError, ValueError, AttributeError)
+_PAYLOAD_FIELD = b',"payload":'
+
+
+class CompileError(ValueError):
+    def __init__(self, errors):
+        super(CompileError, self).__init__("\n".join(errors))
+        self.errors = errors
+
+
+class CompiledWorkout(object):
+
+    def __init__(self, name, payload, content_hash, payload_bytes=None):
+        self.name = name
+        self.payload = payload
+        self.content_hash = content_hash
+        self.payload_bytes = payload_bytes
+
+    def get_workout_name(self):
+        return self.name
+
+    def get_external_id(self):
+        return extract_external_id(self.payload.get("description"))
+
+    def create_workout(self, workout_id=None, workout_owner_id=None):
+        return dict(self.payload, workoutId=workout_id, ownerId=workout_owner_id)
+
+    def create_workout_bytes(self, workout_id=None, workout_owner_id=None):
+        # a new workout is created with exactly the bytes its content hash was computed from
+        if self.payload_bytes is not None and workout_id is None and workout_owner_id is None:
+            return self.payload_bytes
+        return jsoncodec.canonical_dumps(self.create_workout(workout_id, workout_owner_id))
+
+
+def compile_workout(workout):
+    payload = workout.create_workout()
+    payload_bytes = jsoncodec.canonical_dumps(payload)
+    return CompiledWorkout(workout.get_workout_name(), payload, jsoncodec.content_hash(payload_bytes), payload_bytes)
+
+
+def read_workout_configs(workout_files):
+    # a file holds either a single workout or a list of workouts, e.g. a whole running program
+    for workout_file in workout_files:
+        workout_config = configreader.read_config(workout_file)
+        for config in (workout_config if isinstance(workout_config, list) else [workout_config]):
+            yield workout_file, config
+
+
+def iter_workouts(workout_pattern, ftp=None, target_power_diff=0.05, target_pace=None, errors=None):
+    # with an errors list, files which can not be read or built are reported into it and the others are still built
+    for workout_file in sorted(glob.glob(workout_pattern)):
+        try:
+            configs = [config for _, config in read_workout_configs([workout_file])]
+        except (OSError, yaml.YAMLError) + _BUILD_ERRORS as e:
+            if errors is None:
+                raise
+            errors.append(_format_error(workout_file, e))
+            continue
+
+        for config in configs:
+            try:
+                if target_pace is not None:
+                    workout = RunningWorkout(config, target_pace)
+                else:
+                    workout = Workout(config, ftp, target_power_diff)
+            except _BUILD_ERRORS as e:
+                if errors is None:
+                    raise
+                errors.append(_format_error(workout_file, e))
+                continue
+            yield workout_file, workout
+
+
+def build_workouts(workout_pattern, ftp=None, target_power_diff=0.05, target_pace=None):
+    errors = []
+    workouts = list(iter_workouts(workout_pattern, ftp, target_power_diff, target_pace, errors))
+    if errors:
+        raise CompileError(errors)
+    return workouts
+
+
+def compile_workouts(workouts, errors=None):
+    compiled = []
+    # shared with iter_workouts, build and compile errors are reported together in file order
+    errors = errors if errors is not None else []
+    names = {}
+    external_ids = {}
+    for workout_file, workout in workouts:
+        try:
+            name = workout.get_workout_name()
+            external_id = workout.get_external_id()
+            payload_bytes = workout.create_workout_bytes()
+        except _BUILD_ERRORS as e:
+            errors.append(_format_error(workout_file, e))
+            continue
+
+        if name in names:
+            errors.append("%s: duplicated workout name '%s', already defined in %s" % (workout_file, name, names[name]))
+            continue
+        if external_id is not None and external_id in external_ids:
+            errors.append("%s: duplicated workout id '%s', already defined in %s"
+                          % (workout_file, external_id, external_ids[external_id]))
+            continue
+        names[name] = workout_file
+        if external_id is not None:
+            external_ids[external_id] = workout_file
+
+        compiled.append((name, payload_bytes, jsoncodec.content_hash(payload_bytes)))
+
+    if errors:
+        raise CompileError(errors)
+    return compiled
+
+
+def _format_error(workout_file, e):
+    return "%s: %s: %s" % (workout_file, type(e).__name__, e)
+
+
+def write_bundle(compiled, filename):
+    with open(filename, "wb") as f:
+        f.write(jsoncodec.dumps({"format": BUNDLE_FORMAT, "workouts": len(compiled)}) + b"\n")
+        for name, payload_bytes, content_hash in compiled:
+            # payload bytes are embedded as they are, the hash stays valid for exactly these bytes
+            f.write(b'{"name":' + jsoncodec.dumps(name) + b',"hash":' + jsoncodec.dumps(content_hash)
+                    + b',"payload":' + payload_bytes + b'}\n')
+
+
+def read_bundle(filename):
+    with open(filename, "rb") as f:
+        header = jsoncodec.loads(f.readline())
+        if header.get("format") != BUNDLE_FORMAT:
+            raise ValueError("Unsupported bundle format '%s' in %s" % (header.get("format"), filename))
+
+        # a truncated bundle is refused before any of its workouts is pushed
+        start = f.tell()
+        count = sum(1 for _ in f)
+        if count != header.get("workouts"):
+            raise ValueError("Bundle %s holds %d workout(s), its header declares %s"
+                             % (filename, count, header.get("workouts")))
+        f.seek(start)
+
+        for line in f:
+            # the hash covers the embedded payload bytes as written, they are split off the record before parsing
+            position = line.find(_PAYLOAD_FIELD)
+            if position < 0 or not line.rstrip(b"\r\n").endswith(b"}"):
+                raise ValueError("Malformed bundle record in %s" % filename)
+            entry = jsoncodec.loads(line[:position] + b"}")
+            payload_bytes = line[position + len(_PAYLOAD_FIELD):].rstrip(b"\r\n")[:-1]
+            if jsoncodec.content_hash(payload_bytes) != entry["hash"]:
+                raise ValueError("Content hash mismatch for workout '%s' in %s" % (entry["name"], filename))
+            yield CompiledWorkout(entry["name"], jsoncodec.loads(payload_bytes), entry["hash"], payload_bytes)
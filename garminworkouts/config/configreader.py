@@ -1,13 +1,15 @@
-import yaml
-
 from garminworkouts.config.excelparser import excel_to_yaml
 from garminworkouts.config.includeloader import IncludeLoader
 
 
-def read_config(filename):
+def read_config(filename, include_graph=None):
     if "xls" in filename.split(".")[-1]:
         filename = excel_to_yaml(filename)
 
     with open(filename, 'r') as f:
-        data = yaml.load(f, IncludeLoader)
+        loader = IncludeLoader(f, include_graph)
+        try:
+            data = loader.get_single_data()
+        finally:
+            loader.dispose()
     return data
@@ -5,16 +5,25 @@ import yaml
 
 class IncludeLoader(yaml.SafeLoader):
 
-    def __init__(self, stream):
+    def __init__(self, stream, include_graph=None):
         self._root = os.path.split(stream.name)[0]
+        self._filename = os.path.normpath(stream.name)
+        # maps every loaded file to the files it includes directly, shared by nested loaders
+        self.include_graph = include_graph if include_graph is not None else {}
+        self.include_graph.setdefault(self._filename, [])
 
         super(IncludeLoader, self).__init__(stream)
 
     def include(self, node):
         filename = os.path.join(self._root, self.construct_scalar(node))
+        self.include_graph[self._filename].append(os.path.normpath(filename))
 
         with open(filename, 'r') as f:
-            return yaml.load(f, IncludeLoader)
+            loader = IncludeLoader(f, self.include_graph)
+            try:
+                return loader.get_single_data()
+            finally:
+                loader.dispose()
 
 
 IncludeLoader.add_constructor('!include', IncludeLoader.include)
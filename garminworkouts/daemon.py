@@ -0,0 +1,351 @@
+import collections
+import hmac
+import http.client
+import ipaddress
+import itertools
+import logging
+import os
+import queue
+import re
+import secrets
+import socket
+import socketserver
+import stat
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from garminworkouts.config import configreader
+from garminworkouts.manifest import BuildManifest
+from garminworkouts.models.workoutindex import WorkoutIndex
+from garminworkouts.utils import jsoncodec
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_JOB_PATH = re.compile(r"^/jobs/(?P<job_id>[^/]+)$")
+
+
+class DaemonError(RuntimeError):
+    def __init__(self, status, message):
+        super(DaemonError, self).__init__("%s: %s" % (status, message))
+        self.status = status
+
+
+class Workspace(object):
+
+    def __init__(self, client_factory):
+        self._client_factory = client_factory
+        self._client = None
+        self._connection = None
+        self._index = None
+        self._configs = {}
+        self.manifest = BuildManifest()
+
+    def connection(self):
+        if self._connection is None:
+            client = self._client_factory()
+            self._connection = client.__enter__()
+            self._client = client
+        return self._connection
+
+    def catalog(self):
+        if self._index is None:
+            self._index = WorkoutIndex(self.connection().list_workout_records())
+        return self._index
+
+    def config(self, filename):
+        # parsed files are reused until they change on disk, e.g. pace tables shared by every import job
+        file_stat = os.stat(filename)
+        key = (file_stat.st_mtime_ns, file_stat.st_size)
+        cached = self._configs.get(filename)
+        if cached is None or cached[0] != key:
+            cached = self._configs[filename] = (key, configreader.read_config(filename))
+        return cached[1]
+
+    def refresh(self):
+        # workouts changed by other tools are only seen after the catalog is listed again
+        self._index = None
+        self.manifest = BuildManifest()
+
+    def reset(self):
+        # a failed request may mean an expired session, the next job signs in and lists the catalog again
+        client, self._client, self._connection, self._index = self._client, None, None, None
+        self.manifest = BuildManifest()
+        if client is not None:
+            try:
+                client.__exit__(None, None, None)
+            except requests.RequestException:
+                pass
+
+    def close(self):
+        self.reset()
+
+
+class Job(object):
+
+    def __init__(self, job_id, job_type, params):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.params = params
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.seconds = None
+        self.done = threading.Event()
+
+    def to_json(self):
+        return {
+            "id": self.job_id,
+            "type": self.job_type,
+            "params": self.params,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "seconds": self.seconds
+        }
+
+
+class JobRunner(object):
+
+    def __init__(self, handlers, workspace, history=1000):
+        self.handlers = handlers
+        self.workspace = workspace
+        self.history = history
+        self._lock = threading.Lock()
+        self._jobs = collections.OrderedDict()
+        self._ids = itertools.count(1)
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, job_type, params=None):
+        if job_type not in self.handlers:
+            raise ValueError("Unknown job type '%s', expected one of: %s"
+                             % (job_type, ", ".join(sorted(self.handlers))))
+
+        with self._lock:
+            job = Job(str(next(self._ids)), job_type, params or {})
+            self._jobs[job.job_id] = job
+            # only finished jobs are forgotten, a queued job can always be looked up
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if not oldest.done.is_set():
+                    break
+                self._jobs.popitem(last=False)
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        # jobs run one at a time, they share one session and one catalog
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._execute(job)
+
+    def _execute(self, job):
+        job.status = RUNNING
+        start = time.perf_counter()
+        try:
+            job.result = self.handlers[job.job_type](self.workspace, job.params)
+            job.status = DONE
+        except Exception as e:
+            logging.exception("Job %s (%s) failed", job.job_id, job.job_type)
+            job.error = "%s: %s" % (type(e).__name__, e)
+            job.status = FAILED
+            if isinstance(e, requests.RequestException):
+                self.workspace.reset()
+        finally:
+            job.seconds = time.perf_counter() - start
+            job.done.set()
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        runner = self.server.runner
+        if self.path == "/jobs":
+            self._respond(200, [job.to_json() for job in runner.jobs()])
+            return
+        match = _JOB_PATH.match(self.path)
+        job = runner.get(match.group("job_id")) if match else None
+        if job is None:
+            self._respond(404, {"error": "Not found: %s" % self.path})
+            return
+        self._respond(200, job.to_json())
+
+    def do_POST(self):
+        path, _, query = self.path.partition("?")
+        if path != "/jobs":
+            self._respond(404, {"error": "Not found: %s" % self.path})
+            return
+        if not self._authorized():
+            return
+        # a browser sends text/plain and form bodies cross-origin without asking first, JSON it does not
+        if self.headers.get_content_type() != "application/json":
+            self._respond(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            body = jsoncodec.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            job = self.server.runner.submit(body.get("type"), body.get("params"))
+        except (ValueError, TypeError, AttributeError) as e:
+            self._respond(400, {"error": str(e)})
+            return
+
+        if query == "wait=1":
+            job.done.wait()
+            self._respond(200, job.to_json())
+        else:
+            self._respond(202, job.to_json())
+
+    def _authorized(self):
+        # web pages the user opens can reach loopback too, they send an Origin or a Host of their own domain
+        if "Origin" in self.headers:
+            self._respond(403, {"error": "Cross-origin requests are not allowed"})
+            return False
+        if not _is_loopback_host(self.headers.get("Host", "")):
+            self._respond(403, {"error": "Host must be a loopback address"})
+            return False
+        authorization = self.headers.get("Authorization", "").encode("latin-1")
+        if not hmac.compare_digest(authorization, ("Bearer %s" % self.server.token).encode("latin-1")):
+            self._respond(401, {"error": "Missing or wrong token"})
+            return False
+        return True
+
+    def _respond(self, status, value):
+        body = jsoncodec.dumps(value)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+
+def is_loopback(host):
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    # scoped IPv6 addresses carry their interface after %
+    return bool(addresses) and all(ipaddress.ip_address(address.split("%")[0]).is_loopback for address in addresses)
+
+
+def _is_loopback_host(host):
+    # matched literally, a name that resolves to loopback may be an attacker's domain rebound to it
+    hostname = urllib.parse.urlsplit("//" + host).hostname
+    if hostname == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(hostname).is_loopback
+    except ValueError:
+        return False
+
+
+def token_file(socket_path):
+    return socket_path + ".token"
+
+
+def write_token(filename):
+    token = secrets.token_hex(32)
+    # replaced rather than truncated, os.open only applies the mode to a file it creates
+    if os.path.lexists(filename):
+        os.remove(filename)
+    with os.fdopen(os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as f:
+        f.write(token)
+    return token
+
+
+def read_token(filename):
+    with open(filename) as f:
+        return f.read().strip()
+
+
+def create_server(runner, address, token):
+    # address is either a Unix socket path or a (host, port) tuple
+    if isinstance(address, tuple):
+        # jobs run signed in as the daemon's account, the token is the only thing keeping other local users out
+        if not is_loopback(address[0]):
+            raise ValueError("Refusing to serve jobs on '%s', only loopback hosts are allowed" % address[0])
+        server = ThreadingHTTPServer(address, _JobRequestHandler)
+    else:
+        # a socket left behind by a killed daemon is replaced, any other file is not
+        if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+            os.remove(address)
+        # the socket is created accessible to the owner only, there is no window before a chmod
+        umask = os.umask(0o077)
+        try:
+            server = _UnixHTTPServer(address, _JobRequestHandler)
+        finally:
+            os.umask(umask)
+    server.runner = runner
+    server.token = token
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path, timeout=None):
+        super(_UnixHTTPConnection, self).__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def submit_job(address, token, job_type, params=None, wait=False, timeout=None):
+    body = jsoncodec.dumps({"type": job_type, "params": params or {}})
+    return _call(address, token, "POST", "/jobs?wait=1" if wait else "/jobs", body, timeout)
+
+
+def get_job(address, token, job_id, timeout=None):
+    return _call(address, token, "GET", "/jobs/%s" % job_id, None, timeout)
+
+
+def _call(address, token, method, path, body, timeout):
+    if isinstance(address, tuple):
+        connection = http.client.HTTPConnection(*address, timeout=timeout)
+    else:
+        connection = _UnixHTTPConnection(address, timeout=timeout)
+    try:
+        headers = {"Authorization": "Bearer %s" % token}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        value = jsoncodec.loads(response.read())
+    finally:
+        connection.close()
+
+    if response.status >= 400:
+        raise DaemonError(response.status, value.get("error"))
+    return value
@@ -0,0 +1,186 @@
+import copy
+import mmap
+import os
+import struct
+
+from garminworkouts.fit import profile
+from garminworkouts.models.duration import Duration
+
+_STEP_TYPES = {
+    profile.INTENSITIES["warmup"]: "warmup",
+    profile.INTENSITIES["cooldown"]: "cooldown",
+    profile.INTENSITIES["recovery"]: "recovery",
+}
+
+_SPORTS = {sport_id: sport for sport, sport_id in profile.SPORTS.items()}
+
+
+class FitDecodeError(ValueError):
+    pass
+
+
+def decode_workout(data, check_crc=True):
+    with memoryview(data) as view:
+        workout, steps = _decode_messages(view, check_crc)
+
+    sport = _SPORTS.get(workout.get(profile.WORKOUT_SPORT))
+    config = {"name": workout.get(profile.WORKOUT_NAME, "")}
+    if sport:
+        config["sport"] = sport
+    config["steps"] = _steps_config(steps, sport)
+    return config
+
+
+def iter_decode_files(filenames, check_crc=True):
+    # files are mapped rather than read, only one of them is in memory at a time
+    for filename in filenames:
+        with open(filename, "rb") as f:
+            # an empty file can not be mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                raise FitDecodeError("Not a FIT file")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield filename, decode_workout(data, check_crc)
+
+
+def _decode_messages(view, check_crc):
+    if len(view) < 12 or view[8:12] != profile.DATA_TYPE:
+        raise FitDecodeError("Not a FIT file")
+
+    header_size = view[0]
+    (data_size,) = struct.unpack_from("<I", view, 4)
+    end = header_size + data_size
+    if len(view) < end + 2:
+        raise FitDecodeError("Truncated FIT file, expected %d bytes but was %d" % (end + 2, len(view)))
+    if check_crc and profile.crc16(view[:end + 2]) != 0:
+        raise FitDecodeError("FIT file CRC mismatch")
+
+    definitions = {}
+    workout = {}
+    steps = []
+    offset = header_size
+    while offset < end:
+        record_header = view[offset]
+        offset += 1
+
+        if record_header & profile.COMPRESSED_TIMESTAMP:
+            local_type = (record_header >> 5) & 0x03
+        elif record_header & profile.DEFINITION_MESSAGE:
+            local_type = record_header & profile.LOCAL_MESSAGE_TYPE_MASK
+            definitions[local_type], offset = _decode_definition(view, offset, record_header)
+            continue
+        else:
+            local_type = record_header & profile.LOCAL_MESSAGE_TYPE_MASK
+
+        if local_type not in definitions:
+            raise FitDecodeError("Data message without definition at offset %d" % (offset - 1))
+        global_message, message_struct, field_numbers, developer_size = definitions[local_type]
+
+        if global_message in (profile.WORKOUT_MESSAGE, profile.WORKOUT_STEP_MESSAGE):
+            values = message_struct.unpack_from(view, offset)
+            message = {number: value for number, value in zip(field_numbers, values) if number is not None}
+            if global_message == profile.WORKOUT_MESSAGE:
+                workout = message
+            else:
+                steps.append(message)
+        offset += message_struct.size + developer_size
+
+    steps.sort(key=lambda step: step.get(profile.STEP_MESSAGE_INDEX, 0))
+    return _decode_strings(workout), [_decode_strings(step) for step in steps]
+
+
+def _decode_definition(view, offset, record_header):
+    endian = ">" if view[offset + 1] else "<"
+    (global_message,) = struct.unpack_from(endian + "H", view, offset + 2)
+    number_of_fields = view[offset + 4]
+    offset += 5
+
+    formats = []
+    field_numbers = []
+    for _ in range(number_of_fields):
+        number, size, base_type = view[offset], view[offset + 1], view[offset + 2]
+        offset += 3
+        base_format = profile.BASE_TYPES.get(base_type, ("s", None))[0]
+        if base_format == "s" or struct.calcsize(base_format) != size:
+            # strings and arrays are kept as raw bytes
+            formats.append("%ds" % size)
+            field_numbers.append(number if base_format == "s" else None)
+        else:
+            formats.append(base_format)
+            field_numbers.append(number)
+
+    developer_size = 0
+    if record_header & profile.DEVELOPER_DATA:
+        number_of_developer_fields = view[offset]
+        offset += 1
+        developer_size = sum(view[offset + 1 + 3 * i] for i in range(number_of_developer_fields))
+        offset += 3 * number_of_developer_fields
+
+    return (global_message, struct.Struct(endian + "".join(formats)), field_numbers, developer_size), offset
+
+
+def _decode_strings(message):
+    return {
+        number: value.split(b"\0", 1)[0].decode("utf-8", "replace") if isinstance(value, bytes) else value
+        for number, value in message.items()
+    }
+
+
+def _steps_config(steps, sport):
+    # (message index, step config) pairs, repeat steps fold the preceding steps into a nested list
+    configs = []
+    for step in steps:
+        index = step.get(profile.STEP_MESSAGE_INDEX, len(configs))
+        if step.get(profile.STEP_DURATION_TYPE) == profile.DURATION_REPEAT_UNTIL_STEPS_COMPLETE:
+            first_index = step[profile.STEP_DURATION_VALUE]
+            group = [config for config_index, config in configs if config_index >= first_index]
+            configs = [(config_index, config) for config_index, config in configs if config_index < first_index]
+            repeats = max(step.get(profile.STEP_TARGET_VALUE, 1), 1)
+            # every repetition is a copy of its own, shared objects would be dumped as YAML anchors
+            configs.extend((first_index, copy.deepcopy(group)) for _ in range(repeats))
+        else:
+            configs.append((index, _step_config(step, sport)))
+    return [config for _, config in configs]
+
+
+def _step_config(step, sport):
+    config = {}
+    if sport == "running":
+        config["type"] = _STEP_TYPES.get(step.get(profile.STEP_INTENSITY), "run")
+
+    duration = _duration(step)
+    if duration:
+        config["duration"] = duration
+
+    low = step.get(profile.STEP_CUSTOM_TARGET_VALUE_LOW)
+    high = step.get(profile.STEP_CUSTOM_TARGET_VALUE_HIGH)
+    has_custom_target = low not in (None, 0xFFFFFFFF) and high not in (None, 0xFFFFFFFF)
+    target_type = step.get(profile.STEP_TARGET_TYPE)
+
+    if has_custom_target and target_type == profile.TARGET_POWER and low > profile.POWER_OFFSET:
+        config["power"] = "%dW" % round((low + high) / 2 - profile.POWER_OFFSET)
+    elif has_custom_target and target_type == profile.TARGET_SPEED and low > 0:
+        config["target"] = {"type": "pace", "min": _pace(high / 1000), "max": _pace(low / 1000)}
+
+    description = step.get(profile.STEP_NAME)
+    if description:
+        config["description"] = description
+    return config
+
+
+def _duration(step):
+    duration_type = step.get(profile.STEP_DURATION_TYPE)
+    value = step.get(profile.STEP_DURATION_VALUE)
+    if value is None or value == 0xFFFFFFFF:
+        return None
+    if duration_type == profile.DURATION_TIME:
+        return Duration.from_seconds(round(value / 1000)).duration
+    if duration_type == profile.DURATION_DISTANCE:
+        meters = value / 100
+        if meters >= 1000:
+            return "%gkm" % (meters / 1000)
+        return "%gm" % meters
+    return None
+
+
+def _pace(speed):
+    return Duration.from_seconds(round(1000 / speed)).duration
@@ -0,0 +1,155 @@
+import struct
+import time
+
+from garminworkouts.fit import profile
+
+_FILE_ID_FIELDS = (
+    (profile.FILE_ID_TYPE, 1, profile.ENUM),
+    (profile.FILE_ID_MANUFACTURER, 2, profile.UINT16),
+    (profile.FILE_ID_PRODUCT, 2, profile.UINT16),
+    (profile.FILE_ID_SERIAL_NUMBER, 4, profile.UINT32Z),
+    (profile.FILE_ID_TIME_CREATED, 4, profile.UINT32),
+)
+
+_STEP_FIELDS = (
+    (profile.STEP_MESSAGE_INDEX, 2, profile.UINT16),
+    (profile.STEP_DURATION_TYPE, 1, profile.ENUM),
+    (profile.STEP_DURATION_VALUE, 4, profile.UINT32),
+    (profile.STEP_TARGET_TYPE, 1, profile.ENUM),
+    (profile.STEP_TARGET_VALUE, 4, profile.UINT32),
+    (profile.STEP_CUSTOM_TARGET_VALUE_LOW, 4, profile.UINT32),
+    (profile.STEP_CUSTOM_TARGET_VALUE_HIGH, 4, profile.UINT32),
+    (profile.STEP_INTENSITY, 1, profile.ENUM),
+)
+
+_INVALID_ENUM = profile.BASE_TYPES[profile.ENUM][1]
+_INVALID_UINT32 = profile.BASE_TYPES[profile.UINT32][1]
+
+_FILE_ID_LOCAL_TYPE = 0
+_WORKOUT_LOCAL_TYPE = 1
+_WORKOUT_STEP_LOCAL_TYPE = 2
+
+
+def encode_workout(workout, time_created=None, serial_number=0, product=0):
+    if time_created is None:
+        time_created = int(time.time()) - profile.FIT_EPOCH
+
+    name = _encode_string(workout["workoutName"])
+    sport = profile.SPORTS.get(workout["sportType"]["sportTypeKey"], 0)
+    steps = _fit_steps(workout["workoutSegments"][0]["workoutSteps"], [])
+
+    workout_fields = (
+        (profile.WORKOUT_NAME, len(name), profile.STRING),
+        (profile.WORKOUT_SPORT, 1, profile.ENUM),
+        (profile.WORKOUT_NUM_VALID_STEPS, 2, profile.UINT16),
+    )
+    step_name_size = max((len(step[0]) for step in steps), default=0)
+    step_fields = _STEP_FIELDS + (((profile.STEP_NAME, step_name_size, profile.STRING),) if step_name_size > 1 else ())
+
+    file_id_struct = _message_struct(_FILE_ID_FIELDS)
+    workout_struct = _message_struct(workout_fields)
+    step_struct = _message_struct(step_fields)
+
+    data_size = (_definition_size(_FILE_ID_FIELDS) + 1 + file_id_struct.size
+                 + _definition_size(workout_fields) + 1 + workout_struct.size
+                 + _definition_size(step_fields) + (1 + step_struct.size) * len(steps))
+
+    # the whole file is written into one preallocated buffer, no intermediate byte strings
+    buffer = bytearray(profile.HEADER_SIZE + data_size + 2)
+    view = memoryview(buffer)
+
+    struct.pack_into("<BBHI4s", buffer, 0, profile.HEADER_SIZE, profile.PROTOCOL_VERSION, profile.PROFILE_VERSION,
+                     data_size, profile.DATA_TYPE)
+    struct.pack_into("<H", buffer, 12, profile.crc16(view[:12]))
+    offset = profile.HEADER_SIZE
+
+    offset = _pack_definition(buffer, offset, _FILE_ID_LOCAL_TYPE, profile.FILE_ID_MESSAGE, _FILE_ID_FIELDS)
+    offset = _pack_data(buffer, offset, _FILE_ID_LOCAL_TYPE, file_id_struct,
+                        (profile.FILE_TYPE_WORKOUT, profile.MANUFACTURER_DEVELOPMENT, product, serial_number,
+                         time_created))
+
+    offset = _pack_definition(buffer, offset, _WORKOUT_LOCAL_TYPE, profile.WORKOUT_MESSAGE, workout_fields)
+    offset = _pack_data(buffer, offset, _WORKOUT_LOCAL_TYPE, workout_struct, (name, sport, len(steps)))
+
+    offset = _pack_definition(buffer, offset, _WORKOUT_STEP_LOCAL_TYPE, profile.WORKOUT_STEP_MESSAGE, step_fields)
+    for message_index, (step_name, *values) in enumerate(steps):
+        fields = (message_index, *values, step_name) if step_name_size > 1 else (message_index, *values)
+        offset = _pack_data(buffer, offset, _WORKOUT_STEP_LOCAL_TYPE, step_struct, fields)
+
+    struct.pack_into("<H", buffer, offset, profile.crc16(view[:offset]))
+    return buffer
+
+
+def _fit_steps(workout_steps, fit_steps):
+    for step in workout_steps:
+        if step["type"] == "RepeatGroupDTO":
+            first_step_index = len(fit_steps)
+            _fit_steps(step["workoutSteps"], fit_steps)
+            fit_steps.append((b"", profile.DURATION_REPEAT_UNTIL_STEPS_COMPLETE, first_step_index, profile.TARGET_OPEN,
+                              step["numberOfIterations"], _INVALID_UINT32, _INVALID_UINT32, _INVALID_ENUM))
+        else:
+            fit_steps.append(_fit_step(step))
+    return fit_steps
+
+
+def _fit_step(step):
+    name = _encode_string(step.get("description") or "")
+    duration_type, duration_value = _fit_duration(step)
+    target_type, target_low, target_high = _fit_target(step)
+    intensity = profile.INTENSITIES.get(step["stepType"]["stepTypeKey"], 0)
+    return name, duration_type, duration_value, target_type, 0, target_low, target_high, intensity
+
+
+def _fit_duration(step):
+    condition = step["endCondition"]["conditionTypeKey"]
+    value = step.get("endConditionValue")
+    if condition == "time" and value is not None:
+        return profile.DURATION_TIME, round(value * 1000)
+    if condition == "distance" and value is not None:
+        return profile.DURATION_DISTANCE, round(value * 100)
+    return profile.DURATION_OPEN, _INVALID_UINT32
+
+
+def _fit_target(step):
+    target = step["targetType"]["workoutTargetTypeKey"]
+    values = (step.get("targetValueOne"), step.get("targetValueTwo"))
+    if None in values:
+        return profile.TARGET_OPEN, _INVALID_UINT32, _INVALID_UINT32
+    low, high = min(values), max(values)
+    if target == "power.zone":
+        return profile.TARGET_POWER, round(low) + profile.POWER_OFFSET, round(high) + profile.POWER_OFFSET
+    if target == "pace.zone":
+        # pace targets are speeds in m/s, FIT stores them scaled by 1000
+        return profile.TARGET_SPEED, round(low * 1000), round(high * 1000)
+    return profile.TARGET_OPEN, _INVALID_UINT32, _INVALID_UINT32
+
+
+def _encode_string(value):
+    encoded = value.encode("utf-8")[:profile.MAX_STRING_SIZE - 1]
+    return encoded.decode("utf-8", "ignore").encode("utf-8") + b"\0"
+
+
+def _message_struct(fields):
+    formats = [f"{size}s" if base_type == profile.STRING else profile.BASE_TYPES[base_type][0]
+               for _, size, base_type in fields]
+    return struct.Struct("<" + "".join(formats))
+
+
+def _definition_size(fields):
+    return 1 + 5 + 3 * len(fields)
+
+
+def _pack_definition(buffer, offset, local_type, global_message, fields):
+    struct.pack_into("<BBBHB", buffer, offset, profile.DEFINITION_MESSAGE | local_type, 0, 0, global_message,
+                     len(fields))
+    offset += 6
+    for field in fields:
+        struct.pack_into("<BBB", buffer, offset, *field)
+        offset += 3
+    return offset
+
+
+def _pack_data(buffer, offset, local_type, message_struct, values):
+    buffer[offset] = local_type
+    message_struct.pack_into(buffer, offset + 1, *values)
+    return offset + 1 + message_struct.size
@@ -0,0 +1,121 @@
+# Subset of the FIT SDK profile needed to encode and decode workout files.
+
+FIT_EPOCH = 631065600  # 1989-12-31T00:00:00Z as unix timestamp
+
+HEADER_SIZE = 14
+PROTOCOL_VERSION = 0x20
+PROFILE_VERSION = 2132
+DATA_TYPE = b".FIT"
+
+DEFINITION_MESSAGE = 0x40
+DEVELOPER_DATA = 0x20
+COMPRESSED_TIMESTAMP = 0x80
+LOCAL_MESSAGE_TYPE_MASK = 0x0F
+
+FILE_ID_MESSAGE = 0
+WORKOUT_MESSAGE = 26
+WORKOUT_STEP_MESSAGE = 27
+
+# base type id -> (struct format, invalid value)
+BASE_TYPES = {
+    0x00: ("B", 0xFF),  # enum
+    0x01: ("b", 0x7F),  # sint8
+    0x02: ("B", 0xFF),  # uint8
+    0x83: ("h", 0x7FFF),  # sint16
+    0x84: ("H", 0xFFFF),  # uint16
+    0x85: ("i", 0x7FFFFFFF),  # sint32
+    0x86: ("I", 0xFFFFFFFF),  # uint32
+    0x07: ("s", None),  # string
+    0x88: ("f", None),  # float32
+    0x89: ("d", None),  # float64
+    0x0A: ("B", 0x00),  # uint8z
+    0x8B: ("H", 0x0000),  # uint16z
+    0x8C: ("I", 0x00000000),  # uint32z
+    0x0D: ("B", 0xFF),  # byte
+    0x8E: ("q", 0x7FFFFFFFFFFFFFFF),  # sint64
+    0x8F: ("Q", 0xFFFFFFFFFFFFFFFF),  # uint64
+    0x90: ("Q", 0x0000000000000000),  # uint64z
+}
+
+ENUM = 0x00
+UINT16 = 0x84
+UINT32 = 0x86
+UINT32Z = 0x8C
+STRING = 0x07
+
+FILE_TYPE_WORKOUT = 5
+MANUFACTURER_DEVELOPMENT = 255
+
+# file_id fields
+FILE_ID_TYPE = 0
+FILE_ID_MANUFACTURER = 1
+FILE_ID_PRODUCT = 2
+FILE_ID_SERIAL_NUMBER = 3
+FILE_ID_TIME_CREATED = 4
+
+# workout fields
+WORKOUT_SPORT = 4
+WORKOUT_NUM_VALID_STEPS = 6
+WORKOUT_NAME = 8
+
+# workout_step fields
+STEP_NAME = 0
+STEP_DURATION_TYPE = 1
+STEP_DURATION_VALUE = 2
+STEP_TARGET_TYPE = 3
+STEP_TARGET_VALUE = 4
+STEP_CUSTOM_TARGET_VALUE_LOW = 5
+STEP_CUSTOM_TARGET_VALUE_HIGH = 6
+STEP_INTENSITY = 7
+STEP_MESSAGE_INDEX = 254
+
+SPORTS = {
+    "running": 1,
+    "cycling": 2,
+}
+
+DURATION_TIME = 0
+DURATION_DISTANCE = 1
+DURATION_OPEN = 5
+DURATION_REPEAT_UNTIL_STEPS_COMPLETE = 6
+
+TARGET_SPEED = 0
+TARGET_OPEN = 2
+TARGET_POWER = 4
+
+# custom power targets are offset by 1000, values below are power zones
+POWER_OFFSET = 1000
+
+INTENSITIES = {
+    "interval": 0,  # active
+    "rest": 1,
+    "warmup": 2,
+    "cooldown": 3,
+    "recovery": 4,
+}
+
+MAX_STRING_SIZE = 255
+
+
+def _crc_table():
+    nibble_table = [0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401,
+                    0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400]
+    table = []
+    for byte in range(256):
+        crc = 0
+        for nibble in (byte & 0x0F, byte >> 4):
+            tmp = nibble_table[crc & 0x0F]
+            crc = (crc >> 4) & 0x0FFF
+            crc = crc ^ tmp ^ nibble_table[nibble]
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data, crc=0):
+    table = _CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
@@ -0,0 +1,94 @@
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+from typing import NamedTuple, Optional
+
+from garminworkouts.utils import jsoncodec
+
+
+class CachedResponse(NamedTuple):
+    content: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    update_date: Optional[str] = None
+
+    def is_revalidatable(self):
+        return self.etag is not None or self.last_modified is not None
+
+
+class ResponseCache(object):
+
+    def __init__(self, max_entries=256, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        self._write(key, entry)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.directory is not None:
+            try:
+                os.remove(self._filename(key))
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _filename(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._filename(key), "rb") as f:
+                header, content = f.read().split(b"\n", 1)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        header = jsoncodec.loads(header)
+        if header.get("key") != key:
+            return None
+        return CachedResponse(content, header.get("etag"), header.get("last_modified"), header.get("update_date"))
+
+    def _write(self, key, entry):
+        if self.directory is None:
+            return
+        # one file per response, a metadata line followed by the raw body
+        header = jsoncodec.dumps({
+            "key": key,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "update_date": entry.update_date
+        })
+        fd, tmp_filename = tempfile.mkstemp(dir=self.directory, prefix=".response-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(header + b"\n" + entry.content)
+        os.replace(tmp_filename, self._filename(key))
@@ -1,7 +1,13 @@
-import json
+import os
 import sys
+import time
 
+from garminworkouts.garmin.cache import CachedResponse
+from garminworkouts.garmin.metrics import Metrics
 from garminworkouts.garmin.session import connect, disconnect
+from garminworkouts.models.workoutrecord import WorkoutRecord
+from garminworkouts.utils import jsoncodec
+from garminworkouts.utils.singleflight import SingleFlight
 
 
 class GarminClient(object):
@@ -12,21 +18,42 @@ class GarminClient(object):
         "nk": "NT"
     }
 
-    def __init__(self, connect_url, sso_url, username, password, cookie_jar):
+    _JSON_HEADERS = dict(_REQUIRED_HEADERS, **{"Content-Type": "application/json"})
+
+    def __init__(self, connect_url, sso_url, username, password, cookie_jar, metrics=None, pool_size=None,
+                 adapter=None, cache=None):
         self.connect_url = connect_url
         self.sso_url = sso_url
         self.username = username
         self.password = password
         self.cookie_jar = cookie_jar
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.pool_size = pool_size
+        self.adapter = adapter
+        self.cache = cache
+        self._in_flight = SingleFlight()
+        self._generation = 0
 
     def __enter__(self):
-        self.session = connect(self.connect_url, self.sso_url, self.username, self.password, self.cookie_jar)
+        self.session = connect(self.connect_url, self.sso_url, self.username, self.password, self.cookie_jar,
+                               metrics=self.metrics, pool_size=self.pool_size, adapter=self.adapter)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         disconnect(self.session)
 
     def list_workouts(self, batch_size=100):
+        for response_jsons in self._list_workout_pages(batch_size):
+            for response_json in response_jsons:
+                yield response_json
+
+    def list_workout_records(self, batch_size=100):
+        # only the fields needed to match workouts are kept, each page is released once projected
+        for response_jsons in self._list_workout_pages(batch_size):
+            for response_json in response_jsons:
+                yield WorkoutRecord.from_json(response_json)
+
+    def _list_workout_pages(self, batch_size):
         for start_index in range(0, sys.maxsize, batch_size):
 
             url = f"{self.connect_url}{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workouts"
@@ -34,54 +61,142 @@ class GarminClient(object):
                 "start": start_index,
                 "limit": batch_size
             }
-            response = self.session.get(url, headers=GarminClient._REQUIRED_HEADERS, params=params)
-            response.raise_for_status()
-
-            response_jsons = json.loads(response.text)
+            response_jsons = self._cached_get("list", url, params=params, decode=True, version=self._listing_version())
             if not response_jsons or response_jsons == []:
                 break
 
-            for response_json in response_jsons:
-                yield response_json
+            yield response_jsons
 
-    def get_workout(self, workout_id):
+    def get_workout(self, workout_id, update_date=None):
         url = f"{self.connect_url}{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/{workout_id}"
 
-        response = self.session.get(url, headers=GarminClient._REQUIRED_HEADERS)
-        response.raise_for_status()
-
-        return json.loads(response.text)
+        return self._cached_get("get", url, update_date=update_date, update_date_field="updateDate", decode=True)
 
-    def download_workout(self, workout_id, file):
+    def download_workout(self, workout_id, file, update_date=None):
         url = f"{self.connect_url}{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/FIT/{workout_id}"
 
-        response = self.session.get(url)
-        response.raise_for_status()
+        content = self._cached_get("download", url, headers={}, update_date=update_date)
 
         with open(file, "wb") as f:
-            f.write(response.content)
+            f.write(content)
 
     def save_workout(self, workout):
         url = f"{self.connect_url}{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout"
 
-        response = self.session.post(url, headers=GarminClient._REQUIRED_HEADERS, json=workout)
-        response.raise_for_status()
+        response = self._request("save", "POST", url, headers=GarminClient._JSON_HEADERS,
+                                 data=self._json_body(workout))
+
+        self._invalidate()
+
+        # the created workout, with its new id, is echoed back
+        return jsoncodec.loads(response.content) if response.content else None
 
     def update_workout(self, workout_id, workout):
         url = f"{self.connect_url}{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/{workout_id}"
 
-        response = self.session.put(url, headers=GarminClient._REQUIRED_HEADERS, json=workout)
-        response.raise_for_status()
+        self._request("update", "PUT", url, headers=GarminClient._JSON_HEADERS, data=self._json_body(workout))
+        self._invalidate(workout_id)
 
     def delete_workout(self, workout_id):
         url = f"{self.connect_url}{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/{workout_id}"
 
-        response = self.session.delete(url, headers=GarminClient._REQUIRED_HEADERS)
-        response.raise_for_status()
+        self._request("delete", "DELETE", url, headers=GarminClient._REQUIRED_HEADERS)
+        self._invalidate(workout_id)
 
     def schedule_workout(self, workout_id, date):
         url = f"{self.connect_url}{GarminClient._WORKOUT_SERVICE_ENDPOINT}/schedule/{workout_id}"
         json_data = {"date": date}
 
-        response = self.session.post(url, headers=GarminClient._REQUIRED_HEADERS, json=json_data)
+        self._request("schedule", "POST", url, headers=GarminClient._JSON_HEADERS, data=self._json_body(json_data))
+
+    @staticmethod
+    def _json_body(workout):
+        # payloads may come pre-serialized, e.g. the same bytes used to compute their content hash
+        if isinstance(workout, (bytes, bytearray)):
+            return workout
+        return jsoncodec.dumps(workout)
+
+    def _cached_get(self, endpoint, url, headers=_REQUIRED_HEADERS, params=None, update_date=None,
+                    update_date_field=None, decode=False, version=None):
+        key = self._cache_key(url, params, version)
+
+        # identical GETs running concurrently share one response, but never one started before a write of this client
+        (content, body), shared = self._in_flight.do((self._generation, key), lambda: self._get(
+            endpoint, key, url, headers, params, update_date, update_date_field, decode))
+        if shared:
+            self.metrics.increment("coalesced", endpoint)
+            # every caller gets a decoded body of its own
+            body = jsoncodec.loads(content) if decode else None
+        return body if decode else content
+
+    def _get(self, endpoint, key, url, headers, params, update_date, update_date_field, decode):
+        # the body is decoded at most once, for the caller and for its updateDate
+        if self.cache is None:
+            content = self._request(endpoint, "GET", url, headers=headers, params=params).content
+            return content, jsoncodec.loads(content) if decode else None
+
+        entry = self.cache.get(key)
+
+        # the updateDate from the listing tells whether a cached definition is still current without a request
+        if entry is not None and update_date is not None and entry.update_date == update_date:
+            self.metrics.increment("cache_hits", endpoint)
+            return entry.content, jsoncodec.loads(entry.content) if decode else None
+
+        conditional_headers = dict(headers)
+        if entry is not None and entry.etag is not None:
+            conditional_headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified is not None:
+            conditional_headers["If-Modified-Since"] = entry.last_modified
+
+        response = self._request(endpoint, "GET", url, headers=conditional_headers, params=params)
+        if response.status_code == 304 and entry is not None:
+            self.metrics.increment("cache_revalidated", endpoint)
+            return entry.content, jsoncodec.loads(entry.content) if decode else None
+
+        body = None
+        if decode or (update_date is None and update_date_field is not None):
+            body = jsoncodec.loads(response.content)
+        if update_date is None and update_date_field is not None:
+            update_date = body.get(update_date_field) if isinstance(body, dict) else None
+        entry = CachedResponse(response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                               update_date)
+        if entry.is_revalidatable() or entry.update_date is not None:
+            self.cache.put(key, entry)
+        return response.content, body
+
+    def _cache_key(self, url, params=None, version=None):
+        # responses differ per account, the query is part of the key e.g. for listing pages
+        query = "&".join("%s=%s" % item for item in sorted((params or {}).items()))
+        key = "%s %s?%s" % (self.username, url, query)
+        return key if version is None else "%s#%s" % (key, version)
+
+    def _listing_version(self):
+        # listing pages are cached under a version of the account's workouts, every write moves to a new one,
+        # also for other processes sharing the cache directory
+        if self.cache is None:
+            return None
+        entry = self.cache.get(self._cache_key("listing-version"))
+        return entry.content.decode() if entry is not None else "0"
+
+    def _invalidate(self, workout_id=None):
+        self._generation += 1
+        if self.cache is None:
+            return
+        self.cache.put(self._cache_key("listing-version"), CachedResponse(os.urandom(8).hex().encode()))
+        if workout_id is None:
+            return
+        for path in ("workout", "workout/FIT"):
+            url = f"{self.connect_url}{GarminClient._WORKOUT_SERVICE_ENDPOINT}/{path}/{workout_id}"
+            self.cache.invalidate(self._cache_key(url))
+
+    def _request(self, endpoint, method, url, **kwargs):
+        status = None
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = response.status_code
+        finally:
+            self.metrics.observe(endpoint, status, time.perf_counter() - start)
+
         response.raise_for_status()
+        return response
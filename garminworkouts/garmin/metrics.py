@@ -0,0 +1,119 @@
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Metrics(object):
+    _LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    _CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+    def __init__(self, latency_buckets=_LATENCY_BUCKETS):
+        self.latency_buckets = tuple(sorted(latency_buckets))
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._counters = {}
+
+    def observe(self, endpoint, status, seconds):
+        status = str(status) if status is not None else "error"
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    "statuses": {},
+                    "latency_count": 0,
+                    "latency_sum": 0.0,
+                    "latency_buckets": [0] * len(self.latency_buckets)
+                }
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            stats["latency_count"] += 1
+            stats["latency_sum"] += seconds
+            for i, bound in enumerate(self.latency_buckets):
+                if seconds <= bound:
+                    stats["latency_buckets"][i] += 1
+
+    def increment(self, counter, endpoint, value=1):
+        with self._lock:
+            key = (counter, endpoint)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {}
+            for endpoint, stats in self._endpoints.items():
+                snapshot[endpoint] = {
+                    "requests": stats["latency_count"],
+                    "statuses": dict(stats["statuses"]),
+                    "latency": {
+                        "count": stats["latency_count"],
+                        "sum": stats["latency_sum"],
+                        "buckets": dict(zip(self.latency_buckets, stats["latency_buckets"]))
+                    }
+                }
+            for (counter, endpoint), value in self._counters.items():
+                snapshot.setdefault(endpoint, {}).setdefault("counters", {})[counter] = value
+            return snapshot
+
+    def to_openmetrics(self):
+        snapshot = self.snapshot()
+        lines = [
+            "# TYPE garminworkouts_requests counter",
+            "# HELP garminworkouts_requests Garmin Connect requests by endpoint and HTTP status."
+        ]
+        for endpoint, stats in sorted(snapshot.items()):
+            for status, count in sorted(stats.get("statuses", {}).items()):
+                lines.append('garminworkouts_requests_total{endpoint="%s",status="%s"} %d' % (endpoint, status, count))
+
+        lines.append("# TYPE garminworkouts_request_duration_seconds histogram")
+        lines.append("# HELP garminworkouts_request_duration_seconds Garmin Connect request latency by endpoint.")
+        for endpoint, stats in sorted(snapshot.items()):
+            latency = stats.get("latency")
+            if not latency:
+                continue
+            for bound, count in latency["buckets"].items():
+                lines.append('garminworkouts_request_duration_seconds_bucket{endpoint="%s",le="%s"} %d'
+                             % (endpoint, bound, count))
+            lines.append('garminworkouts_request_duration_seconds_bucket{endpoint="%s",le="+Inf"} %d'
+                         % (endpoint, latency["count"]))
+            lines.append('garminworkouts_request_duration_seconds_count{endpoint="%s"} %d'
+                         % (endpoint, latency["count"]))
+            lines.append('garminworkouts_request_duration_seconds_sum{endpoint="%s"} %f'
+                         % (endpoint, latency["sum"]))
+
+        counters = sorted({counter for stats in snapshot.values() for counter in stats.get("counters", {})})
+        for counter in counters:
+            lines.append("# TYPE garminworkouts_%s counter" % counter)
+            for endpoint, stats in sorted(snapshot.items()):
+                value = stats.get("counters", {}).get(counter)
+                if value is not None:
+                    lines.append('garminworkouts_%s_total{endpoint="%s"} %d' % (counter, endpoint, value))
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, filename):
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.to_openmetrics())
+        os.replace(tmp_filename, filename)
+
+    def start_http_server(self, port, host="127.0.0.1"):
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_openmetrics().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", Metrics._CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -1,27 +1,92 @@
+import copy
 import os
 import re
+import threading
+import time
 from http import cookiejar
 
 import cloudscraper
+import requests
 
+from garminworkouts.utils.singleflight import SingleFlight, file_lock
 
-def connect(connect_url, sso_url, username, password, cookie_jar):
+
+_COMPRESSED_ENCODINGS = "gzip, deflate"
+
+# concurrent logins into the same account within the process
+_LOGINS = SingleFlight()
+
+
+def connect(connect_url, sso_url, username, password, cookie_jar, metrics=None, pool_size=None, adapter=None):
     session = cloudscraper.CloudScraper()
+    _configure_transport(session, pool_size, adapter)
     _load_cookie_jar(session, cookie_jar)
 
-    url = connect_url + "/modern/settings"
-    response = session.get(url, allow_redirects=False)
-    if response.status_code != 200:
-        _authenticate(session, connect_url, sso_url, username, password)
+    if _is_authenticated(session, connect_url):
+        return session
+
+    def login():
+        return _login(session, connect_url, sso_url, username, password, cookie_jar, metrics)
+
+    cookies, shared = _LOGINS.do((sso_url, username), login)
+    if shared:
+        # another thread logged in meanwhile, its cookies are reused instead of a second SSO sign in
+        for cookie in cookies:
+            session.cookies.set_cookie(copy.copy(cookie))
+        if metrics is not None:
+            metrics.increment("coalesced", "sso_auth")
 
     return session
 
 
+def account_cookie_jar(cookie_jar, username):
+    # every account signs in with its own cookies, accounts sharing one jar would pick up each other's session
+    if not cookie_jar:
+        return None
+    return "%s.%s" % (cookie_jar, re.sub(r"[^\w.@-]", "_", username))
+
+
+def _is_authenticated(session, connect_url):
+    response = session.get(connect_url + "/modern/settings", allow_redirects=False)
+    return response.status_code == 200
+
+
+def _login(session, connect_url, sso_url, username, password, cookie_jar, metrics):
+    # other processes sharing the cookie jar wait for one login, then pick up its cookies from the file
+    with file_lock(cookie_jar + ".lock" if cookie_jar else None):
+        if cookie_jar and os.path.isfile(cookie_jar):
+            session.cookies.load(ignore_discard=True, ignore_expires=True)
+            if _is_authenticated(session, connect_url):
+                if metrics is not None:
+                    metrics.increment("coalesced", "sso_auth")
+                return list(session.cookies)
+
+        _timed_authenticate(session, connect_url, sso_url, username, password, metrics)
+        _save_cookie_jar(session)
+        return list(session.cookies)
+
+
 def disconnect(session):
     _save_cookie_jar(session)
     session.close()
 
 
+def _configure_transport(session, pool_size, adapter):
+    session.headers["Accept-Encoding"] = _COMPRESSED_ENCODINGS
+    session.headers["Connection"] = "keep-alive"
+
+    if adapter is not None:
+        # pluggable transport, e.g. an HTTP/2 capable adapter
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    elif pool_size:
+        # resize pools of the mounted adapters in place, cloudscraper's https adapter carries its own TLS context
+        for mounted_adapter in session.adapters.values():
+            mounted_adapter._pool_connections = pool_size
+            mounted_adapter._pool_maxsize = pool_size
+            mounted_adapter.init_poolmanager(pool_size, pool_size, block=mounted_adapter._pool_block)
+
+
 def _load_cookie_jar(session, cookie_jar):
     if cookie_jar:
         session.cookies = cookiejar.LWPCookieJar(cookie_jar)
@@ -31,7 +96,33 @@ def _load_cookie_jar(session, cookie_jar):
 
 def _save_cookie_jar(session):
     if isinstance(session.cookies, cookiejar.LWPCookieJar):
-        session.cookies.save(ignore_discard=True, ignore_expires=True)
+        # replaced in one step, other processes load the jar without holding the lock
+        filename = session.cookies.filename
+        temporary = "%s.%d.%d.tmp" % (filename, os.getpid(), threading.get_ident())
+        # session cookies sign anyone in, the file is created private before they are written into it
+        if os.path.lexists(temporary):
+            os.remove(temporary)
+        os.close(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+        try:
+            session.cookies.save(temporary, ignore_discard=True, ignore_expires=True)
+            os.replace(temporary, filename)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+
+def _timed_authenticate(session, connect_url, sso_url, username, password, metrics):
+    status = None
+    start = time.perf_counter()
+    try:
+        # the status of the last request of the sign in, the one that completes it
+        status = _authenticate(session, connect_url, sso_url, username, password).status_code
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        raise
+    finally:
+        if metrics is not None:
+            metrics.observe("sso_auth", status, time.perf_counter() - start)
 
 
 def _authenticate(session, connect_url, sso_url, username, password):
@@ -53,6 +144,7 @@ def _authenticate(session, connect_url, sso_url, username, password):
 
     response = session.get(connect_url + "/modern", params={"ticket": auth_ticket})
     response.raise_for_status()
+    return response
 
 
 def _extract_auth_ticket(auth_response):
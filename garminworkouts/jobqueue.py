@@ -0,0 +1,268 @@
+import contextlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+import requests
+
+from garminworkouts.utils import jsoncodec
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    leased_until REAL,
+    worker TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, available_at);
+CREATE TABLE IF NOT EXISTS accounts (
+    account TEXT PRIMARY KEY,
+    served INTEGER NOT NULL
+);
+"""
+
+
+class QueuedJob(NamedTuple):
+    job_id: int
+    account: str
+    operation: str
+    payload: dict
+    priority: int
+    attempts: int
+
+
+class JobQueue(object):
+
+    def __init__(self, filename, lease_seconds=300, max_attempts=5, backoff=30, clock=time.time):
+        self.filename = filename
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._clock = clock
+        # autocommit, transactions are started explicitly, every process opens its own connection
+        self._db = sqlite3.connect(filename, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def enqueue(self, account, operation, payload, priority=0):
+        return self.enqueue_many([(account, operation, payload, priority)])[0]
+
+    def enqueue_many(self, jobs):
+        now = self._clock()
+        with self._transaction():
+            return [self._db.execute(
+                "INSERT INTO jobs (account, operation, payload, priority, status, available_at, created_at, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (account, operation, jsoncodec.dumps(payload), priority, QUEUED, now, now, now)).lastrowid
+                for account, operation, payload, priority in jobs]
+
+    def claim(self, worker):
+        now = self._clock()
+        with self._transaction():
+            while True:
+                # highest priority first, among equal priorities the account served longest ago, then FIFO
+                row = self._db.execute(
+                    "SELECT j.id, j.account, j.operation, j.payload, j.priority, j.attempts, j.status FROM jobs j "
+                    "LEFT JOIN accounts a ON a.account = j.account "
+                    "WHERE (j.status = ? AND j.available_at <= ?) OR (j.status = ? AND j.leased_until < ?) "
+                    "ORDER BY j.priority DESC, COALESCE(a.served, 0), j.id LIMIT 1",
+                    (QUEUED, now, LEASED, now)).fetchone()
+                if row is None:
+                    return None
+
+                job_id, account, operation, payload, priority, attempts, status = row
+                if status == LEASED and attempts >= self.max_attempts:
+                    # the workers holding it died every time, e.g. the job crashes the process
+                    self._db.execute("UPDATE jobs SET status = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                                     (DEAD, "Lease expired after %d attempts" % attempts, now, job_id))
+                    continue
+
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, leased_until = ?, worker = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (LEASED, now + self.lease_seconds, worker, now, job_id))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO accounts (account, served) "
+                    "VALUES (?, (SELECT COALESCE(MAX(served), 0) + 1 FROM accounts))", (account,))
+                return QueuedJob(job_id, account, operation, jsoncodec.loads(payload), priority, attempts + 1)
+
+    def complete(self, job, worker):
+        with self._transaction():
+            return self._update_leased(job, worker, "status = ?, leased_until = NULL, last_error = NULL", (DONE,))
+
+    def fail(self, job, worker, error, retry=True):
+        with self._transaction():
+            if retry and job.attempts < self.max_attempts:
+                available_at = self._clock() + self.backoff * 2 ** (job.attempts - 1)
+                return self._update_leased(job, worker, "status = ?, leased_until = NULL, available_at = ?, "
+                                                        "last_error = ?", (QUEUED, available_at, error))
+            return self._update_leased(job, worker, "status = ?, leased_until = NULL, last_error = ?",
+                                       (DEAD, error))
+
+    def renew(self, job, worker):
+        # a running job keeps its lease, it is taken over only once its worker stops renewing it
+        with self._transaction():
+            return self._update_leased(job, worker, "leased_until = ?", (self._clock() + self.lease_seconds,))
+
+    def counts(self):
+        return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def pending(self):
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, LEASED)).fetchone()[0]
+
+    def dead_letters(self):
+        rows = self._db.execute("SELECT id, account, operation, payload, priority, attempts, last_error FROM jobs "
+                                "WHERE status = ? ORDER BY id", (DEAD,)).fetchall()
+        return [(QueuedJob(job_id, account, operation, jsoncodec.loads(payload), priority, attempts), error)
+                for job_id, account, operation, payload, priority, attempts, error in rows]
+
+    def retry_dead(self):
+        now = self._clock()
+        with self._transaction():
+            return self._db.execute("UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? "
+                                    "WHERE status = ?", (QUEUED, now, now, DEAD)).rowcount
+
+    def purge(self):
+        with self._transaction():
+            return self._db.execute("DELETE FROM jobs WHERE status = ?", (DONE,)).rowcount
+
+    def _update_leased(self, job, worker, assignments, values):
+        # a worker whose lease expired and was taken over must not overwrite the outcome of the new owner
+        cursor = self._db.execute(
+            "UPDATE jobs SET %s, updated_at = ? WHERE id = ? AND status = ? AND worker = ? AND attempts = ?"
+            % assignments, values + (self._clock(), job.job_id, LEASED, worker, job.attempts))
+        return cursor.rowcount == 1
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # the write lock is taken up front, concurrent claims can not pick the same job
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+
+def default_worker_id():
+    return "%s:%d" % (socket.gethostname(), os.getpid())
+
+
+def is_retryable(error):
+    # client errors are not fixed by trying again, rate limiting and server or network errors may be
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, OSError)
+
+
+class QueueWorker(object):
+
+    def __init__(self, queue, handlers, workspace_factory, worker=None, poll_interval=1.0, sleep=time.sleep):
+        self.queue = queue
+        self.handlers = handlers
+        self.worker = worker or default_worker_id()
+        self.poll_interval = poll_interval
+        self._workspace_factory = workspace_factory
+        self._workspaces = {}
+        self._sleep = sleep
+
+    def run(self, until_empty=False):
+        processed = 0
+        while True:
+            job = self.run_once()
+            if job is not None:
+                processed += 1
+                continue
+            # jobs waiting for a retry or leased by other workers keep the queue busy
+            if until_empty and self.queue.pending() == 0:
+                return processed
+            self._sleep(self.poll_interval)
+
+    def run_once(self):
+        job = self.queue.claim(self.worker)
+        if job is None:
+            return None
+
+        handler = self.handlers.get(job.operation)
+        if handler is None:
+            self.queue.fail(job, self.worker, "Unknown operation '%s'" % job.operation, retry=False)
+            return job
+
+        workspace = None
+        try:
+            workspace = self._workspace(job.account)
+            if job.attempts > 1:
+                # an earlier attempt, possibly of another worker, may have changed the account before it failed
+                workspace.refresh()
+            with self._heartbeat(job):
+                handler(workspace, job.payload)
+        except Exception as e:
+            logging.exception("Job %s (%s for %s) failed, attempt %d", job.job_id, job.operation, job.account,
+                              job.attempts)
+            if workspace is not None and isinstance(e, requests.RequestException):
+                workspace.reset()
+            self.queue.fail(job, self.worker, "%s: %s" % (type(e).__name__, e), retry=is_retryable(e))
+            return job
+
+        self.queue.complete(job, self.worker)
+        return job
+
+    def close(self):
+        for workspace in self._workspaces.values():
+            workspace.close()
+        self._workspaces.clear()
+
+    @contextlib.contextmanager
+    def _heartbeat(self, job):
+        # sqlite connections are bound to their thread, the lease is renewed over a connection of its own
+        stopped = threading.Event()
+
+        def renew():
+            with JobQueue(self.queue.filename, self.queue.lease_seconds, clock=self.queue._clock) as queue:
+                while not stopped.wait(self.queue.lease_seconds / 3):
+                    if not queue.renew(job, self.worker):
+                        return
+
+        thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def _workspace(self, account):
+        # every account keeps its own session and catalog for the lifetime of the worker
+        workspace = self._workspaces.get(account)
+        if workspace is None:
+            workspace = self._workspaces[account] = self._workspace_factory(account)
+        return workspace
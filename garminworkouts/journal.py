@@ -0,0 +1,83 @@
+import contextlib
+import json
+import os
+import time
+
+
+class ImportJournal(object):
+    PLANNED = "planned"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, filename=None, resume=False):
+        self.filename = filename
+        self._statuses = {}
+        self._file = None
+
+        if filename is None:
+            # journaling disabled, operations are only tracked in memory
+            return
+
+        if resume:
+            self._replay()
+
+        self._file = open(filename, "a" if resume else "w")
+        if resume and self._file.tell() > 0 and not self._ends_with_newline():
+            self._file.write("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+    def is_done(self, operation, workout_name):
+        return self._statuses.get((operation, workout_name)) == ImportJournal.DONE
+
+    def pending(self):
+        return [key for key, status in self._statuses.items() if status != ImportJournal.DONE]
+
+    @contextlib.contextmanager
+    def operation(self, operation, workout_name):
+        self._append(operation, workout_name, ImportJournal.PLANNED)
+        try:
+            yield
+        except Exception as e:
+            self._append(operation, workout_name, ImportJournal.FAILED, error=str(e))
+            raise
+        self._append(operation, workout_name, ImportJournal.DONE)
+
+    def _append(self, operation, workout_name, status, **details):
+        self._statuses[(operation, workout_name)] = status
+        if not self._file:
+            return
+
+        entry = {"time": time.time(), "operation": operation, "workout": workout_name, "status": status}
+        entry.update(details)
+
+        # write-ahead: the entry must reach the disk before the next remote call
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _ends_with_newline(self):
+        with open(self.filename, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _replay(self):
+        if not os.path.isfile(self.filename):
+            return
+
+        with open(self.filename, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn write of the last entry after a crash
+                    continue
+                self._statuses[(entry["operation"], entry["workout"])] = entry["status"]
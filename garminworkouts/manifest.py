@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+
+from garminworkouts.config import configreader
+from garminworkouts.utils import jsoncodec
+
+MANIFEST_FORMAT = "garminworkouts-manifest/1"
+
+
+class BuildManifest(object):
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self._sources = {}
+        self._file_hashes = {}
+
+        if filename is not None and os.path.exists(filename):
+            with open(filename, "rb") as f:
+                manifest = jsoncodec.loads(f.read())
+            if manifest.get("format") != MANIFEST_FORMAT:
+                raise ValueError("Unsupported manifest format: %s" % manifest.get("format"))
+            self._sources = manifest["sources"]
+
+        self._payload_hashes = {name: payload_hash
+                                for source in self._sources.values()
+                                for name, payload_hash in source["payloads"].items()}
+
+    def file_hash(self, filename):
+        filename = os.path.normpath(filename)
+        if filename not in self._file_hashes:
+            try:
+                with open(filename, "rb") as f:
+                    self._file_hashes[filename] = hashlib.sha256(f.read()).hexdigest()
+            except FileNotFoundError:
+                self._file_hashes[filename] = None
+        return self._file_hashes[filename]
+
+    def invalidate(self):
+        # files are hashed once per build, a long running build forgets the hashes when files change
+        self._file_hashes.clear()
+
+    def digest(self, source, include_graph, parameters=None):
+        # Merkle digest, every file hashes its own content together with the digests of the files it includes
+        digests = {}
+
+        def node_digest(filename, path):
+            if filename in digests:
+                return digests[filename]
+            if filename in path:
+                raise ValueError("Include cycle: %s" % " -> ".join(path + (filename,)))
+            children = [node_digest(child, path + (filename,)) for child in include_graph.get(filename, ())]
+            digests[filename] = hashlib.sha256(
+                ("%s:%s" % (self.file_hash(filename), ",".join(children))).encode()).hexdigest()
+            return digests[filename]
+
+        source_digest = node_digest(os.path.normpath(source), ())
+        return hashlib.sha256(
+            ("%s:%s" % (source_digest, jsoncodec.content_hash(parameters))).encode()).hexdigest()
+
+    def is_fresh(self, source, parameters=None):
+        entry = self._sources.get(os.path.normpath(source))
+        if entry is None:
+            return False
+        return entry["digest"] == self.digest(source, entry["graph"], parameters)
+
+    def changed_sources(self, sources, parameters=None):
+        for source in sources:
+            if self.is_fresh(source, parameters):
+                continue
+            include_graph = {}
+            config = configreader.read_config(source, include_graph)
+            yield source, config, include_graph
+
+    def payload_hash(self, workout_name):
+        return self._payload_hashes.get(workout_name)
+
+    def record(self, source, include_graph, parameters, payload_hashes):
+        source = os.path.normpath(source)
+        previous = self._sources.get(source)
+        if previous is not None:
+            for name in previous["payloads"]:
+                self._payload_hashes.pop(name, None)
+
+        # only the part of the include graph reachable from the source is kept
+        graph = {}
+        stack = [source]
+        while stack:
+            filename = stack.pop()
+            if filename not in graph:
+                graph[filename] = list(include_graph.get(filename, ()))
+                stack.extend(graph[filename])
+
+        self._sources[source] = {
+            "digest": self.digest(source, graph, parameters),
+            "graph": graph,
+            "payloads": dict(payload_hashes)
+        }
+        self._payload_hashes.update(payload_hashes)
+
+    def directories(self):
+        # every directory holding a recorded source or a file included by one, includes may live outside the glob
+        return {os.path.dirname(filename) or os.curdir
+                for entry in self._sources.values() for filename in entry["graph"]}
+
+    def dependents(self, filename):
+        filename = os.path.normpath(filename)
+        return sorted(source for source, entry in self._sources.items() if filename in entry["graph"])
+
+    def save(self):
+        if self.filename is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=".manifest-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(jsoncodec.dumps({"format": MANIFEST_FORMAT, "sources": self._sources}))
+        os.replace(tmp_filename, self.filename)
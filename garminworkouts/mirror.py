@@ -0,0 +1,63 @@
+import collections
+import fnmatch
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from garminworkouts.utils import jsoncodec
+
+
+def select_records(records, workout_ids=(), name_pattern=None, select_all=False):
+    workout_ids = {str(workout_id) for workout_id in workout_ids}
+    for record in records:
+        if (select_all or str(record.workout_id) in workout_ids
+                or (name_pattern is not None and fnmatch.fnmatchcase(record.workout_name, name_pattern))):
+            yield record
+
+
+def changed_records(records, state):
+    # state maps workout ids to the updateDate of the last mirrored definition
+    for record in records:
+        if record.update_date is None or state.get(str(record.workout_id)) != record.update_date:
+            yield record
+
+
+def fetch_workouts(connection, workout_ids, workers=4, update_dates=None):
+    # keeps a bounded window of requests in flight and yields definitions in order as they complete
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = collections.deque()
+        for workout_id in workout_ids:
+            if update_dates is not None:
+                # lets a cached definition be used as long as the listing reports the same updateDate
+                future = executor.submit(connection.get_workout, workout_id, update_dates.get(workout_id))
+            else:
+                future = executor.submit(connection.get_workout, workout_id)
+            futures.append(future)
+            if len(futures) >= 2 * workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+def write_ndjson(workouts, f):
+    count = 0
+    for workout in workouts:
+        f.write(jsoncodec.dumps(workout))
+        f.write(b"\n")
+        count += 1
+    return count
+
+
+def read_state(filename):
+    if filename is None or not os.path.exists(filename):
+        return {}
+    with open(filename, "rb") as f:
+        return jsoncodec.loads(f.read())
+
+
+def write_state(filename, state):
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=".mirror-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(jsoncodec.dumps(state))
+    os.replace(tmp_filename, filename)
@@ -0,0 +1,204 @@
+import numpy as np
+
+from garminworkouts.models import quantity
+from garminworkouts.models.power import check_absolute_power, check_diff, check_ftp
+from garminworkouts.models.workout import Workout, RunningWorkout
+from garminworkouts.models.workoutindex import extract_external_id
+from garminworkouts.utils import functional, jsoncodec, math
+
+
+class RenderedWorkout(object):
+
+    def __init__(self, name, payload):
+        self.name = name
+        self.payload = payload
+
+    def get_workout_name(self):
+        return self.name
+
+    def get_external_id(self):
+        return extract_external_id(self.payload.get("description"))
+
+    def create_workout(self, workout_id=None, workout_owner_id=None):
+        return dict(self.payload, workoutId=workout_id, ownerId=workout_owner_id)
+
+    def create_workout_bytes(self, workout_id=None, workout_owner_id=None):
+        return jsoncodec.canonical_dumps(self.create_workout(workout_id, workout_owner_id))
+
+
+class WorkoutFanout(object):
+
+    def __init__(self, config, power_target_diff=0.05):
+        # the step tree is built once, only target values and the description depend on the athlete
+        structure = _CyclingStructure(config, power_target_diff)
+        self._structure = structure
+        self._payload = structure.create_workout()
+        self._power_target_diff = power_target_diff
+        self._target_steps = [step for step, _ in structure.targets]
+        self._target_powers = _PowerVector([power for _, power in structure.targets])
+
+        description_steps = [(structure._get_power(step), structure._get_duration(step))
+                             for step in functional.flatten(config["steps"])]
+        description_steps = [(power, duration) for power, duration in description_steps if power and duration]
+        self._description_powers = _PowerVector([quantity.parse_power(power.power) for power, _ in description_steps])
+        self._description_seconds = np.array([duration.to_seconds() for _, duration in description_steps], dtype=int)
+
+    def get_workout_name(self):
+        return self._structure.get_workout_name()
+
+    def target_values(self, ftps):
+        ftps = _ftp_vector(ftps)
+        low = self._target_powers.to_watts(ftps, -self._power_target_diff)
+        high = self._target_powers.to_watts(ftps, +self._power_target_diff)
+        return low, high
+
+    def descriptions(self, ftps):
+        ftps = _ftp_vector(ftps)
+        watts = self._description_powers.to_watts(ftps)
+        included = (watts != 0) & (self._description_seconds > 0)
+
+        if (included == included[:1]).all():
+            columns = included[0] if len(ftps) else np.zeros(len(self._description_seconds), dtype=bool)
+            seconds = np.full(len(ftps), self._description_seconds[columns].sum())
+            norm_pwr = math.normalized_power(np.repeat(watts[:, columns], self._description_seconds[columns], axis=1))
+        else:
+            # a step rounds to zero watts for some athletes only, their power series differ in length
+            seconds = np.array([self._description_seconds[row].sum() for row in included])
+            norm_pwr = np.array([math.normalized_power(np.repeat(watts[i, row], self._description_seconds[row]))
+                                 for i, row in enumerate(included)])
+
+        int_fct = math.intensity_factor(norm_pwr, ftps)
+        tss = math.training_stress_score(seconds, norm_pwr, ftps)
+        return [self._structure._tag_description("FTP %d, TSS %d, NP %d, IF %.2f" % values)
+                for values in zip(ftps, tss, norm_pwr, int_fct)]
+
+    def render(self, ftps):
+        low, high = self.target_values(ftps)
+        descriptions = self.descriptions(ftps)
+        rendered = []
+        for i, description in enumerate(descriptions):
+            values = {id(step): {"targetValueOne": one, "targetValueTwo": two}
+                      for step, one, two in zip(self._target_steps, low[i].tolist(), high[i].tolist())}
+            payload = _copy_payload(self._payload, values)
+            payload[Workout._WORKOUT_DESCRIPTION_FIELD] = description
+            rendered.append(RenderedWorkout(self.get_workout_name(), payload))
+        return rendered
+
+
+class RunningWorkoutFanout(object):
+
+    def __init__(self, config):
+        structure = _RunningStructure(config)
+        self._structure = structure
+        self._payload = structure.create_workout()
+        self._target_steps = structure.targets
+
+    def get_workout_name(self):
+        return self._structure.get_workout_name()
+
+    def render(self, target_paces):
+        targets = [[target if isinstance(target, dict) else target_pace.get(target)
+                    for _, target in self._target_steps] for target_pace in target_paces]
+        values_one = _pace_values(targets, "min")
+        values_two = _pace_values(targets, "max")
+
+        rendered = []
+        for athlete_targets, ones, twos in zip(targets, values_one, values_two):
+            values = {}
+            for (step, _), target, one, two in zip(self._target_steps, athlete_targets, ones, twos):
+                if target:
+                    values[id(step)] = {"targetType": RunningWorkout._RUNNING_PACE_TARGET_TYPE_KEY,
+                                        "targetValueOne": one, "targetValueTwo": two}
+                else:
+                    values[id(step)] = {"targetType": RunningWorkout._NO_TARGET_TYPE_KEY,
+                                        "targetValueOne": None, "targetValueTwo": None}
+            rendered.append(RenderedWorkout(self.get_workout_name(), _copy_payload(self._payload, values)))
+        return rendered
+
+
+class _PowerVector(object):
+
+    def __init__(self, powers):
+        self.values = np.array([power.value for power in powers], dtype=int)
+        self.is_watt = np.array([power.unit == quantity.WATT for power in powers], dtype=bool)
+
+    def to_watts(self, ftps, diff=0):
+        # same arithmetic and checks as Power.to_watts, broadcast over athletes (rows) and steps (columns)
+        absolute_power = np.where(self.is_watt, self.values, self.values * ftps[:, np.newaxis] / 100)
+        if absolute_power.size:
+            # the checked ranges are intervals, their bounds are checked for all values at once
+            check_ftp(ftps.min())
+            check_ftp(ftps.max())
+            check_diff(diff)
+            check_absolute_power(absolute_power.min())
+            check_absolute_power(absolute_power.max())
+        return np.rint(absolute_power * (1 + diff)).astype(int)
+
+
+class _CyclingStructure(Workout):
+
+    def __init__(self, config, power_target_diff):
+        super().__init__(config, None, power_target_diff)
+        self.targets = []
+
+    def _interval_step(self, step_config, child_step_id, step_order):
+        step = super()._interval_step(step_config, child_step_id, step_order)
+        power = self._get_power(step_config)
+        if power:
+            self.targets.append((step, quantity.parse_power(power.power)))
+        return step
+
+    def _target_value_one(self, step_config):
+        return None
+
+    def _target_value_two(self, step_config):
+        return None
+
+    def _generate_description(self):
+        return ""
+
+
+class _RunningStructure(RunningWorkout):
+
+    def __init__(self, config):
+        super().__init__(config, {})
+        self.targets = []
+
+    def _interval_step(self, step_config, child_step_id, step_order):
+        step = super()._interval_step(step_config, child_step_id, step_order)
+        if step_config.get("target"):
+            self.targets.append((step, step_config["target"]))
+        return step
+
+
+def _ftp_vector(ftps):
+    return np.asarray(ftps, dtype=int).reshape(-1)
+
+
+def _pace_values(targets, key):
+    # paces are converted to speed for all athletes at once, other targets are passed through
+    values = [[target[key] if target else None for target in athlete_targets] for athlete_targets in targets]
+    is_pace = [[bool(target) and target["type"].lower() == "pace" for target in athlete_targets]
+               for athlete_targets in targets]
+    seconds = np.array([[quantity.parse_time(str(value)).value if pace else 1 for value, pace in zip(*row)]
+                        for row in zip(values, is_pace)], dtype=float).reshape(len(targets), -1)
+    if (seconds == 0).any():
+        raise ZeroDivisionError("Pace must be longer than 0 seconds")
+    speeds = (1000.0 / seconds).tolist()
+    return [[speed if pace else value for speed, value, pace in zip(*row)] for row in zip(speeds, values, is_pace)]
+
+
+def _copy_payload(payload, values):
+    # steps without athlete specific values and all constant parts are shared between the rendered payloads
+    def copy_steps(steps):
+        copied = []
+        for step in steps:
+            if "workoutSteps" in step:
+                step = dict(step, workoutSteps=copy_steps(step["workoutSteps"]))
+            elif id(step) in values:
+                step = dict(step, **values[id(step)])
+            copied.append(step)
+        return copied
+
+    return dict(payload, workoutSegments=[dict(segment, workoutSteps=copy_steps(segment["workoutSteps"]))
+                                          for segment in payload["workoutSegments"]])
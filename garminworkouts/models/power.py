@@ -1,35 +1,33 @@
 from dataclasses import dataclass
 
+from garminworkouts.models.quantity import WATT, parse_power
+
 
 @dataclass(frozen=True)
 class Power:
     power: str
 
     def to_watts(self, ftp, diff=0):
-        if not 0 <= int(ftp) < 1000:
-            raise ValueError("FTP must be between 0 [W] and 999 [W] but was %s" % ftp)
+        check_ftp(ftp)
+        check_diff(diff)
+
+        power = parse_power(self.power)
+        absolute_power = power.value if power.unit == WATT else power.value * ftp / 100
+        check_absolute_power(absolute_power)
 
-        if not -1.0 < float(diff) < 1.0:
-            raise ValueError("Power diff must be between -0.99 and 0.99 but was %s" % diff)
+        return round(absolute_power * (1 + diff))
 
-        if self._has_watt():
-            absolute_power = int(self.power[:-1])
-        elif self._has_percent():
-            absolute_power = self._to_absolute(self.power[:-1], ftp)
-        else:
-            absolute_power = self._to_absolute(self.power, ftp)
 
-        if not 0 <= int(absolute_power) < 5000:
-            raise ValueError("Power must be between 0 [W] and 49999 [W] but was %s" % absolute_power)
+def check_ftp(ftp):
+    if not 0 <= int(ftp) < 1000:
+        raise ValueError("FTP must be between 0 [W] and 999 [W] but was %s" % ftp)
 
-        return round(absolute_power * (1 + diff))
 
-    def _has_watt(self):
-        return self.power.lower().endswith("w")
+def check_diff(diff):
+    if not -1.0 < float(diff) < 1.0:
+        raise ValueError("Power diff must be between -0.99 and 0.99 but was %s" % diff)
 
-    def _has_percent(self):
-        return self.power.lower().endswith("%")
 
-    @staticmethod
-    def _to_absolute(power, ftp):
-        return int(power) * ftp / 100
+def check_absolute_power(absolute_power):
+    if not 0 <= int(absolute_power) < 5000:
+        raise ValueError("Power must be between 0 [W] and 49999 [W] but was %s" % absolute_power)
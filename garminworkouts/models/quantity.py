@@ -0,0 +1,69 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+SECOND = "s"
+METER = "m"
+PERCENT = "%"
+WATT = "W"
+
+_METERS_PER_UNIT = {
+    "m": 1.0,
+    "km": 1000.0,
+    "mi": 1609.344,
+    "mile": 1609.344,
+}
+
+_DISTANCE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d*)?|\.\d+)\s*(km|m|mi|mile)s?\s*$", re.IGNORECASE)
+
+# libraries reuse a few dozen distinct literals, every one of them is parsed once
+_CACHE_SIZE = 4096
+
+
+class Quantity(NamedTuple):
+    value: float
+    unit: str
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_time(literal):
+    tokens = literal.split(":")
+    if not 1 <= len(tokens) <= 3:
+        raise ValueError("Unknown duration %s, expected format HH:MM:SS" % literal)
+
+    hours, minutes, seconds = [0] * (3 - len(tokens)) + [int(token) for token in tokens]
+    if not 0 <= seconds < 60:
+        raise ValueError("Seconds must be between 0 and 59 but was %s" % seconds)
+    if not 0 <= minutes < 60:
+        raise ValueError("Minutes must be between 0 and 59 but was %s" % minutes)
+    if not 0 <= hours < 24:
+        raise ValueError("Hours must be between 0 and 23 but was %s" % hours)
+
+    return Quantity(hours * 3600 + minutes * 60 + seconds, SECOND)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_distance(literal):
+    match = _DISTANCE_PATTERN.match(literal)
+    if not match:
+        raise ValueError("Unknown distance %s, expected format like 400m or 3.2km" % literal)
+    return Quantity(float(match.group(1)) * _METERS_PER_UNIT[match.group(2).lower()], METER)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_power(literal):
+    if literal.lower().endswith("w"):
+        return Quantity(int(literal[:-1]), WATT)
+    if literal.endswith("%"):
+        return Quantity(int(literal[:-1]), PERCENT)
+    return Quantity(int(literal), PERCENT)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_running_duration(literal):
+    # running steps end after a time or a distance, anything else means lap button press
+    if ":" in literal:
+        return parse_time(literal)
+    if "m" in literal.lower():
+        return parse_distance(literal)
+    return None
@@ -1,8 +1,10 @@
-import json
+import numpy as np
 
+from garminworkouts.models import quantity
 from garminworkouts.models.duration import Duration
 from garminworkouts.models.power import Power
-from garminworkouts.utils import functional, math
+from garminworkouts.models.workoutindex import check_external_id, external_id_tag
+from garminworkouts.utils import functional, jsoncodec, math
 
 
 class Workout(object):
@@ -36,7 +38,7 @@ class Workout(object):
             self._WORKOUT_ID_FIELD: workout_id,
             self._WORKOUT_OWNER_ID_FIELD: workout_owner_id,
             self._WORKOUT_NAME_FIELD: self.get_workout_name(),
-            self._WORKOUT_DESCRIPTION_FIELD: self._generate_description(),
+            self._WORKOUT_DESCRIPTION_FIELD: self._get_description(),
             "sportType": self._CYCLING_SPORT_TYPE,
             "workoutSegments": [
                 {
@@ -47,9 +49,16 @@ class Workout(object):
             ]
         }
 
+    def create_workout_bytes(self, workout_id=None, workout_owner_id=None):
+        return jsoncodec.canonical_dumps(self.create_workout(workout_id, workout_owner_id))
+
     def get_workout_name(self):
         return self.config["name"]
 
+    def get_external_id(self):
+        external_id = self.config.get("id")
+        return check_external_id(str(external_id)) if external_id is not None else None
+
     @staticmethod
     def extract_workout_id(workout):
         return workout[Workout._WORKOUT_ID_FIELD]
@@ -68,7 +77,7 @@ class Workout(object):
 
     @staticmethod
     def print_workout_json(workout):
-        print(json.dumps(functional.filter_empty(workout)))
+        print(jsoncodec.dumps(functional.filter_empty(workout, in_place=True)).decode())
 
     @staticmethod
     def print_workout_summary(workout):
@@ -77,12 +86,21 @@ class Workout(object):
         workout_description = Workout.extract_workout_description(workout)
         print("{0} {1:20} {2}".format(workout_id, workout_name, workout_description))
 
+    def _get_description(self):
+        return self._tag_description(self._generate_description())
+
+    def _tag_description(self, description):
+        external_id = self.get_external_id()
+        if external_id is None:
+            return description
+        return " ".join(part for part in (description, external_id_tag(external_id)) if part)
+
     def _generate_description(self):
         # TODO: calculate Time in Zones
         flatten_steps = functional.flatten(self.config["steps"])
 
-        seconds = 0
-        xs = []
+        powers = []
+        durations = []
 
         for step in flatten_steps:
             power = self._get_power(step)
@@ -91,8 +109,12 @@ class Workout(object):
             duration_secs = duration.to_seconds() if duration else None
 
             if power_watts and duration_secs:
-                seconds = seconds + duration_secs
-                xs = functional.concatenate(xs, functional.fill(power_watts, duration_secs))
+                powers.append(power_watts)
+                durations.append(duration_secs)
+
+        # the per-second power series is allocated once, growing it step by step copied it over and over
+        seconds = sum(durations)
+        xs = np.repeat(np.array(powers, dtype=int), np.array(durations, dtype=int))
 
         norm_pwr = math.normalized_power(xs)
         int_fct = math.intensity_factor(norm_pwr, self.ftp)
@@ -281,74 +303,57 @@ class RunningWorkout(Workout):
             return self._RECOVERY_STEP_TYPE 
         return self._INTERVAL_STEP_TYPE
     
-    def _str_is_time(self, string):
-        if ':' in string:
-            return True
-        return False
-    
-    def _str_to_seconds(self, time_string):
-        return Duration(str(time_string)).to_seconds()
-    
-    def _str_to_minutes(self, time_string):
-        return self._str_to_seconds(time_string) / 60.0
-
-    def _str_is_distance(self, string):
-        if 'm' in string.lower():
-            return True
-        return False
-    
-    def _str_to_meters(self, distance_string):
-        if 'km' in distance_string.lower():
-            return float(distance_string.lower().split('km')[0])*1000.0
-        return float(distance_string.lower().split('m')[0])
+    @staticmethod
+    def _get_running_duration(step_config):
+        duration = step_config.get("duration")
+        return quantity.parse_running_duration(str(duration)) if duration else None
 
     def _end_condition(self, step_config):
-        duration = step_config.get("duration")
-        if duration:
-            if self._str_is_time(duration):
-                return self._TIME_CONDITION_TYPE_KEY
-            if self._str_is_distance(duration):
-                return self._DISTANCE_CONDITION_TYPE_KEY
-        return self._LAP_BUTTON_CONDITION_TYPE_KEY
+        duration = self._get_running_duration(step_config)
+        if duration is None:
+            return self._LAP_BUTTON_CONDITION_TYPE_KEY
+        if duration.unit == quantity.SECOND:
+            return self._TIME_CONDITION_TYPE_KEY
+        return self._DISTANCE_CONDITION_TYPE_KEY
 
     def _end_condition_value(self, step_config):
-        duration = step_config.get("duration")
-        if duration:
-            if self._str_is_time(duration):
-                return self._str_to_seconds(duration)
-            if self._str_is_distance(duration):
-                return self._str_to_meters(duration)
-        return None
+        duration = self._get_running_duration(step_config)
+        return duration.value if duration else None
+
+    def _get_target(self, step_config):
+        target = step_config.get("target")
+        if not target:
+            return None
+        if isinstance(target, dict):
+            # inline target, e.g. {type: "pace", min: "4:35", max: "4:54"}
+            return target
+        if target not in self.target_pace:
+            return None
+        return self.target_pace[target]
 
     def _get_target_value(self, target, key):
-        target_type = self.target_pace[target]['type']
-        target_value = self.target_pace[target][key]
+        target_type = target['type']
+        target_value = target[key]
         if target_type.lower() == 'pace':
-            return 1000.0 / self._str_to_seconds(target_value)
+            return 1000.0 / quantity.parse_time(str(target_value)).value
         return target_value
 
     def _target_type(self, step_config):
-        target = step_config.get("target")
+        target = self._get_target(step_config)
         if not target:
             return self._NO_TARGET_TYPE_KEY
-        if target not in self.target_pace:
-            return self._NO_TARGET_TYPE_KEY
         return self._RUNNING_PACE_TARGET_TYPE_KEY
 
     def _target_value_one(self, step_config):
-        target = step_config.get("target")
+        target = self._get_target(step_config)
         if not target:
             return None
-        if target not in self.target_pace:
-            return None
         return self._get_target_value(target, key='min')
 
     def _target_value_two(self, step_config):
-        target = step_config.get("target")
+        target = self._get_target(step_config)
         if not target:
             return None
-        if target not in self.target_pace:
-            return None
         return self._get_target_value(target, key='max')
 
     def _generate_description(self):
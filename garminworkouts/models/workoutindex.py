@@ -0,0 +1,112 @@
+import re
+from collections import defaultdict
+
+# stable external ID embedded in the workout description, e.g. "FTP 250, TSS 60 [gw:sweet-spot-1]"
+_EXTERNAL_ID_PATTERN = re.compile(r"\[gw:(?P<external_id>[^\]\s]+)\]")
+
+
+def check_external_id(external_id):
+    # an id with whitespace or ] would be written into the tag but could not be read back from it
+    if not re.fullmatch(r"[^\]\s]+", external_id):
+        raise ValueError("Workout id must not be empty or contain whitespace or ']' but was '%s'" % external_id)
+    return external_id
+
+
+def external_id_tag(external_id):
+    return "[gw:%s]" % check_external_id(external_id)
+
+
+def extract_external_id(description):
+    match = _EXTERNAL_ID_PATTERN.search(description or "")
+    return match.group("external_id") if match else None
+
+
+class AmbiguousWorkoutError(LookupError):
+    def __init__(self, key, records):
+        super().__init__("%d workouts match '%s': %s" % (len(records), key, ", ".join(
+            str(record.workout_id) for record in records)))
+        self.key = key
+        self.records = records
+
+
+class WorkoutIndex(object):
+
+    def __init__(self, records=()):
+        self._by_id = {}
+        self._by_name = defaultdict(list)
+        self._by_owner = defaultdict(list)
+        self._by_external_id = defaultdict(list)
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __contains__(self, workout_id):
+        return workout_id in self._by_id
+
+    def add(self, record):
+        if record.workout_id in self._by_id:
+            self.remove(record.workout_id)
+
+        self._by_id[record.workout_id] = record
+        self._by_name[record.workout_name].append(record)
+        self._by_owner[record.owner_id].append(record)
+        external_id = extract_external_id(record.description)
+        if external_id is not None:
+            self._by_external_id[external_id].append(record)
+
+    def remove(self, workout_id):
+        record = self._by_id.pop(workout_id, None)
+        if record is None:
+            return None
+
+        WorkoutIndex._discard(self._by_name, record.workout_name, workout_id)
+        WorkoutIndex._discard(self._by_owner, record.owner_id, workout_id)
+        WorkoutIndex._discard(self._by_external_id, extract_external_id(record.description), workout_id)
+        return record
+
+    def by_id(self, workout_id):
+        return self._by_id.get(workout_id)
+
+    def by_name(self, workout_name):
+        return list(self._by_name.get(workout_name, ()))
+
+    def by_owner(self, owner_id):
+        return list(self._by_owner.get(owner_id, ()))
+
+    def by_external_id(self, external_id):
+        return list(self._by_external_id.get(external_id, ()))
+
+    def duplicates(self):
+        return {
+            "name": {key: list(records) for key, records in self._by_name.items() if len(records) > 1},
+            "external_id": {key: list(records) for key, records in self._by_external_id.items() if len(records) > 1}
+        }
+
+    def match(self, workout_name, external_id=None):
+        if external_id is not None:
+            records = self._by_external_id.get(external_id, ())
+            if len(records) > 1:
+                raise AmbiguousWorkoutError(external_id, records)
+            if records:
+                return records[0]
+
+        # fall back to the name, but never to a workout tagged with another external ID
+        records = [record for record in self._by_name.get(workout_name, ())
+                   if external_id is None or extract_external_id(record.description) in (None, external_id)]
+        if len(records) > 1:
+            raise AmbiguousWorkoutError(workout_name, records)
+        return records[0] if records else None
+
+    @staticmethod
+    def _discard(index, key, workout_id):
+        records = index.get(key)
+        if records is None:
+            return
+        records[:] = [record for record in records if record.workout_id != workout_id]
+        if not records:
+            del index[key]
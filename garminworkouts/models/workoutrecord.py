@@ -0,0 +1,19 @@
+from typing import NamedTuple, Optional
+
+
+class WorkoutRecord(NamedTuple):
+    workout_id: int
+    workout_name: str
+    owner_id: Optional[int] = None
+    description: Optional[str] = None
+    update_date: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, workout):
+        return cls(
+            workout["workoutId"],
+            workout["workoutName"],
+            workout.get("ownerId"),
+            workout.get("description"),
+            workout.get("updateDate")
+        )
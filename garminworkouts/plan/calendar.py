@@ -0,0 +1,67 @@
+import datetime
+import re
+
+import numpy as np
+
+try:
+    import zoneinfo
+except ImportError:  # Python < 3.9
+    zoneinfo = None
+
+
+class TrainingCalendar(object):
+    # e.g. "10km_8wtg_recovery_a": 8 weeks to go, "recovery_a" workout
+    WEEKS_TO_GO_PATTERN = r"(?P<wtg>\d+)wtg_(?P<workout>.+)$"
+
+    def __init__(self, anchor_date, day_offsets, name_pattern=WEEKS_TO_GO_PATTERN, rest_days=(), week_shifts=None,
+                 timezone=None):
+        if len(set(rest_days)) >= 7:
+            raise ValueError("At least one day of the week must not be a rest day")
+
+        self.anchor = np.datetime64(self._local_date(anchor_date, timezone), "D")
+        self.day_offsets = dict(day_offsets)
+        self.name_pattern = re.compile(name_pattern)
+        self.week_shifts = dict(week_shifts or {})
+        # numpy weekmask starts on Monday like date.weekday()
+        self.weekmask = [0 if day in rest_days else 1 for day in range(7)]
+        self._offsets = {}
+
+    def date(self, workout_name):
+        return self.dates([workout_name])[0]
+
+    def dates(self, workout_names):
+        # names are parsed once, dates of all workouts are computed with a single vectorized operation
+        offsets = [self._offset(workout_name) for workout_name in workout_names]
+        scheduled = [i for i, offset in enumerate(offsets) if offset is not None]
+
+        dates = [None] * len(offsets)
+        if scheduled:
+            days = self.anchor + np.array([offsets[i] for i in scheduled], dtype="timedelta64[D]")
+            days = np.busday_offset(days, 0, roll="forward", weekmask=self.weekmask)
+            for i, day in zip(scheduled, np.datetime_as_string(days, unit="D")):
+                dates[i] = str(day)
+        return dates
+
+    def _offset(self, workout_name):
+        if workout_name not in self._offsets:
+            self._offsets[workout_name] = self._parse_offset(workout_name)
+        return self._offsets[workout_name]
+
+    def _parse_offset(self, workout_name):
+        match = self.name_pattern.search(workout_name)
+        if not match or match.group("workout") not in self.day_offsets:
+            return None
+
+        groups = match.groupdict()
+        weeks_to_go = int(groups["wtg"]) if groups.get("wtg") is not None else 0
+        return -7 * weeks_to_go + self.day_offsets[match.group("workout")] + self.week_shifts.get(weeks_to_go, 0)
+
+    @staticmethod
+    def _local_date(anchor_date, timezone):
+        if isinstance(anchor_date, datetime.datetime):
+            if timezone:
+                if zoneinfo is None:
+                    raise ValueError("Time zones require Python 3.9 or newer")
+                anchor_date = anchor_date.astimezone(zoneinfo.ZoneInfo(timezone))
+            return anchor_date.date()
+        return anchor_date
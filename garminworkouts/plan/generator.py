@@ -0,0 +1,143 @@
+import logging
+
+import numpy as np
+
+from garminworkouts.models import quantity
+from garminworkouts.models.duration import Duration
+from garminworkouts.models.fanout import RunningWorkoutFanout, WorkoutFanout
+from garminworkouts.models.workout import Workout, RunningWorkout
+
+_TIME_RESOLUTION = 5  # seconds
+_DISTANCE_RESOLUTION = 10  # meters
+# errors of building a workout from its config, the same the compiler reports per workout
+_BUILD_ERRORS = (KeyError, TypeError, ValueError, AttributeError)
+
+
+class PlanGenerator(object):
+
+    def __init__(self, template):
+        self.name = template["name"]
+        self.weeks = int(template["weeks"])
+        self.workouts = template["workouts"]
+        self.progressions = {
+            name: self._progression(name, progression)
+            for name, progression in template.get("progressions", {}).items()
+        }
+
+    def configs(self):
+        # every workout is expanded for all weeks at once, quantities are scaled as vectors over weeks
+        configs = []
+        per_workout = [(key, self._expand_steps(workout["steps"])) for key, workout in self.workouts.items()]
+        for week in range(1, self.weeks + 1):
+            for key, steps_by_week in per_workout:
+                config = {
+                    "name": self.name.format(week=week, wtg=self.weeks - week + 1, workout=key),
+                    "steps": steps_by_week[week - 1]
+                }
+                description = self.workouts[key].get("description")
+                if description:
+                    config["description"] = description
+                configs.append(config)
+        return configs
+
+    def running_workouts(self, target_paces):
+        # every workout is built once and rendered for all athletes, the result is transposed to a plan per athlete
+        rendered = [_render(lambda: RunningWorkoutFanout(config), target_paces,
+                            lambda: [RunningWorkout(config, target_pace) for target_pace in target_paces])
+                    for config in self.configs()]
+        return [list(workouts) for workouts in zip(*rendered)] if rendered else [[] for _ in target_paces]
+
+    def cycling_workouts(self, ftps, target_power_diff=0.05):
+        rendered = [_render(lambda: WorkoutFanout(config, target_power_diff), ftps,
+                            lambda: [Workout(config, ftp, target_power_diff) for ftp in ftps])
+                    for config in self.configs()]
+        return [list(workouts) for workouts in zip(*rendered)] if rendered else [[] for _ in ftps]
+
+    def _progression(self, name, progression):
+        curve = progression.get("curve", "linear")
+        if "values" in progression:
+            factors = np.asarray(progression["values"], dtype=float)
+        elif curve == "linear":
+            factors = np.linspace(progression["start"], progression["end"], self.weeks)
+        elif curve == "geometric":
+            factors = np.geomspace(progression["start"], progression["end"], self.weeks)
+        else:
+            raise ValueError("Unknown curve '%s' of progression '%s', expected linear or geometric" % (curve, name))
+
+        if factors.shape != (self.weeks,):
+            raise ValueError("Progression '%s' must have %d values but has %d" % (name, self.weeks, factors.size))
+        return factors
+
+    def _factors(self, name):
+        if name is None:
+            return np.ones(self.weeks)
+        if name not in self.progressions:
+            raise ValueError("Unknown progression '%s'" % name)
+        return self.progressions[name]
+
+    def _expand_steps(self, steps):
+        # returns steps for every week: [week][step]
+        steps_by_week = [[] for _ in range(self.weeks)]
+        for step in steps:
+            if "repeat" in step:
+                self._expand_repeat(step, steps_by_week)
+            else:
+                for week_steps, week_step in zip(steps_by_week, self._expand_step(step)):
+                    week_steps.append(week_step)
+        return steps_by_week
+
+    def _expand_repeat(self, step, steps_by_week):
+        repeats = np.maximum(np.rint(step["repeat"] * self._factors(step.get("scale"))), 1).astype(int)
+        groups = self._expand_steps(step["steps"])
+        for week_steps, group, week_repeats in zip(steps_by_week, groups, repeats):
+            # the same group repeated is turned into a repeat step by Workout
+            week_steps.extend([group] * int(week_repeats))
+
+    def _expand_step(self, step):
+        step = dict(step)
+        scale = step.pop("scale", None)
+        if isinstance(scale, str):
+            scale = {"duration": scale}
+        scale = scale or {}
+
+        columns = {}
+        if "duration" in scale and "duration" in step:
+            columns["duration"] = self._scale_duration(str(step["duration"]), self._factors(scale["duration"]))
+        if "power" in scale and "power" in step:
+            columns["power"] = self._scale_power(str(step["power"]), self._factors(scale["power"]))
+
+        week_steps = []
+        for week in range(self.weeks):
+            week_step = dict(step)
+            for key, values in columns.items():
+                week_step[key] = values[week]
+            week_steps.append(week_step)
+        return week_steps
+
+    @staticmethod
+    def _scale_duration(duration, factors):
+        if ":" in duration or duration.isdigit():
+            seconds = quantity.parse_time(duration).value
+            scaled = np.rint(seconds * factors / _TIME_RESOLUTION).astype(int) * _TIME_RESOLUTION
+            return [Duration.from_seconds(value).duration for value in scaled]
+
+        meters = quantity.parse_distance(duration).value
+        scaled = np.rint(meters * factors / _DISTANCE_RESOLUTION).astype(int) * _DISTANCE_RESOLUTION
+        return ["%gkm" % (value / 1000) if value >= 1000 else "%dm" % value for value in scaled]
+
+    @staticmethod
+    def _scale_power(power, factors):
+        suffix = power[-1] if power[-1] in "wW%" else ""
+        value = float(power[:-1] if suffix else power)
+        return ["%d%s" % (scaled, suffix) for scaled in np.rint(value * factors).astype(int)]
+
+
+def _render(build_fanout, athletes, build_workouts):
+    # only the step tree is built from the config, e.g. a workout of the other sport in a mixed plan can not be,
+    # it is built per athlete and fails only once created; errors of rendering the targets are raised as they are
+    try:
+        fanout = build_fanout()
+    except _BUILD_ERRORS as e:
+        logging.debug("Building workout per athlete, %s: %s", type(e).__name__, e)
+        return build_workouts()
+    return fanout.render(athletes)
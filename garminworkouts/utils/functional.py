@@ -4,26 +4,80 @@ import numpy as np
 def flatten(xs):
     if not xs:
         return xs
-    if isinstance(xs[0], list):
-        return flatten(xs[0]) + flatten(xs[1:])
-    return xs[:1] + flatten(xs[1:])
+    # explicit stack of iterators, recursing over list tails copied the list per step and hit the recursion limit
+    flat = []
+    stack = [iter(xs)]
+    while stack:
+        for x in stack[-1]:
+            if isinstance(x, list):
+                stack.append(iter(x))
+                break
+            flat.append(x)
+        else:
+            stack.pop()
+    return flat
 
 
 def fill(x, n):
     return np.full(n, x)
 
 
-def filter_empty(value):
-    if isinstance(value, list):
-        return [filter_empty(val) for val in value if not (val is None or val == [] or val == {})]
-    elif isinstance(value, dict):
-        return {
-            key: filter_empty(val)
-            for key, val in value.items()
-            if not (val is None or val == [] or val == {})
-        }
-    else:
+def filter_empty(value, in_place=False):
+    if not isinstance(value, (list, dict)):
         return value
+    if in_place:
+        return _filter_empty_in_place(value)
+    return _filter_empty_copy(value)
+
+
+def iter_filter_empty(values, in_place=False):
+    for value in values:
+        yield filter_empty(value, in_place)
+
+
+def _is_empty(value):
+    return value is None or (isinstance(value, (list, dict)) and not value)
+
+
+def _filter_empty_copy(value):
+    # explicit stack instead of recursion, deeply nested repeat groups must not hit the recursion limit
+    root = {} if isinstance(value, dict) else []
+    stack = [(value, root)]
+
+    def copy_of(val):
+        if isinstance(val, dict):
+            copy = {}
+        elif isinstance(val, list):
+            copy = []
+        else:
+            return val
+        stack.append((val, copy))
+        return copy
+
+    while stack:
+        source, target = stack.pop()
+        if isinstance(source, dict):
+            for key, val in source.items():
+                if not _is_empty(val):
+                    target[key] = copy_of(val)
+        else:
+            target.extend(copy_of(val) for val in source if not _is_empty(val))
+    return root
+
+
+def _filter_empty_in_place(value):
+    stack = [value]
+    while stack:
+        container = stack.pop()
+        if isinstance(container, dict):
+            for key in [key for key, val in container.items() if _is_empty(val)]:
+                del container[key]
+            children = container.values()
+        else:
+            container[:] = [val for val in container if not _is_empty(val)]
+            children = container
+        stack.extend(val for val in children if isinstance(val, (list, dict)))
+    return value
 
 
 def concatenate(x, y):
@@ -0,0 +1,54 @@
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+
+    def dumps(value):
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    loads = orjson.loads
+
+elif ujson is not None:
+    BACKEND = "ujson"
+
+    def dumps(value):
+        return ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False).encode()
+
+    loads = ujson.loads
+
+else:
+    BACKEND = "json"
+
+    def dumps(value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+    loads = json.loads
+
+
+def canonical_dumps(value):
+    # hashed output, backends differ in float and escaping details so it is always encoded by the standard library
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=_numpy_default).encode()
+
+
+def _numpy_default(value):
+    # numpy scalars and arrays, like the fast backends serialize them
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError("Object of type %s is not JSON serializable" % type(value).__name__)
+
+
+def content_hash(data):
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = canonical_dumps(data)
+    return hashlib.sha256(data).hexdigest()
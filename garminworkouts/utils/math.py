@@ -2,11 +2,20 @@ import numpy as np
 
 
 def moving_average(x, n):
-    return np.convolve(x, np.ones((n,)) / n, mode="valid")
+    # window sums from cumulative sums stay exact for whole watts, rows of a 2D array are averaged independently
+    x = np.asarray(x, dtype=float)
+    if x.shape[-1] == 0:
+        raise ValueError("x cannot be empty")
+    if x.shape[-1] < n:
+        # like convolution in valid mode, a series shorter than the window is averaged over the whole window
+        return np.repeat(x.sum(axis=-1, keepdims=True) / n, n - x.shape[-1] + 1, axis=-1)
+
+    cumsum = np.concatenate((np.zeros(x.shape[:-1] + (1,)), np.cumsum(x, axis=-1)), axis=-1)
+    return (cumsum[..., n:] - cumsum[..., :-n]) / n
 
 
 def normalized_power(x):
-    return np.sqrt(np.sqrt(np.mean(moving_average(x, 30) ** 4)))
+    return np.sqrt(np.sqrt(np.mean(moving_average(x, 30) ** 4, axis=-1)))
 
 
 def intensity_factor(norm_pwr, ftp):
@@ -0,0 +1,114 @@
+import contextlib
+import linecache
+import tracemalloc
+
+# tracemalloc.reset_peak() is new in Python 3.9
+_reset_peak = getattr(tracemalloc, "reset_peak", None)
+
+
+class PhaseReport(object):
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.peak = start
+        self.retained = 0
+        self.top_sites = []
+
+
+class MemoryProfiler(object):
+
+    def __init__(self, top=10, frames=1):
+        self.top = top
+        self.frames = frames
+        self.phases = []
+        self._open = []
+        self._started = False
+        self._last_peak = 0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+        self._last_peak = tracemalloc.get_traced_memory()[1]
+
+    def stop(self):
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if not tracemalloc.is_tracing():
+            yield None
+            return
+
+        self._checkpoint()
+        before = self._snapshot()
+        # the peak reached while taking the snapshot is not part of the phase
+        self._reset()
+        report = PhaseReport(name, tracemalloc.get_traced_memory()[0])
+        self._open.append(report)
+        try:
+            yield report
+        finally:
+            self._checkpoint()
+            self._open.remove(report)
+            report.retained = tracemalloc.get_traced_memory()[0] - report.start
+            report.top_sites = self._snapshot().compare_to(before, "lineno")[:self.top]
+            self.phases.append(report)
+
+    def format_report(self):
+        lines = []
+        for report in self.phases:
+            lines.append("%s: peak %s, retained %s" % (report.name, _format_size(report.peak),
+                                                       _format_size(report.retained, sign=True)))
+            for stat in report.top_sites:
+                frame = stat.traceback[0]
+                lines.append("  %s:%d: %s in %+d blocks  %s" % (
+                    frame.filename, frame.lineno, _format_size(stat.size_diff, sign=True), stat.count_diff,
+                    linecache.getline(frame.filename, frame.lineno).strip()))
+        return "\n".join(lines)
+
+    def _checkpoint(self):
+        # nested phases share one tracemalloc peak, fold it into every open phase before it is reset
+        current, peak = tracemalloc.get_traced_memory()
+        if _reset_peak is None and peak <= self._last_peak:
+            # without reset_peak only a new overall peak is known to be reached since the last checkpoint,
+            # otherwise the phase peak is at least the current size
+            peak = current
+        for report in self._open:
+            report.peak = max(report.peak, peak)
+        self._reset()
+
+    def _reset(self):
+        if _reset_peak is not None:
+            _reset_peak()
+        self._last_peak = tracemalloc.get_traced_memory()[1]
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ))
+
+
+def _format_size(size, sign=False):
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            break
+        value /= 1024
+    else:
+        unit = "GiB"
+    return ("%+.1f %s" if sign else "%.1f %s") % (value, unit)
@@ -0,0 +1,62 @@
+import contextlib
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        # the first caller of a key runs fn, callers arriving while it runs wait and share its outcome
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+@contextlib.contextmanager
+def file_lock(filename):
+    # exclusive lock between processes, nothing to lock without a file or on platforms without fcntl
+    if filename is None or fcntl is None:
+        yield
+        return
+
+    with open(filename, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,114 @@
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from garminworkouts.config import configreader
+from garminworkouts.models.workout import Workout, RunningWorkout
+from garminworkouts.models.workoutindex import check_external_id
+from garminworkouts.utils import functional
+
+# Garmin Connect refuses workouts with more steps, repeat groups included
+MAX_WORKOUT_STEPS = 50
+
+
+def shard_files(files, shard_index, shard_count):
+    # a file stays in its shard when others are added or removed, shards are stable across builds
+    if not 0 <= shard_index < shard_count:
+        raise ValueError("Shard must be between 0 and %d but was %d" % (shard_count - 1, shard_index))
+    return [file for file in files if zlib.crc32(file.replace("\\", "/").encode()) % shard_count == shard_index]
+
+
+def validate_files(files, ftp=250, target_pace=None, processes=1):
+    if processes <= 1:
+        return [validate_file(file, ftp, target_pace) for file in files]
+
+    chunksize = max(1, len(files) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(validate_file, files, [ftp] * len(files), [target_pace] * len(files),
+                                 chunksize=chunksize))
+
+
+def validate_file(file, ftp=250, target_pace=None):
+    result = {"file": file, "workouts": 0, "errors": []}
+
+    try:
+        config = configreader.read_config(file)
+    except (OSError, yaml.YAMLError) as e:
+        result["errors"].append(_error(None, "%s: %s" % (type(e).__name__, e)))
+        return result
+
+    for workout_config in (config if isinstance(config, list) else [config]):
+        result["workouts"] += 1
+        result["errors"].extend(validate_workout(workout_config, ftp, target_pace))
+    return result
+
+
+def validate_workout(config, ftp=250, target_pace=None):
+    errors = _validate_schema(config)
+    if errors:
+        return errors
+
+    name = config["name"]
+    flatten_steps = functional.flatten(config["steps"])
+    running = any("type" in step or "target" in step for step in flatten_steps)
+    if running and target_pace is not None:
+        for step in flatten_steps:
+            target = step.get("target")
+            if isinstance(target, str) and target not in target_pace:
+                errors.append(_error(name, "Unknown pace target '%s'" % target))
+
+    try:
+        if running:
+            payload = RunningWorkout(config, target_pace or {}).create_workout()
+        else:
+            payload = Workout(config, ftp, 0.05).create_workout()
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        errors.append(_error(name, "%s: %s" % (type(e).__name__, e)))
+        return errors
+
+    step_count = _count_steps(payload["workoutSegments"][0]["workoutSteps"])
+    if step_count > MAX_WORKOUT_STEPS:
+        errors.append(_error(name, "Workout has %d steps, Garmin Connect allows at most %d"
+                             % (step_count, MAX_WORKOUT_STEPS)))
+    return errors
+
+
+def _validate_schema(config):
+    if not isinstance(config, dict):
+        return [_error(None, "Workout must be a mapping but was %s" % type(config).__name__)]
+
+    name = config.get("name")
+    errors = []
+    if not isinstance(name, str) or not name:
+        errors.append(_error(name, "Workout name is missing"))
+
+    if config.get("id") is not None:
+        try:
+            check_external_id(str(config["id"]))
+        except ValueError as e:
+            errors.append(_error(name, str(e)))
+
+    steps = config.get("steps")
+    if not isinstance(steps, list) or not steps:
+        errors.append(_error(name, "Workout steps are missing"))
+        return errors
+
+    for step in functional.flatten(steps):
+        if not isinstance(step, dict):
+            errors.append(_error(name, "Step must be a mapping but was %r" % (step,)))
+    return errors
+
+
+def _count_steps(steps):
+    count = 0
+    stack = list(steps)
+    while stack:
+        step = stack.pop()
+        count += 1
+        stack.extend(step.get("workoutSteps", ()))
+    return count
+
+
+def _error(workout_name, message):
+    return {"workout": workout_name, "message": message}
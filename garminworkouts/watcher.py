@@ -0,0 +1,113 @@
+import os
+import time
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+WORKOUT_FILE_SUFFIXES = (".yaml", ".yml", ".xlsx", ".xls")
+
+
+class PollingWatcher(object):
+
+    def __init__(self, directories, interval=1.0):
+        self.directories = [os.path.normpath(directory) for directory in directories]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def poll(self, timeout=None):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            snapshot = self._scan()
+            changed = {filename for filename in snapshot.keys() | self._snapshot.keys()
+                       if snapshot.get(filename) != self._snapshot.get(filename)}
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            sleep = self.interval if deadline is None else min(self.interval, max(0, deadline - time.monotonic()))
+            time.sleep(sleep)
+
+    def add_directories(self, directories):
+        directories = [os.path.normpath(directory) for directory in directories]
+        self.directories.extend(directories)
+        # files already there are not reported as changed, only what changes from now on
+        self._snapshot.update(self._scan(directories))
+
+    def close(self):
+        pass
+
+    def _scan(self, directories=None):
+        snapshot = {}
+        for directory in (directories if directories is not None else self.directories):
+            for root, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+
+class InotifyWatcher(object):
+
+    def __init__(self, directories):
+        self._inotify = inotify_simple.INotify()
+        flags = inotify_simple.flags
+        self._mask = (flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE | flags.DELETE)
+        self._directories = {}
+        self.add_directories(directories)
+
+    def poll(self, timeout=None):
+        timeout_ms = int(timeout * 1000) if timeout is not None else None
+        changed = set()
+        for event in self._inotify.read(timeout=timeout_ms):
+            directory = self._directories.get(event.wd)
+            if directory is None or not event.name:
+                continue
+            path = os.path.join(directory, event.name)
+            if event.mask & inotify_simple.flags.ISDIR:
+                if event.mask & (inotify_simple.flags.CREATE | inotify_simple.flags.MOVED_TO):
+                    # new directories are watched too, files written into them before are picked by the next scan
+                    self._add_watch(path)
+                continue
+            changed.add(path)
+        return changed
+
+    def add_directories(self, directories):
+        for directory in directories:
+            for root, _, _ in os.walk(directory):
+                self._add_watch(root)
+
+    def close(self):
+        self._inotify.close()
+
+    def _add_watch(self, directory):
+        directory = os.path.normpath(directory)
+        self._directories[self._inotify.add_watch(directory, self._mask)] = directory
+
+
+def create_watcher(directories, interval=1.0):
+    if inotify_simple is not None:
+        try:
+            return InotifyWatcher(directories)
+        except OSError:
+            # e.g. inotify watch limit reached or unsupported file system
+            pass
+    return PollingWatcher(directories, interval)
+
+
+def wait_for_changes(watcher, debounce=0.5, suffixes=WORKOUT_FILE_SUFFIXES):
+    # an editor save or a git checkout is a burst of events, wait until the files are quiet
+    changed = set()
+    while not changed:
+        changed = {path for path in watcher.poll() if path.endswith(suffixes)}
+    while True:
+        more = watcher.poll(debounce)
+        if not more:
+            return changed
+        changed.update(path for path in more if path.endswith(suffixes))
@@ -5,7 +5,11 @@ import os
 
 from garminworkouts.config import configreader
 from garminworkouts.garmin.garminclient import GarminClient
-from garminworkouts.models.workout import Workout, RunningWorkout
+from garminworkouts.garmin.session import account_cookie_jar
+from garminworkouts.journal import ImportJournal
+from garminworkouts.models.workout import RunningWorkout
+from garminworkouts.models.workoutindex import AmbiguousWorkoutError, WorkoutIndex
+from garminworkouts.plan.calendar import TrainingCalendar
 from garminworkouts.utils.validators import writeable_dir
 from getpass import getpass
 import datetime
@@ -17,9 +21,19 @@ class WorkoutExporter:
     __CONNECT_URL = "https://connect.garmin.com"
     __SSO_URL = "https://sso.garmin.com"
 
-    def __init__(self, username, password):
+    __WORKOUT_SCHEDULE = {
+        'recovery_a': 1,
+        'speed_a': 2,
+        'recovery_b': 3,
+        'speed_b': 4,
+        'long': 5,
+    }
+
+    def __init__(self, username, password, metrics=None, cookie_jar='.garmin-cookies.txt'):
         self.__username = username
         self.__password = password
+        self.__cookie_jar = cookie_jar
+        self.metrics = metrics
         
     def __get_garmin_client(self,)->GarminClient:
 
@@ -28,8 +42,8 @@ class WorkoutExporter:
             sso_url=WorkoutExporter.__SSO_URL,
             username = self.__username,
             password = self.__password,
-            # cookie_jar='.garmin-cookies.txt',
-            cookie_jar=None,
+            cookie_jar=account_cookie_jar(self.__cookie_jar, self.__username),
+            metrics=self.metrics,
         )
 
         print(f'Done authenticating: {self.__username}')
@@ -42,50 +56,53 @@ class WorkoutExporter:
         running_pace_file:str,
         race_start_date:datetime.datetime,
         overwrite_existing:bool=True,
+        journal_file: str = None,
+        resume: bool = False,
     ):
         workout_configs = configreader.read_config(running_program_file)
         target_pace = configreader.read_config(running_pace_file)
         workouts = [RunningWorkout(workout_config, target_pace) for workout_config in workout_configs]
 
+        calendar = TrainingCalendar(race_start_date, WorkoutExporter.__WORKOUT_SCHEDULE)
+        workout_names = [workout.get_workout_name() for workout in workouts]
+        workout_dates = dict(zip(workout_names, calendar.dates(workout_names)))
 
-        with self.__get_garmin_client() as connection:
-            existing_workouts_by_name = {Workout.extract_workout_name(w): w for w in connection.list_workouts(batch_size=100)}
+        with self.__get_garmin_client() as connection, ImportJournal(journal_file, resume) as journal:
+            index = WorkoutIndex(connection.list_workout_records(batch_size=100))
 
             print('done getting current list of workouts')
 
             for workout in workouts:
 
                 workout_name = workout.get_workout_name()
-                w_tokens = workout_name.split('_')
-                wtg = int(w_tokens[1].replace('wtg', ''))
-                w_type = '_'.join(w_tokens[2:])
-                w_date = self.__get_workout_date(race_start_date, wtg, w_type).strftime("%Y-%m-%d")
+                w_date = workout_dates[workout_name]
+
+                if journal.is_done('create', workout_name):
+                    logging.info("Skipping workout '%s', already imported", workout_name)
+                    continue
 
-                existing_workout = existing_workouts_by_name.get(workout_name)
+                try:
+                    existing_workout = index.match(workout_name, workout.get_external_id())
+                except AmbiguousWorkoutError as e:
+                    logging.error("Skipping workout '%s', %s", workout_name, e)
+                    continue
 
+                # the listing is fresh on resume, a workout deleted before a crash is simply recreated
                 if existing_workout:
-                    workout_id = Workout.extract_workout_id(existing_workout)
+                    workout_id = existing_workout.workout_id
                     logging.info("Deleting existing workout '%s'", workout_name)
-                    connection.delete_workout(workout_id)
+                    with journal.operation('delete', workout_name):
+                        connection.delete_workout(workout_id)
 
                 payload = workout.create_workout()
                 logging.info("Creating workout '%s'", workout_name)
-                connection.save_workout(payload)
+                with journal.operation('create', workout_name):
+                    connection.save_workout(payload)
 
                 # existing_workout = existing_workouts_by_name.get(workout_name)
                 # workout_id = Workout.extract_workout_id(existing_workout)
                 # connection.schedule_workout(workout_id, w_date)
     
-    def __get_workout_date(self, race_date, wtg, workout_type)->datetime.datetime:
-        workout_sched = {
-            'recovery_a':1,
-            'speed_a':2,
-            'recovery_b':3,
-            'speed_b':4,
-            'long':5,
-        }
-        return race_date + datetime.timedelta(days=7*(-wtg)+workout_sched[workout_type])
-
     # def __parse_multi_running_workout_yaml(self, multi_running_workout_yaml)->list:
     #     pass
 
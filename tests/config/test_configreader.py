@@ -19,6 +19,18 @@ class MyTestCase(unittest.TestCase):
 
         self.assertDictEqual(config, expected_config)
 
+    def test_read_config_include_graph(self):
+        config_file = os.path.join(os.path.dirname(__file__), 'test_configreader.yaml')
+        include_file = os.path.join(os.path.dirname(__file__), 'test_configreader_inc.yaml')
+        include_graph = {}
+
+        configreader.read_config(config_file, include_graph)
+
+        self.assertDictEqual(include_graph, {
+            os.path.normpath(config_file): [os.path.normpath(include_file), os.path.normpath(include_file)],
+            os.path.normpath(include_file): []
+        })
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+import yaml
+
+from garminworkouts.fit.decoder import FitDecodeError, decode_workout, iter_decode_files
+from garminworkouts.fit.encoder import encode_workout
+from garminworkouts.models.workout import Workout, RunningWorkout
+
+
+class DecoderTestCase(unittest.TestCase):
+    _CYCLING_CONFIG = {
+        "name": "Any workout name",
+        "steps": [
+            {"power": 50, "duration": "10:00"},
+            [{"power": 90, "duration": "2:00"}, {"power": 50, "duration": "1:00"}],
+            [{"power": 90, "duration": "2:00"}, {"power": 50, "duration": "1:00"}],
+            {"power": 50}
+        ]
+    }
+
+    _RUNNING_CONFIG = {
+        "name": "Any run",
+        "steps": [
+            {"type": "warmup", "duration": "5:00"},
+            [{"type": "run", "duration": "400m", "target": "5K_PACE", "description": "5k pace"},
+             {"type": "recovery", "duration": "1:30"}],
+            [{"type": "run", "duration": "400m", "target": "5K_PACE", "description": "5k pace"},
+             {"type": "recovery", "duration": "1:30"}],
+            {"type": "run", "duration": "3.2km"},
+            {"type": "cooldown"}
+        ]
+    }
+
+    _TARGET_PACE = {"5K_PACE": {"type": "pace", "min": "4:00", "max": "4:45"}}
+
+    def test_decode_cycling_workout(self):
+        payload = Workout(DecoderTestCase._CYCLING_CONFIG, 200, 0.05).create_workout()
+
+        config = decode_workout(encode_workout(payload))
+
+        self.assertEqual(config, {
+            "name": "Any workout name",
+            "sport": "cycling",
+            "steps": [
+                {"power": "100W", "duration": "10:00"},
+                [{"power": "180W", "duration": "2:00"}, {"power": "100W", "duration": "1:00"}],
+                [{"power": "180W", "duration": "2:00"}, {"power": "100W", "duration": "1:00"}],
+                {"power": "100W"}
+            ]
+        })
+        self.assertEqual(Workout(config, 200, 0.05).create_workout(), payload)
+        # repetitions are written out in full, not as YAML aliases of the first one
+        self.assertIsNot(config["steps"][1], config["steps"][2])
+        self.assertNotIn("&id", yaml.safe_dump(config))
+
+    def test_decode_running_workout(self):
+        payload = RunningWorkout(DecoderTestCase._RUNNING_CONFIG, DecoderTestCase._TARGET_PACE).create_workout()
+
+        config = decode_workout(encode_workout(payload))
+
+        self.assertEqual(config["steps"][1], [
+            {"type": "run", "duration": "400m", "target": {"type": "pace", "min": "4:00", "max": "4:45"},
+             "description": "5k pace"},
+            {"type": "recovery", "duration": "1:30"}
+        ])
+        self.assertEqual(config["steps"][3], {"type": "run", "duration": "3.2km"})
+        self.assertEqual(RunningWorkout(config, {}).create_workout(), payload)
+
+    def test_decode_invalid_file(self):
+        data = encode_workout(Workout(DecoderTestCase._CYCLING_CONFIG, 200, 0.05).create_workout())
+        data[20] ^= 0xFF
+
+        self.assertRaises(FitDecodeError, decode_workout, data)
+        self.assertRaises(FitDecodeError, decode_workout, b"not a fit file")
+
+    def test_iter_decode_files(self):
+        payload = Workout(DecoderTestCase._CYCLING_CONFIG, 200, 0.05).create_workout()
+
+        with tempfile.TemporaryDirectory() as directory:
+            filenames = [os.path.join(directory, "%d.fit" % i) for i in range(3)]
+            for filename in filenames:
+                with open(filename, "wb") as f:
+                    f.write(encode_workout(payload))
+
+            decoded = list(iter_decode_files(filenames))
+
+        self.assertEqual([filename for filename, _ in decoded], filenames)
+        self.assertTrue(all(config["name"] == "Any workout name" for _, config in decoded))
+
+    def test_iter_decode_empty_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "empty.fit")
+            open(filename, "wb").close()
+
+            with self.assertRaises(FitDecodeError):
+                list(iter_decode_files([filename]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import struct
+import unittest
+
+from garminworkouts.fit import profile
+from garminworkouts.fit.encoder import encode_workout
+from garminworkouts.models.workout import Workout, RunningWorkout
+
+
+class EncoderTestCase(unittest.TestCase):
+    def test_header_and_crc(self):
+        data = encode_workout(self._cycling_workout(), time_created=1)
+
+        header_size, protocol, profile_version, data_size, data_type, header_crc = struct.unpack_from("<BBHI4sH", data)
+        self.assertEqual(header_size, 14)
+        self.assertEqual(data_type, b".FIT")
+        self.assertEqual(len(data), header_size + data_size + 2)
+        self.assertEqual(header_crc, profile.crc16(data[:12]))
+        self.assertEqual(profile.crc16(data), 0)
+
+    def test_deterministic_output(self):
+        payload = self._cycling_workout()
+        self.assertEqual(encode_workout(payload, time_created=1), encode_workout(payload, time_created=1))
+
+    def test_repeat_steps(self):
+        data = bytes(encode_workout(self._cycling_workout(), time_created=1))
+
+        # repeat step: duration type 6, duration value points at the first repeated step, target value is iterations
+        repeat = struct.pack("<HBIBI", 2, profile.DURATION_REPEAT_UNTIL_STEPS_COMPLETE, 0, profile.TARGET_OPEN, 2)
+        self.assertIn(repeat, data)
+
+    def test_running_workout(self):
+        config = {
+            "name": "Any run",
+            "steps": [
+                {"type": "warmup", "duration": "5:00"},
+                {"type": "run", "duration": "1km", "target": "5K_PACE", "description": "5k pace"},
+            ]
+        }
+        target_pace = {"5K_PACE": {"type": "pace", "min": "4:00", "max": "5:00"}}
+        data = bytes(encode_workout(RunningWorkout(config, target_pace).create_workout(), time_created=1))
+
+        self.assertIn(b"Any run\0", data)
+        self.assertIn(b"5k pace\0", data)
+        distance_step = struct.pack("<HBIBIIIB", 1, profile.DURATION_DISTANCE, 100000, profile.TARGET_SPEED, 0,
+                                    3333, 4167, profile.INTENSITIES["interval"])
+        self.assertIn(distance_step, data)
+
+    @staticmethod
+    def _cycling_workout():
+        config = {
+            "name": "Any workout name",
+            "steps": [
+                [{"power": 90, "duration": "2:00"}, {"power": 50, "duration": "1:00"}],
+                [{"power": 90, "duration": "2:00"}, {"power": 50, "duration": "1:00"}],
+                {"power": 50}
+            ]
+        }
+        return Workout(config, 200, 0.05).create_workout()
+
+
+if __name__ == '__main__':
+    unittest.main()
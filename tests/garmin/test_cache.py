@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+
+from garminworkouts.garmin.cache import CachedResponse, ResponseCache
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def test_get_missing(self):
+        self.assertIsNone(ResponseCache().get("any key"))
+
+    def test_put_and_get(self):
+        cache = ResponseCache()
+        entry = CachedResponse(b"any content", etag='"1"')
+        cache.put("any key", entry)
+        self.assertEqual(cache.get("any key"), entry)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", CachedResponse(b"a", etag='"a"'))
+        cache.put("b", CachedResponse(b"b", etag='"b"'))
+        cache.get("a")
+        cache.put("c", CachedResponse(b"c", etag='"c"'))
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        cache.put("any key", CachedResponse(b"any content", etag='"1"'))
+        cache.invalidate("any key")
+        cache.invalidate("missing key")
+        self.assertIsNone(cache.get("any key"))
+
+    def test_persists_on_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            entry = CachedResponse(b"line 1\nline 2", '"1"', "Tue, 11 Feb 2020 14:37:56 GMT", "2020-02-11T14:37:56.0")
+            ResponseCache(directory=directory).put("any key", entry)
+
+            self.assertEqual(ResponseCache(directory=directory).get("any key"), entry)
+
+            cache = ResponseCache(directory=directory)
+            cache.invalidate("any key")
+            self.assertIsNone(ResponseCache(directory=directory).get("any key"))
+
+    def test_is_revalidatable(self):
+        self.assertTrue(CachedResponse(b"", etag='"1"').is_revalidatable())
+        self.assertTrue(CachedResponse(b"", last_modified="any date").is_revalidatable())
+        self.assertFalse(CachedResponse(b"", update_date="any date").is_revalidatable())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,16 @@
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import mock_open, patch
 
 import requests
 from pytest_httpserver import HTTPServer
+from werkzeug import Response
 
+from garminworkouts.garmin.cache import ResponseCache
 from garminworkouts.garmin.garminclient import GarminClient
+from garminworkouts.models.workoutrecord import WorkoutRecord
+from garminworkouts.utils import jsoncodec, singleflight
 
 
 class GarminClientTestCase(unittest.TestCase):
@@ -45,6 +51,26 @@ class GarminClientTestCase(unittest.TestCase):
             workouts = connection.list_workouts(batch_size)
             self.assertEqual(list(workouts), any_workouts)
 
+    def test_list_workout_records(self):
+        batch_size = 10
+        any_workouts = [
+            {"workoutId": 1, "workoutName": "any name", "ownerId": 2, "description": "any description",
+             "updateDate": "2020-02-11T14:37:56.0", "workoutSegments": []}
+        ]
+        empty_response = []
+
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workouts"
+        params1 = {"start": str(0), "limit": str(batch_size)}
+        params2 = {"start": str(batch_size), "limit": str(batch_size)}
+
+        self.httpserver.expect_request(url, query_string=params1).respond_with_json(any_workouts)
+        self.httpserver.expect_request(url, query_string=params2).respond_with_json(empty_response)
+
+        with self.client as connection:
+            records = connection.list_workout_records(batch_size)
+            self.assertEqual(list(records),
+                             [WorkoutRecord(1, "any name", 2, "any description", "2020-02-11T14:37:56.0")])
+
     def test_list_workouts_error_handling(self):
         batch_size = 10
 
@@ -68,6 +94,8 @@ class GarminClientTestCase(unittest.TestCase):
             workout = connection.get_workout(workout_id)
             self.assertEqual(workout, GarminClientTestCase._ANY_WORKOUT)
 
+        self.assertEqual(self.client.metrics.snapshot()["get"]["statuses"], {"200": 1})
+
     def test_get_workout_error_handling(self):
         workout_id = 1
 
@@ -77,6 +105,8 @@ class GarminClientTestCase(unittest.TestCase):
         with self.client as connection:
             self.assertRaises(requests.exceptions.HTTPError, connection.get_workout, workout_id)
 
+        self.assertEqual(self.client.metrics.snapshot()["get"]["statuses"], {"500": 1})
+
     def test_download_workout(self):
         workout_id = 1
         file = "workout.fit"
@@ -102,6 +132,143 @@ class GarminClientTestCase(unittest.TestCase):
         with self.client as connection:
             self.assertRaises(requests.exceptions.HTTPError, connection.download_workout, workout_id, file)
 
+    def test_get_workout_revalidates_cached_response(self):
+        workout_id = 1
+        self.client.cache = ResponseCache()
+
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/{workout_id}"
+        self.httpserver.expect_request(url, headers={"If-None-Match": '"1"'}).respond_with_data(status=304)
+        self.httpserver.expect_request(url).respond_with_json(GarminClientTestCase._ANY_WORKOUT,
+                                                              headers={"ETag": '"1"'})
+
+        with self.client as connection:
+            self.assertEqual(connection.get_workout(workout_id), GarminClientTestCase._ANY_WORKOUT)
+            self.assertEqual(connection.get_workout(workout_id), GarminClientTestCase._ANY_WORKOUT)
+
+        metrics = self.client.metrics.snapshot()["get"]
+        self.assertEqual(metrics["statuses"], {"200": 1, "304": 1})
+        self.assertEqual(metrics["counters"], {"cache_revalidated": 1})
+
+    def test_get_workout_skips_request_for_same_update_date(self):
+        workout_id = 1
+        workout = {"workoutId": workout_id, "updateDate": "2020-02-11T14:37:56.0"}
+        self.client.cache = ResponseCache()
+
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/{workout_id}"
+        self.httpserver.expect_request(url).respond_with_json(workout)
+
+        with self.client as connection:
+            self.assertEqual(connection.get_workout(workout_id), workout)
+            self.assertEqual(connection.get_workout(workout_id, "2020-02-11T14:37:56.0"), workout)
+
+            # a newer updateDate in the listing means the cached definition is stale
+            self.assertEqual(connection.get_workout(workout_id, "2020-02-12T08:00:00.0"), workout)
+
+        metrics = self.client.metrics.snapshot()["get"]
+        self.assertEqual(metrics["statuses"], {"200": 2})
+        self.assertEqual(metrics["counters"], {"cache_hits": 1})
+
+    def test_update_workout_invalidates_cached_response(self):
+        workout_id = 1
+        workout = {"workoutId": workout_id, "updateDate": "2020-02-11T14:37:56.0"}
+        self.client.cache = ResponseCache()
+
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/{workout_id}"
+        self.httpserver.expect_request(url, method="GET").respond_with_json(workout)
+        self.httpserver.expect_request(url, method="PUT").respond_with_data()
+
+        with self.client as connection:
+            connection.get_workout(workout_id)
+            connection.update_workout(workout_id, workout)
+            connection.get_workout(workout_id, "2020-02-11T14:37:56.0")
+
+        self.assertEqual(self.client.metrics.snapshot()["get"]["statuses"], {"200": 2})
+
+    def test_get_workout_decodes_response_once(self):
+        workout_id = 1
+        workout = {"workoutId": workout_id, "updateDate": "2020-02-11T14:37:56.0"}
+        self.client.cache = ResponseCache()
+
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/{workout_id}"
+        self.httpserver.expect_request(url).respond_with_json(workout)
+
+        with self.client as connection, patch("garminworkouts.garmin.garminclient.jsoncodec.loads",
+                                              wraps=jsoncodec.loads) as loads:
+            self.assertEqual(connection.get_workout(workout_id), workout)
+
+        self.assertEqual(loads.call_count, 1)
+
+    def test_writes_invalidate_cached_listing(self):
+        self.client.cache = ResponseCache()
+        workouts = [{"workoutId": 1, "workoutName": "any name"}]
+
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workouts"
+        self.httpserver.expect_request(url, headers={"If-None-Match": '"1"'}).respond_with_data(status=304)
+        self.httpserver.expect_request(url, query_string={"start": "0", "limit": "100"}) \
+            .respond_with_json(workouts, headers={"ETag": '"1"'})
+        self.httpserver.expect_request(url, query_string={"start": "100", "limit": "100"}).respond_with_json([])
+        self.httpserver.expect_request(f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout", method="POST") \
+            .respond_with_json({"workoutId": 2, "workoutName": "other name"})
+        self.httpserver.expect_request(f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/1", method="DELETE") \
+            .respond_with_data()
+
+        with self.client as connection:
+            self.assertEqual(list(connection.list_workouts()), workouts)
+            self.assertEqual(list(connection.list_workouts()), workouts)
+            # pages listed before a write are not revalidated, they are fetched again
+            connection.save_workout({"workoutName": "other name"})
+            self.assertEqual(list(connection.list_workouts()), workouts)
+            connection.delete_workout(1)
+            self.assertEqual(list(connection.list_workouts()), workouts)
+
+        metrics = self.client.metrics.snapshot()["list"]
+        self.assertEqual(metrics["statuses"], {"200": 7, "304": 1})
+
+    def test_get_workout_coalesces_concurrent_requests(self):
+        workout_id = 1
+        requested = threading.Event()
+        release = threading.Event()
+
+        def handler(request):
+            requested.set()
+            release.wait(5)
+            return Response(jsoncodec.dumps(GarminClientTestCase._ANY_WORKOUT), content_type="application/json")
+
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout/{workout_id}"
+        self.httpserver.expect_request(url).respond_with_handler(handler)
+
+        # followers wait for the done event of the running call, each wait is counted before it blocks
+        waiting = threading.Semaphore(0)
+
+        class Done(threading.Event):
+            def wait(self, timeout=None):
+                waiting.release()
+                return super(Done, self).wait(timeout)
+
+        call_class = singleflight._Call
+
+        def create_call():
+            call = call_class()
+            call.done = Done()
+            return call
+
+        with patch.object(singleflight, "_Call", create_call), self.client as connection, \
+                ThreadPoolExecutor(max_workers=3) as executor:
+            leader = executor.submit(connection.get_workout, workout_id)
+            self.assertTrue(requested.wait(5))
+            followers = [executor.submit(connection.get_workout, workout_id) for _ in range(2)]
+            # the first request is held until both followers wait for it
+            for _ in followers:
+                self.assertTrue(waiting.acquire(timeout=5))
+            release.set()
+
+            for future in [leader] + followers:
+                self.assertEqual(future.result(), GarminClientTestCase._ANY_WORKOUT)
+
+        metrics = self.client.metrics.snapshot()["get"]
+        self.assertEqual(metrics["statuses"], {"200": 1})
+        self.assertEqual(metrics["counters"], {"coalesced": 2})
+
     def test_save_workout(self):
         url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout"
         self.httpserver \
@@ -111,6 +278,27 @@ class GarminClientTestCase(unittest.TestCase):
         with self.client as connection:
             connection.save_workout(GarminClientTestCase._ANY_WORKOUT)
 
+    def test_save_workout_serialized(self):
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout"
+        self.httpserver \
+            .expect_request(url, method="POST", data=b'[{"foo1":"bar1"}]',
+                            headers={"Content-Type": "application/json"}) \
+            .respond_with_data()
+
+        with self.client as connection:
+            connection.save_workout(b'[{"foo1":"bar1"}]')
+
+    def test_save_workout_created(self):
+        url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout"
+        self.httpserver \
+            .expect_request(url, method="POST") \
+            .respond_with_json({"workoutId": 1, "workoutName": "Any workout"})
+
+        with self.client as connection:
+            created = connection.save_workout(GarminClientTestCase._ANY_WORKOUT)
+
+        self.assertEqual(created, {"workoutId": 1, "workoutName": "Any workout"})
+
     def test_save_workout_error_handling(self):
         url = f"{GarminClient._WORKOUT_SERVICE_ENDPOINT}/workout"
         self.httpserver \
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from garminworkouts.garmin.metrics import Metrics
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_snapshot(self):
+        metrics = Metrics(latency_buckets=(0.1, 1.0))
+        metrics.observe("get", 200, 0.05)
+        metrics.observe("get", 500, 0.5)
+        metrics.observe("get", None, 2.0)
+
+        snapshot = metrics.snapshot()["get"]
+
+        self.assertEqual(snapshot["requests"], 3)
+        self.assertEqual(snapshot["statuses"], {"200": 1, "500": 1, "error": 1})
+        self.assertEqual(snapshot["latency"]["buckets"], {0.1: 1, 1.0: 2})
+        self.assertAlmostEqual(snapshot["latency"]["sum"], 2.55)
+
+    def test_to_openmetrics(self):
+        metrics = Metrics(latency_buckets=(1.0,))
+        metrics.observe("list", 200, 0.5)
+
+        text = metrics.to_openmetrics()
+
+        self.assertIn('garminworkouts_requests_total{endpoint="list",status="200"} 1', text)
+        self.assertIn('garminworkouts_request_duration_seconds_bucket{endpoint="list",le="1.0"} 1', text)
+        self.assertIn('garminworkouts_request_duration_seconds_bucket{endpoint="list",le="+Inf"} 1', text)
+        self.assertTrue(text.endswith("# EOF\n"))
+
+    def test_write_textfile(self):
+        metrics = Metrics()
+        metrics.observe("save", 200, 0.1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "garminworkouts.prom")
+            metrics.write_textfile(filename)
+
+            with open(filename) as f:
+                self.assertEqual(f.read(), metrics.to_openmetrics())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,25 @@
+import multiprocessing
+import os
+import stat
+import tempfile
+import threading
+import time
 import unittest
 
 import requests
 from pytest_httpserver import HTTPServer
+from werkzeug import Response
 
-from garminworkouts.garmin.session import connect, disconnect
+from garminworkouts.garmin.metrics import Metrics
+from garminworkouts.garmin.session import account_cookie_jar, connect, disconnect
+
+
+def _connect_with_cookie_jar(url, username, password, cookie_jar):
+    # runs in a child process, it has its own in-process login coalescing
+    session = connect(connect_url=url, sso_url=url, username=username, password=password, cookie_jar=cookie_jar)
+    authenticated = any(cookie.name == "SESSIONID" and cookie.value == "any-session" for cookie in session.cookies)
+    disconnect(session)
+    os._exit(0 if authenticated else 1)
 
 
 class SessionTestCase(unittest.TestCase):
@@ -34,6 +50,24 @@ class SessionTestCase(unittest.TestCase):
 
         self._try_connect()
 
+    def test_authentication_metrics(self):
+        self._modern_settings_request(status=403)
+
+        self.httpserver \
+            .expect_request("/sso/signin", method="POST", data=self._signin_data()) \
+            .respond_with_data('response_url = "https://connect.garmin.com/modern?ticket=any-auth-ticket"')
+
+        self.httpserver \
+            .expect_request("/modern", query_string={"ticket": "any-auth-ticket"}) \
+            .respond_with_data(status=204)
+
+        metrics = Metrics()
+        disconnect(connect(connect_url=self.url, sso_url=self.url, username=self.username, password=self.password,
+                           cookie_jar=None, metrics=metrics))
+
+        # the status the sign in completed with, not an assumed one
+        self.assertEqual(metrics.snapshot()["sso_auth"]["statuses"], {"204": 1})
+
     def test_authentication_failed_wrong_ticket(self):
         self._modern_settings_request(status=403)
 
@@ -68,6 +102,107 @@ class SessionTestCase(unittest.TestCase):
         with self.assertRaises(requests.exceptions.HTTPError):
             self._try_connect()
 
+    def test_connection_pool_size(self):
+        self._modern_settings_request(status=200)
+
+        session = connect(connect_url=self.url,
+                          sso_url=self.url,
+                          username=self.username,
+                          password=self.password,
+                          cookie_jar=None,
+                          pool_size=32)
+
+        for adapter in session.adapters.values():
+            self.assertEqual(adapter.poolmanager.connection_pool_kw["maxsize"], 32)
+        self.assertEqual(session.headers["Accept-Encoding"], "gzip, deflate")
+        disconnect(session)
+
+    def test_custom_adapter(self):
+        self._modern_settings_request(status=200)
+        adapter = requests.adapters.HTTPAdapter()
+
+        session = connect(connect_url=self.url,
+                          sso_url=self.url,
+                          username=self.username,
+                          password=self.password,
+                          cookie_jar=None,
+                          adapter=adapter)
+
+        self.assertIs(session.get_adapter(self.url), adapter)
+        disconnect(session)
+
+    def test_concurrent_authentication(self):
+        self._modern_settings_request(status=403)
+        signins = []
+
+        def signin(request):
+            signins.append(request)
+            time.sleep(0.3)
+            return Response('response_url = "https://connect.garmin.com/modern?ticket=any-auth-ticket"')
+
+        self.httpserver.expect_request("/sso/signin", method="POST").respond_with_handler(signin)
+        self.httpserver \
+            .expect_request("/modern", query_string={"ticket": "any-auth-ticket"}) \
+            .respond_with_response(Response(headers={"Set-Cookie": "SESSIONID=any-session"}))
+
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(self._connect())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(signins), 1)
+        self.assertEqual([session.cookies.get("SESSIONID") for session in sessions], ["any-session"] * 4)
+        for session in sessions:
+            disconnect(session)
+
+    def test_processes_share_cookie_jar(self):
+        signins = []
+
+        def settings(request):
+            return Response(status=200 if request.cookies.get("SESSIONID") else 403)
+
+        def signin(request):
+            signins.append(request)
+            time.sleep(0.3)
+            return Response('response_url = "https://connect.garmin.com/modern?ticket=any-auth-ticket"')
+
+        self.httpserver.expect_request("/modern/settings").respond_with_handler(settings)
+        self.httpserver.expect_request("/sso/signin", method="POST").respond_with_handler(signin)
+        self.httpserver \
+            .expect_request("/modern", query_string={"ticket": "any-auth-ticket"}) \
+            .respond_with_response(Response(headers={"Set-Cookie": "SESSIONID=any-session"}))
+
+        with tempfile.TemporaryDirectory() as directory:
+            cookie_jar = os.path.join(directory, "cookies.txt")
+            context = multiprocessing.get_context("fork")
+            processes = [context.Process(target=_connect_with_cookie_jar,
+                                         args=(self.url, self.username, self.password, cookie_jar))
+                         for _ in range(3)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+            self.assertEqual([process.exitcode for process in processes], [0] * 3)
+            self.assertEqual(stat.S_IMODE(os.stat(cookie_jar).st_mode), 0o600)
+            self.assertEqual(sorted(os.listdir(directory)), ["cookies.txt", "cookies.txt.lock"])
+
+        self.assertEqual(len(signins), 1)
+
+    def test_account_cookie_jar(self):
+        self.assertEqual(account_cookie_jar(".garmin-cookies.txt", "any user/name@example.com"),
+                         ".garmin-cookies.txt.any_user_name@example.com")
+        self.assertIsNone(account_cookie_jar(None, "any-username"))
+
+    def _connect(self):
+        return connect(connect_url=self.url,
+                       sso_url=self.url,
+                       username=self.username,
+                       password=self.password,
+                       cookie_jar=None)
+
     def _try_connect(self):
         session = connect(connect_url=self.url,
                           sso_url=self.url,
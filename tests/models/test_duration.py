@@ -30,6 +30,11 @@ class DurationTestCase(unittest.TestCase):
                 with self.assertRaises(ValueError):
                     Duration(duration).to_seconds()
 
+    def test_from_seconds(self):
+        for seconds, duration in [(0, "0:00"), (90, "1:30"), (3600 + 600 + 10, "1:10:10")]:
+            with self.subTest(msg="Expected '%s' for %d seconds" % (duration, seconds)):
+                self.assertEqual(Duration.from_seconds(seconds), Duration(duration))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+import glob
+import os
+import unittest
+
+from garminworkouts.config import configreader
+from garminworkouts.models.fanout import RunningWorkoutFanout, WorkoutFanout
+from garminworkouts.models.workout import Workout, RunningWorkout
+
+_ROOT = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)
+
+
+class WorkoutFanoutTestCase(unittest.TestCase):
+    _CONFIG = {
+        'id': 'any-id',
+        'name': 'Any workout name',
+        'steps': [
+            {'power': 50, 'duration': '10:00'},
+            [{'power': '105%', 'duration': '3:00'}, {'power': '150W', 'duration': '1:00'}],
+            [{'power': '105%', 'duration': '3:00'}, {'power': '150W', 'duration': '1:00'}],
+            {'duration': '5:00'}
+        ]
+    }
+
+    def test_render_matches_workout(self):
+        ftps = [150, 200, 250, 333]
+
+        rendered = WorkoutFanout(WorkoutFanoutTestCase._CONFIG, 0.05).render(ftps)
+
+        for ftp, workout in zip(ftps, rendered):
+            with self.subTest(msg="FTP %d" % ftp):
+                expected = Workout(WorkoutFanoutTestCase._CONFIG, ftp, 0.05)
+                self.assertEqual(workout.get_workout_name(), expected.get_workout_name())
+                self.assertEqual(workout.get_external_id(), 'any-id')
+                self.assertEqual(workout.create_workout(1, 2), expected.create_workout(1, 2))
+                self.assertEqual(workout.create_workout_bytes(), expected.create_workout_bytes())
+
+    def test_render_sample_workouts(self):
+        ftps = list(range(120, 400, 13))
+
+        for workout_file in sorted(glob.glob(os.path.join(_ROOT, 'sample_workouts', '*.yaml'))):
+            config = configreader.read_config(workout_file)
+            rendered = WorkoutFanout(config).render(ftps)
+            for ftp, workout in zip(ftps, rendered):
+                with self.subTest(msg="%s, FTP %d" % (os.path.basename(workout_file), ftp)):
+                    self.assertEqual(workout.create_workout(), Workout(config, ftp, 0.05).create_workout())
+
+    def test_render_shares_structure(self):
+        first, second = WorkoutFanout(WorkoutFanoutTestCase._CONFIG).render([200, 250])
+
+        first_steps = first.create_workout()["workoutSegments"][0]["workoutSteps"]
+        second_steps = second.create_workout()["workoutSegments"][0]["workoutSteps"]
+
+        self.assertIs(first_steps[2], second_steps[2])
+        self.assertIsNot(first_steps[0], second_steps[0])
+
+    def test_invalid_ftp(self):
+        fanout = WorkoutFanout(WorkoutFanoutTestCase._CONFIG)
+
+        self.assertRaises(ValueError, fanout.render, [200, 1000])
+        self.assertRaises(ValueError, WorkoutFanout(WorkoutFanoutTestCase._CONFIG, 1.5).render, [200])
+
+    def test_validation_matches_workout(self):
+        config = dict(WorkoutFanoutTestCase._CONFIG, steps=[{'power': '600%', 'duration': '5:00'}])
+
+        for ftp in (-1, 1000, 900):
+            with self.subTest(msg="FTP %d" % ftp):
+                with self.assertRaises(ValueError) as expected:
+                    Workout(config, ftp, 0.05).create_workout()
+                with self.assertRaises(ValueError) as context:
+                    WorkoutFanout(config).render([ftp])
+                self.assertEqual(str(context.exception), str(expected.exception))
+
+
+class RunningWorkoutFanoutTestCase(unittest.TestCase):
+    def test_render_running_workouts(self):
+        target_paces = [
+            configreader.read_config(pace_file)
+            for pace_file in sorted(glob.glob(os.path.join(_ROOT, 'running_workouts', 'pace', '*.yaml')))
+        ]
+        target_paces.append({})
+
+        for workout_file in sorted(glob.glob(os.path.join(_ROOT, 'running_workouts', '*.yaml'))):
+            config = configreader.read_config(workout_file)
+            rendered = RunningWorkoutFanout(config).render(target_paces)
+            for i, (target_pace, workout) in enumerate(zip(target_paces, rendered)):
+                with self.subTest(msg="%s, paces %d" % (os.path.basename(workout_file), i)):
+                    self.assertEqual(workout.create_workout(), RunningWorkout(config, target_pace).create_workout())
+
+
+if __name__ == '__main__':
+    unittest.main()
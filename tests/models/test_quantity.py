@@ -0,0 +1,49 @@
+import unittest
+
+from garminworkouts.models import quantity
+from garminworkouts.models.quantity import Quantity
+
+
+class QuantityTestCase(unittest.TestCase):
+    def test_parse_time(self):
+        for literal, seconds in [("0", 0), ("59", 59), ("00:30", 30), ("5:00", 300), ("1:00:00", 3600)]:
+            with self.subTest(msg="Expected %d seconds for '%s'" % (seconds, literal)):
+                self.assertEqual(quantity.parse_time(literal), Quantity(seconds, quantity.SECOND))
+
+    def test_parse_time_error_message(self):
+        with self.assertRaisesRegex(ValueError, "Minutes must be between 0 and 59 but was 60"):
+            quantity.parse_time("60:10")
+
+    def test_parse_distance(self):
+        for literal, meters in [("400m", 400.0), ("3.2km", 3200.0), ("5KM", 5000.0), ("2mile", 3218.688),
+                                ("1 mi", 1609.344)]:
+            with self.subTest(msg="Expected %f meters for '%s'" % (meters, literal)):
+                self.assertEqual(quantity.parse_distance(literal), Quantity(meters, quantity.METER))
+
+        for literal in ["km", "3.2", "foo m", "-1km"]:
+            with self.subTest(msg="Expected ValueError for '%s'" % literal):
+                self.assertRaises(ValueError, quantity.parse_distance, literal)
+
+    def test_parse_power(self):
+        self.assertEqual(quantity.parse_power("150W"), Quantity(150, quantity.WATT))
+        self.assertEqual(quantity.parse_power("150w"), Quantity(150, quantity.WATT))
+        self.assertEqual(quantity.parse_power("90%"), Quantity(90, quantity.PERCENT))
+        self.assertEqual(quantity.parse_power("90"), Quantity(90, quantity.PERCENT))
+
+    def test_parse_running_duration(self):
+        self.assertEqual(quantity.parse_running_duration("5:00"), Quantity(300, quantity.SECOND))
+        self.assertEqual(quantity.parse_running_duration("3.2km"), Quantity(3200.0, quantity.METER))
+        self.assertIsNone(quantity.parse_running_duration("lap"))
+
+    def test_literals_parsed_once(self):
+        quantity.parse_time.cache_clear()
+
+        first = quantity.parse_time("12:34")
+        second = quantity.parse_time("12:34")
+
+        self.assertIs(first, second)
+        self.assertEqual(quantity.parse_time.cache_info().misses, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -50,6 +50,24 @@ class WorkoutTestCase(unittest.TestCase):
 
         self.assertDictEqual(payload, expected_workout_payload)
 
+    def test_create_workout_with_external_id(self):
+        config = {
+            'id': 'sweet-spot-1',
+            'name': 'Any workout name',
+            'steps': [{'power': 50, 'duration': '1:00'}]
+        }
+
+        workout = Workout(config, 200, 0.05)
+
+        self.assertEqual(workout.get_external_id(), 'sweet-spot-1')
+        self.assertEqual(workout.create_workout()['description'], 'FTP 200, TSS 0, NP 100, IF 0.50 [gw:sweet-spot-1]')
+
+    def test_invalid_external_id(self):
+        for external_id in ('sweet spot', 'sweet-spot]', ''):
+            with self.subTest(msg=external_id):
+                workout = Workout({'id': external_id, 'name': 'Any workout name', 'steps': []}, 200, 0.05)
+                self.assertRaises(ValueError, workout.get_external_id)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from garminworkouts.models.workoutindex import AmbiguousWorkoutError, WorkoutIndex
+from garminworkouts.models.workoutrecord import WorkoutRecord
+
+
+class WorkoutIndexTestCase(unittest.TestCase):
+    _RECORDS = [
+        WorkoutRecord(1, "Sweet Spot", 10, "FTP 200 [gw:sweet-spot-1]"),
+        WorkoutRecord(2, "Sweet Spot", 10, "FTP 200"),
+        WorkoutRecord(3, "Threshold", 20, "FTP 200 [gw:threshold-1]"),
+        WorkoutRecord(4, "VO2max", 10, None),
+    ]
+
+    def test_lookup(self):
+        index = WorkoutIndex(WorkoutIndexTestCase._RECORDS)
+
+        self.assertEqual(len(index), 4)
+        self.assertIn(3, index)
+        self.assertEqual(index.by_id(3).workout_name, "Threshold")
+        self.assertEqual([r.workout_id for r in index.by_name("Sweet Spot")], [1, 2])
+        self.assertEqual([r.workout_id for r in index.by_owner(10)], [1, 2, 4])
+        self.assertEqual([r.workout_id for r in index.by_external_id("threshold-1")], [3])
+        self.assertEqual(index.by_name("Unknown"), [])
+
+    def test_duplicates(self):
+        index = WorkoutIndex(WorkoutIndexTestCase._RECORDS)
+
+        duplicates = index.duplicates()
+
+        self.assertEqual(list(duplicates["name"]), ["Sweet Spot"])
+        self.assertEqual(duplicates["external_id"], {})
+
+    def test_match(self):
+        index = WorkoutIndex(WorkoutIndexTestCase._RECORDS)
+
+        self.assertEqual(index.match("Sweet Spot", "sweet-spot-1").workout_id, 1)
+        self.assertEqual(index.match("Renamed", "threshold-1").workout_id, 3)
+        self.assertEqual(index.match("VO2max").workout_id, 4)
+        self.assertIsNone(index.match("Threshold", "threshold-2"))
+        self.assertIsNone(index.match("Unknown"))
+        with self.assertRaises(AmbiguousWorkoutError) as context:
+            index.match("Sweet Spot")
+        self.assertEqual([r.workout_id for r in context.exception.records], [1, 2])
+
+    def test_add_and_remove(self):
+        index = WorkoutIndex(WorkoutIndexTestCase._RECORDS)
+
+        index.add(WorkoutRecord(2, "Sweet Spot v2", 10, "FTP 200"))
+        self.assertEqual(index.match("Sweet Spot").workout_id, 1)
+        self.assertEqual([r.workout_id for r in index.by_name("Sweet Spot v2")], [2])
+
+        self.assertEqual(index.remove(2).workout_name, "Sweet Spot v2")
+        self.assertEqual(index.by_name("Sweet Spot v2"), [])
+        self.assertIsNone(index.remove(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
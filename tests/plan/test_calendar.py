@@ -0,0 +1,48 @@
+import datetime
+import unittest
+
+from garminworkouts.plan.calendar import TrainingCalendar
+
+
+class TrainingCalendarTestCase(unittest.TestCase):
+    _DAY_OFFSETS = {"recovery_a": 1, "speed_a": 2, "long": 5}
+
+    def test_weeks_to_go_dates(self):
+        calendar = TrainingCalendar(datetime.datetime(2023, 11, 19), TrainingCalendarTestCase._DAY_OFFSETS)
+
+        dates = calendar.dates(["10km_8wtg_recovery_a", "10km_8wtg_long", "10km_1wtg_speed_a", "10km_1wtg_unknown"])
+
+        self.assertEqual(dates, ["2023-09-25", "2023-09-29", "2023-11-14", None])
+
+    def test_name_pattern_without_weeks(self):
+        day_offsets = {"recovery run a": 0, "speed run": 2}
+        calendar = TrainingCalendar(datetime.date(2023, 5, 1), day_offsets, name_pattern=r"^\S+ (?P<workout>.+)$")
+
+        self.assertEqual(calendar.dates(["01wtg recovery run a", "01wtg speed run"]), ["2023-05-01", "2023-05-03"])
+
+    def test_rest_days(self):
+        # 2023-11-18 is Saturday, Saturday and Sunday are rest days
+        calendar = TrainingCalendar(datetime.date(2023, 11, 18), {"long": 0}, rest_days=(5, 6))
+
+        self.assertEqual(calendar.date("0wtg_long"), "2023-11-20")
+
+    def test_week_shifts(self):
+        calendar = TrainingCalendar(datetime.date(2023, 11, 19), {"long": 0}, week_shifts={1: -1})
+
+        self.assertEqual(calendar.dates(["2wtg_long", "1wtg_long"]), ["2023-11-05", "2023-11-11"])
+
+    def test_timezone(self):
+        anchor = datetime.datetime(2023, 11, 19, 23, 30, tzinfo=datetime.timezone.utc)
+        try:
+            calendar = TrainingCalendar(anchor, {"long": 0}, timezone="Asia/Tokyo")
+        except ValueError:
+            self.skipTest("time zones are not supported")
+
+        self.assertEqual(calendar.date("0wtg_long"), "2023-11-20")
+
+    def test_all_rest_days(self):
+        self.assertRaises(ValueError, TrainingCalendar, datetime.date(2023, 11, 19), {}, rest_days=range(7))
+
+
+if __name__ == '__main__':
+    unittest.main()
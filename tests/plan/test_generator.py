@@ -0,0 +1,98 @@
+import unittest
+
+from garminworkouts.models.fanout import RenderedWorkout
+from garminworkouts.models.workout import RunningWorkout
+from garminworkouts.plan.generator import PlanGenerator
+
+
+class PlanGeneratorTestCase(unittest.TestCase):
+    _TEMPLATE = {
+        "name": "{wtg}wtg_{workout}",
+        "weeks": 3,
+        "progressions": {
+            "volume": {"start": 0.5, "end": 1.0},
+            "intervals": {"values": [2, 3, 4]},
+            "intensity": {"start": 0.9, "end": 1.1, "curve": "geometric"}
+        },
+        "workouts": {
+            "long": {
+                "description": "Long run",
+                "steps": [{"type": "run", "duration": "10km", "target": "LONG_RUN_PACE", "scale": "volume"}]
+            },
+            "speed": {
+                "steps": [
+                    {"type": "warmup", "duration": "10:00", "scale": "volume"},
+                    {"repeat": 1, "scale": "intervals", "steps": [
+                        {"type": "run", "duration": "1:00", "target": "5K_PACE"},
+                        {"type": "recovery", "duration": "1:00"}
+                    ]}
+                ]
+            },
+            "bike": {
+                "steps": [{"power": 100, "duration": "20:00", "scale": {"power": "intensity"}}]
+            }
+        }
+    }
+
+    def test_configs(self):
+        configs = PlanGenerator(PlanGeneratorTestCase._TEMPLATE).configs()
+
+        self.assertEqual([config["name"] for config in configs], [
+            "3wtg_long", "3wtg_speed", "3wtg_bike",
+            "2wtg_long", "2wtg_speed", "2wtg_bike",
+            "1wtg_long", "1wtg_speed", "1wtg_bike"
+        ])
+        self.assertEqual(configs[0], {
+            "name": "3wtg_long",
+            "steps": [{"type": "run", "duration": "5km", "target": "LONG_RUN_PACE"}],
+            "description": "Long run"
+        })
+        self.assertEqual([config["steps"][0]["duration"] for config in configs[1::3]], ["5:00", "7:30", "10:00"])
+        self.assertEqual([len(config["steps"]) for config in configs[1::3]], [3, 4, 5])
+        self.assertEqual([config["steps"][0]["power"] for config in configs[2::3]], ["90", "99", "110"])
+
+    def test_running_workouts(self):
+        target_paces = [
+            {"LONG_RUN_PACE": {"type": "pace", "min": "5:00", "max": "5:30"},
+             "5K_PACE": {"type": "pace", "min": "4:00", "max": "4:30"}},
+            {"LONG_RUN_PACE": {"type": "pace", "min": "6:00", "max": "6:30"},
+             "5K_PACE": {"type": "pace", "min": "5:00", "max": "5:30"}}
+        ]
+
+        plans = PlanGenerator(PlanGeneratorTestCase._TEMPLATE).running_workouts(target_paces)
+
+        self.assertEqual(len(plans), 2)
+        # the bike workout can not be built as a running workout, it is the only one built per athlete
+        self.assertEqual([type(workout) for workout in plans[0][:3]],
+                         [RenderedWorkout, RenderedWorkout, RunningWorkout])
+        speed_steps = plans[0][7].create_workout()["workoutSegments"][0]["workoutSteps"]
+        self.assertEqual(speed_steps[1]["numberOfIterations"], 4)
+        self.assertEqual(plans[1][0].create_workout()["workoutSegments"][0]["workoutSteps"][0]["targetValueOne"],
+                         1000.0 / 360)
+
+    def test_cycling_workouts(self):
+        workouts = {"bike": PlanGeneratorTestCase._TEMPLATE["workouts"]["bike"]}
+        template = dict(PlanGeneratorTestCase._TEMPLATE, workouts=workouts)
+
+        plans = PlanGenerator(template).cycling_workouts([200, 250])
+
+        self.assertEqual([[workout.get_workout_name() for workout in plan] for plan in plans],
+                         [["3wtg_bike", "2wtg_bike", "1wtg_bike"]] * 2)
+        self.assertEqual(plans[1][2].create_workout()["workoutSegments"][0]["workoutSteps"][0]["targetValueOne"],
+                         261)
+
+    def test_cycling_workouts_render_errors(self):
+        workouts = {"bike": PlanGeneratorTestCase._TEMPLATE["workouts"]["bike"]}
+        template = dict(PlanGeneratorTestCase._TEMPLATE, workouts=workouts)
+
+        with self.assertRaises(ValueError) as context:
+            PlanGenerator(template).cycling_workouts([200, 1000])
+        self.assertEqual(str(context.exception), "FTP must be between 0 [W] and 999 [W] but was 1000")
+
+    def test_invalid_progression(self):
+        template = dict(PlanGeneratorTestCase._TEMPLATE, progressions={"volume": {"values": [1, 2]}})
+        self.assertRaises(ValueError, PlanGenerator, template)
+
+
+if __name__ == '__main__':
+    unittest.main()
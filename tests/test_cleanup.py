@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from garminworkouts import cleanup
+from garminworkouts.models.workoutindex import WorkoutIndex
+from garminworkouts.models.workoutrecord import WorkoutRecord
+
+
+class FakeConnection(object):
+    def __init__(self, failing_ids=()):
+        self.failing_ids = failing_ids
+        self.deleted = []
+        self._lock = threading.Lock()
+
+    def delete_workout(self, workout_id):
+        if workout_id in self.failing_ids:
+            raise IOError("any error")
+        with self._lock:
+            self.deleted.append(workout_id)
+
+
+class CleanupTestCase(unittest.TestCase):
+    _RECORDS = [
+        WorkoutRecord(1, "Sweet Spot", 10, "FTP 200", "2023-01-01 10:00:00.0"),
+        WorkoutRecord(2, "Sweet Spot", 10, "FTP 200", "2023-02-01 10:00:00.0"),
+        WorkoutRecord(3, "Threshold", 10, "FTP 200 [gw:threshold-1]", "2023-01-01 10:00:00.0"),
+        WorkoutRecord(4, "Threshold", 10, "FTP 200", "2023-03-01 10:00:00.0"),
+        WorkoutRecord(5, "Threshold v2", 10, "FTP 200 [gw:threshold-1]", "2023-02-01 10:00:00.0"),
+        WorkoutRecord(6, "VO2max", 10, "FTP 200", None),
+    ]
+
+    def test_find_duplicates(self):
+        garbage = cleanup.find_garbage(WorkoutIndex(CleanupTestCase._RECORDS))
+
+        # workouts sharing only their name are not copies of each other
+        self.assertEqual([(record.workout_id, reason) for record, reason in garbage], [(3, cleanup.DUPLICATE)])
+
+    def test_find_orphans(self):
+        records = CleanupTestCase._RECORDS + [WorkoutRecord(7, "Removed", 10, "FTP 200 [gw:removed-1]")]
+
+        garbage = cleanup.find_garbage(WorkoutIndex(records), {"threshold-1"})
+
+        self.assertEqual([(record.workout_id, reason) for record, reason in garbage],
+                         [(3, cleanup.DUPLICATE), (7, cleanup.ORPHAN)])
+
+    def test_untagged_workouts_are_never_orphans(self):
+        garbage = cleanup.find_garbage(WorkoutIndex(CleanupTestCase._RECORDS[:2]), set())
+
+        self.assertEqual(garbage, [])
+
+    def test_delete_workouts(self):
+        connection = FakeConnection(failing_ids=(3,))
+
+        failures = cleanup.delete_workouts(connection, CleanupTestCase._RECORDS[:4], workers=2)
+
+        self.assertEqual(sorted(connection.deleted), [1, 2, 4])
+        self.assertEqual(list(failures), [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
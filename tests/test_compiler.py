@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+
+from garminworkouts import compiler
+from garminworkouts.models.workout import Workout
+from garminworkouts.utils import jsoncodec
+
+
+class CompilerTestCase(unittest.TestCase):
+    _CONFIG = {
+        'name': 'Any workout name',
+        'steps': [
+            {'power': 50, 'duration': '1:00'},
+            {'power': 60, 'duration': '2:00'}
+        ]
+    }
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.filename = os.path.join(directory.name, "bundle.ndjson")
+
+    def test_bundle_round_trip(self):
+        workout = Workout(CompilerTestCase._CONFIG, 200, 0.05)
+
+        compiled = compiler.compile_workouts([("any.yaml", workout)])
+        compiler.write_bundle(compiled, self.filename)
+        [compiled_workout] = list(compiler.read_bundle(self.filename))
+
+        self.assertEqual(compiled_workout.get_workout_name(), 'Any workout name')
+        self.assertEqual(compiled_workout.create_workout(1, 2), workout.create_workout(1, 2))
+
+    def test_compile_errors(self):
+        invalid_config = {'name': 'Invalid workout', 'steps': [{'power': 50, 'duration': '99:00'}]}
+        workouts = [
+            ("any.yaml", Workout(CompilerTestCase._CONFIG, 200, 0.05)),
+            ("duplicate.yaml", Workout(CompilerTestCase._CONFIG, 200, 0.05)),
+            ("invalid.yaml", Workout(invalid_config, 200, 0.05)),
+        ]
+
+        with self.assertRaises(compiler.CompileError) as context:
+            compiler.compile_workouts(workouts)
+
+        self.assertEqual(len(context.exception.errors), 2)
+        self.assertIn("duplicate.yaml", context.exception.errors[0])
+        self.assertIn("invalid.yaml", context.exception.errors[1])
+
+    def test_compile_duplicated_external_id(self):
+        workouts = [
+            ("any.yaml", Workout(dict(CompilerTestCase._CONFIG, id='any-id'), 200, 0.05)),
+            ("other.yaml", Workout(dict(CompilerTestCase._CONFIG, id='any-id', name='Other workout'), 200, 0.05)),
+        ]
+
+        with self.assertRaises(compiler.CompileError) as context:
+            compiler.compile_workouts(workouts)
+
+        self.assertEqual(len(context.exception.errors), 1)
+        self.assertIn("other.yaml", context.exception.errors[0])
+
+    def test_read_tampered_bundle(self):
+        compiled = compiler.compile_workouts([("any.yaml", Workout(CompilerTestCase._CONFIG, 200, 0.05))])
+        compiler.write_bundle(compiled, self.filename)
+
+        with open(self.filename) as f:
+            content = f.read()
+        with open(self.filename, "w") as f:
+            f.write(content.replace('"endConditionValue":60', '"endConditionValue":61'))
+
+        with self.assertRaises(ValueError):
+            list(compiler.read_bundle(self.filename))
+
+    def test_read_truncated_bundle(self):
+        workouts = [("any.yaml", Workout(dict(CompilerTestCase._CONFIG, name=name), 200, 0.05)) for name in "AB"]
+        compiler.write_bundle(compiler.compile_workouts(workouts), self.filename)
+
+        with open(self.filename, "rb") as f:
+            lines = f.readlines()
+        with open(self.filename, "wb") as f:
+            f.writelines(lines[:-1])
+
+        with self.assertRaises(ValueError):
+            next(compiler.read_bundle(self.filename))
+
+    def test_read_bundle_hashes_payload_bytes_as_written(self):
+        # a payload written by another encoder, it is not in canonical form
+        payload_bytes = b'{"workoutName": "A", "description": null}'
+        with open(self.filename, "wb") as f:
+            f.write(b'{"format":"%s","workouts":1}\n' % compiler.BUNDLE_FORMAT.encode())
+            f.write(b'{"name":"A","hash":"%s","payload":%s}\n'
+                    % (jsoncodec.content_hash(payload_bytes).encode(), payload_bytes))
+
+        [workout] = list(compiler.read_bundle(self.filename))
+
+        self.assertEqual(workout.payload, {"workoutName": "A", "description": None})
+        self.assertEqual(workout.create_workout_bytes(), payload_bytes)
+        self.assertEqual(jsoncodec.loads(workout.create_workout_bytes(1, 2)),
+                         {"workoutName": "A", "description": None, "workoutId": 1, "ownerId": 2})
+
+    def test_compile_workout(self):
+        workout = Workout(CompilerTestCase._CONFIG, 200, 0.05)
+
+        compiled_workout = compiler.compile_workout(workout)
+
+        self.assertEqual(compiled_workout.get_workout_name(), 'Any workout name')
+        self.assertEqual(compiled_workout.create_workout_bytes(), workout.create_workout_bytes())
+        self.assertEqual(compiled_workout.content_hash, jsoncodec.content_hash(compiled_workout.create_workout_bytes()))
+        self.assertEqual(compiled_workout.create_workout(1, 2), workout.create_workout(1, 2))
+
+    def test_build_and_compile_errors(self):
+        files = {
+            "a.yaml": 'name: "A"\nsteps:\n  - { power: 50, duration: "1:00" }\n',
+            "b.yaml": 'name: "B"\nsteps:\n  - !include missing.yaml\n',
+            "c.yaml": 'name: "C"\nsteps: [\n'
+        }
+        for name, content in files.items():
+            with open(os.path.join(self.directory, name), "w") as f:
+                f.write(content)
+
+        errors = []
+        workouts = compiler.iter_workouts(os.path.join(self.directory, "*.yaml"), 200, errors=errors)
+        with self.assertRaises(compiler.CompileError) as context:
+            compiler.compile_workouts(workouts, errors)
+
+        self.assertEqual([os.path.basename(error.split(":")[0]) for error in context.exception.errors],
+                         ["b.yaml", "c.yaml"])
+        with self.assertRaises(compiler.CompileError):
+            compiler.build_workouts(os.path.join(self.directory, "*.yaml"), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
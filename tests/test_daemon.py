@@ -0,0 +1,278 @@
+import http.client
+import os
+import stat
+import tempfile
+import threading
+import unittest
+
+import requests
+
+from garminworkouts import daemon
+from garminworkouts.__main__ import _job_delete, _job_export, _job_import, _job_schedule
+from garminworkouts.models.workoutrecord import WorkoutRecord
+from garminworkouts.utils import jsoncodec
+
+
+class FakeConnection(object):
+    def __init__(self, records=()):
+        self.records = list(records)
+        self.listings = 0
+        self.saved = []
+        self.offline_after = None
+        self.scheduled = []
+        self.deleted = []
+
+    def list_workout_records(self):
+        self.listings += 1
+        return self.records
+
+    def save_workout(self, payload):
+        if self.offline_after is not None and len(self.saved) >= self.offline_after:
+            raise requests.ConnectionError("any error")
+        name = jsoncodec.loads(payload)["workoutName"]
+        self.saved.append(name)
+        return {"workoutId": 100 + len(self.saved), "workoutName": name}
+
+    def download_workout(self, workout_id, file, update_date=None):
+        with open(file, "wb") as f:
+            f.write(b"fit %d %s" % (workout_id, update_date.encode()))
+
+    def schedule_workout(self, workout_id, date):
+        self.scheduled.append((workout_id, date))
+
+    def delete_workout(self, workout_id):
+        self.deleted.append(workout_id)
+
+
+class FakeClient(object):
+    def __init__(self, connection):
+        self.connection = connection
+        self.entered = 0
+        self.exited = 0
+
+    def __enter__(self):
+        self.entered += 1
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.exited += 1
+
+
+def _echo(workspace, params):
+    return {"params": params, "workouts": len(workspace.catalog())}
+
+
+def _fail(workspace, params):
+    raise requests.ConnectionError("any error")
+
+
+class DaemonTestCase(unittest.TestCase):
+    _RECORDS = [WorkoutRecord(1, "Sweet Spot", 10), WorkoutRecord(2, "Threshold", 10)]
+
+    def setUp(self):
+        self.connection = FakeConnection(DaemonTestCase._RECORDS)
+        self.client = FakeClient(self.connection)
+        self.workspace = daemon.Workspace(lambda: self.client)
+        self.runner = daemon.JobRunner({"echo": _echo, "fail": _fail}, self.workspace)
+        self.addCleanup(self.runner.close)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _serve(self, address):
+        server = daemon.create_server(self.runner, address, "secret")
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_workspace_stays_warm(self):
+        self.assertIs(self.workspace.catalog(), self.workspace.catalog())
+        self.assertEqual((self.client.entered, self.connection.listings), (1, 1))
+
+        self.workspace.refresh()
+        self.assertEqual(len(self.workspace.catalog()), 2)
+        self.assertEqual((self.client.entered, self.connection.listings), (1, 2))
+
+        self.workspace.reset()
+        self.workspace.catalog()
+        self.assertEqual((self.client.entered, self.client.exited, self.connection.listings), (2, 1, 3))
+
+    def test_workspace_config(self):
+        filename = os.path.join(self.directory, "pace.yaml")
+        with open(filename, "w") as f:
+            f.write("easy: {type: pace, min: '6:00', max: '6:30'}\n")
+
+        config = self.workspace.config(filename)
+        self.assertIs(self.workspace.config(filename), config)
+
+        with open(filename, "w") as f:
+            f.write("easy: {type: pace, min: '5:50', max: '6:20'}\n")
+        os.utime(filename, ns=(0, 0))
+        self.assertEqual(self.workspace.config(filename)["easy"]["min"], "5:50")
+
+    def test_run_jobs(self):
+        job = self.runner.submit("echo", {"any": "param"})
+        self.assertTrue(job.done.wait(5))
+
+        self.assertEqual(job.status, daemon.DONE)
+        self.assertEqual(job.result, {"params": {"any": "param"}, "workouts": 2})
+        self.assertIs(self.runner.get(job.job_id), job)
+
+    def test_failed_job_resets_workspace(self):
+        self.workspace.catalog()
+
+        job = self.runner.submit("fail")
+        self.assertTrue(job.done.wait(5))
+
+        self.assertEqual(job.status, daemon.FAILED)
+        self.assertEqual(job.error, "ConnectionError: any error")
+        self.assertEqual(self.client.exited, 1)
+
+    def test_unknown_job_type(self):
+        self.assertRaises(ValueError, self.runner.submit, "any type")
+
+    def test_unix_socket_api(self):
+        address = os.path.join(self.directory, "daemon.sock")
+        self._serve(address)
+
+        job = daemon.submit_job(address, "secret", "echo", {"any": "param"}, wait=True, timeout=5)
+        self.assertEqual(job["status"], daemon.DONE)
+        self.assertEqual(job["result"], {"params": {"any": "param"}, "workouts": 2})
+        self.assertEqual(daemon.get_job(address, "secret", job["id"], timeout=5), job)
+
+        with self.assertRaises(daemon.DaemonError) as context:
+            daemon.get_job(address, "secret", "999", timeout=5)
+        self.assertEqual(context.exception.status, 404)
+
+        with self.assertRaises(daemon.DaemonError) as context:
+            daemon.submit_job(address, "secret", "any type", timeout=5)
+        self.assertEqual(context.exception.status, 400)
+
+    def test_unix_socket_is_private(self):
+        address = os.path.join(self.directory, "daemon.sock")
+        self._serve(address)
+
+        self.assertEqual(stat.S_IMODE(os.stat(address).st_mode) & 0o077, 0)
+
+    def test_http_api_only_on_loopback(self):
+        self.assertTrue(daemon.is_loopback("localhost"))
+        self.assertFalse(daemon.is_loopback("0.0.0.0"))
+        self.assertRaises(ValueError, daemon.create_server, self.runner, ("0.0.0.0", 0), "secret")
+
+    def test_http_api(self):
+        server = self._serve(("127.0.0.1", 0))
+        address = server.server_address[:2]
+
+        job = daemon.submit_job(address, "secret", "fail", timeout=5)
+        self.assertEqual(job["type"], "fail")
+        self.assertTrue(self.runner.get(job["id"]).done.wait(5))
+        self.assertEqual(daemon.get_job(address, "secret", job["id"], timeout=5)["status"], daemon.FAILED)
+
+    def _post(self, address, headers, body=b'{"type": "echo"}'):
+        connection = http.client.HTTPConnection(*address, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request("POST", "/jobs", body, headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def test_http_api_rejects_foreign_requests(self):
+        server = self._serve(("127.0.0.1", 0))
+        address = server.server_address[:2]
+        headers = {"Authorization": "Bearer secret", "Content-Type": "application/json"}
+
+        self.assertEqual(self._post(address, dict(headers, Authorization="Bearer wrong")), 401)
+        self.assertEqual(self._post(address, {"Content-Type": "application/json"}), 401)
+        self.assertEqual(self._post(address, dict(headers, **{"Content-Type": "text/plain"})), 415)
+        self.assertEqual(self._post(address, dict(headers, Origin="http://example.com")), 403)
+        self.assertEqual(self._post(address, dict(headers, Host="example.com:%d" % address[1])), 403)
+        self.assertEqual(self.runner.jobs(), [])
+
+        self.assertEqual(self._post(address, dict(headers, Host="localhost:%d" % address[1])), 202)
+        self.assertEqual(len(self.runner.jobs()), 1)
+
+    def test_get_requires_token(self):
+        address = os.path.join(self.directory, "daemon.sock")
+        self._serve(address)
+
+        with self.assertRaises(daemon.DaemonError) as context:
+            daemon.get_job(address, "wrong", "1", timeout=5)
+        self.assertEqual(context.exception.status, 401)
+
+    def test_token_file_is_private(self):
+        filename = daemon.token_file(os.path.join(self.directory, "daemon.sock"))
+        with open(filename, "w") as f:
+            f.write("old")
+        os.chmod(filename, 0o644)
+
+        token = daemon.write_token(filename)
+
+        self.assertEqual(daemon.read_token(filename), token)
+        self.assertNotEqual(token, "old")
+        self.assertEqual(stat.S_IMODE(os.stat(filename).st_mode), 0o600)
+
+
+class JobHandlersTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeConnection([WorkoutRecord(1, "Sweet Spot", 10, update_date="2026-10-01 10:00:00.0"),
+                                          WorkoutRecord(2, "Threshold", 10, update_date="2026-10-02 10:00:00.0")])
+        self.workspace = daemon.Workspace(lambda: FakeClient(self.connection))
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        for name in ("A", "B", "C"):
+            with open(os.path.join(self.directory, name + ".yaml"), "w") as f:
+                f.write('name: "%s"\nsteps:\n  - { power: 50, duration: "10:00" }\n' % name)
+        self.workouts = os.path.join(self.directory, "*.yaml")
+
+    def test_import_records_workouts_pushed_before_failure(self):
+        self.connection.offline_after = 1
+
+        with self.assertRaises(requests.ConnectionError):
+            _job_import(self.workspace, {"workout": self.workouts, "ftp": 250})
+        self.assertEqual(self.connection.saved, ["A"])
+
+        self.connection.offline_after = None
+        result = _job_import(self.workspace, {"workout": self.workouts, "ftp": 250})
+
+        # only the workouts not pushed by the failed run are pushed again
+        self.assertEqual(self.connection.saved, ["A", "B", "C"])
+        self.assertEqual(result, {"changed": 2, "imported": ["B", "C"]})
+        self.assertEqual([record.workout_name for record in self.workspace.catalog()],
+                         ["Sweet Spot", "Threshold", "A", "B", "C"])
+
+    def test_export(self):
+        directory = os.path.join(self.directory, "export")
+        os.mkdir(directory)
+
+        result = _job_export(self.workspace, {"directory": directory})
+
+        self.assertEqual(result, {"exported": [os.path.join(directory, "1.fit"), os.path.join(directory, "2.fit")]})
+        with open(os.path.join(directory, "2.fit"), "rb") as f:
+            self.assertEqual(f.read(), b"fit 2 2026-10-02 10:00:00.0")
+
+    def test_schedule(self):
+        self.assertEqual(_job_schedule(self.workspace, {"workout": "Threshold", "date": "2026-10-20"}),
+                         {"workout_id": 2, "date": "2026-10-20"})
+        self.assertEqual(_job_schedule(self.workspace, {"workout_id": 1, "date": "2026-10-21"}),
+                         {"workout_id": 1, "date": "2026-10-21"})
+        self.assertEqual(self.connection.scheduled, [(2, "2026-10-20"), (1, "2026-10-21")])
+
+        with self.assertRaises(LookupError):
+            _job_schedule(self.workspace, {"workout": "Missing", "date": "2026-10-20"})
+
+    def test_delete(self):
+        self.assertEqual(_job_delete(self.workspace, {"id": "1"}), {"deleted": 1})
+
+        self.assertEqual(self.connection.deleted, [1])
+        # the catalog is kept up to date without listing it again
+        self.assertEqual([record.workout_id for record in self.workspace.catalog()], [2])
+        self.assertEqual(self.connection.listings, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
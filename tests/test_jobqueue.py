@@ -0,0 +1,233 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+
+from garminworkouts import jobqueue
+
+
+class FakeWorkspace(object):
+    def __init__(self, account):
+        self.account = account
+        self.resets = 0
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        pass
+
+
+class JobQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "queue.db")
+        self.now = 1000.0
+        self.queue = self._open()
+
+    def _open(self, **kwargs):
+        queue = jobqueue.JobQueue(self.filename, clock=lambda: self.now, **kwargs)
+        self.addCleanup(queue.close)
+        return queue
+
+    def _claim_all(self, worker="any worker"):
+        claimed = []
+        while True:
+            job = self.queue.claim(worker)
+            if job is None:
+                return claimed
+            self.queue.complete(job, worker)
+            claimed.append(job)
+
+    def test_claim_by_priority(self):
+        self.queue.enqueue("athlete", "import", {"name": "low"})
+        self.queue.enqueue("athlete", "import", {"name": "high"}, priority=10)
+        self.queue.enqueue("athlete", "import", {"name": "low 2"})
+
+        self.assertEqual([job.payload["name"] for job in self._claim_all()], ["high", "low", "low 2"])
+
+    def test_claim_fairly_between_accounts(self):
+        self.queue.enqueue_many([("coach", "import", {"name": i}, 0) for i in range(3)])
+        self.queue.enqueue_many([("athlete", "import", {"name": i}, 0) for i in range(2)])
+
+        self.assertEqual([(job.account, job.payload["name"]) for job in self._claim_all()],
+                         [("coach", 0), ("athlete", 0), ("coach", 1), ("athlete", 1), ("coach", 2)])
+
+    def test_complete(self):
+        self.queue.enqueue("athlete", "delete", {"id": 1})
+        job = self.queue.claim("any worker")
+
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(self.queue.claim("any worker"))
+        self.assertTrue(self.queue.complete(job, "any worker"))
+        self.assertEqual(self.queue.counts(), {jobqueue.DONE: 1})
+        self.assertEqual(self.queue.pending(), 0)
+
+        self.assertEqual(self.queue.purge(), 1)
+        self.assertEqual(self.queue.counts(), {})
+
+    def test_retry_with_backoff(self):
+        queue = self._open(max_attempts=2, backoff=10)
+        queue.enqueue("athlete", "delete", {"id": 1})
+
+        job = queue.claim("any worker")
+        self.assertTrue(queue.fail(job, "any worker", "any error"))
+        self.assertIsNone(queue.claim("any worker"))
+
+        self.now += 10
+        job = queue.claim("any worker")
+        self.assertEqual(job.attempts, 2)
+        self.assertTrue(queue.fail(job, "any worker", "any error"))
+
+        self.now += 100
+        self.assertIsNone(queue.claim("any worker"))
+        self.assertEqual(queue.counts(), {jobqueue.DEAD: 1})
+        [(dead_job, error)] = queue.dead_letters()
+        self.assertEqual((dead_job.job_id, dead_job.payload, error), (job.job_id, {"id": 1}, "any error"))
+
+        self.assertEqual(queue.retry_dead(), 1)
+        self.assertEqual(queue.claim("any worker").attempts, 1)
+
+    def test_fail_without_retry(self):
+        self.queue.enqueue("athlete", "delete", {"id": 1})
+        job = self.queue.claim("any worker")
+
+        self.queue.fail(job, "any worker", "any error", retry=False)
+
+        self.assertEqual(self.queue.counts(), {jobqueue.DEAD: 1})
+
+    def test_expired_lease(self):
+        queue = self._open(lease_seconds=60, max_attempts=2)
+        queue.enqueue("athlete", "delete", {"id": 1})
+        job = queue.claim("died")
+
+        self.now += 61
+        taken_over = queue.claim("other")
+        self.assertEqual((taken_over.job_id, taken_over.attempts), (job.job_id, 2))
+        # the worker which lost its lease can not overwrite the outcome
+        self.assertFalse(queue.complete(job, "died"))
+
+        self.now += 61
+        self.assertIsNone(queue.claim("any worker"))
+        self.assertEqual([error for _, error in queue.dead_letters()], ["Lease expired after 2 attempts"])
+
+    def test_concurrent_claims(self):
+        self.queue.enqueue_many([("athlete", "delete", {"id": i}, 0) for i in range(200)])
+        claimed = []
+        lock = threading.Lock()
+
+        def drain(worker):
+            # every worker opens its own connection like a worker process does
+            with jobqueue.JobQueue(self.filename) as queue:
+                while True:
+                    job = queue.claim(worker)
+                    if job is None:
+                        return
+                    queue.complete(job, worker)
+                    with lock:
+                        claimed.append(job.payload["id"])
+
+        threads = [threading.Thread(target=drain, args=("worker %d" % i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(claimed), list(range(200)))
+        self.assertEqual(self.queue.counts(), {jobqueue.DONE: 200})
+
+
+class QueueWorkerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.queue = jobqueue.JobQueue(os.path.join(directory.name, "queue.db"), backoff=0)
+        self.addCleanup(self.queue.close)
+        self.done = []
+        self.workspaces = {}
+
+    def _workspace(self, account):
+        workspace = self.workspaces[account] = FakeWorkspace(account)
+        return workspace
+
+    def _delete(self, workspace, params):
+        if params["id"] == "missing":
+            raise LookupError("any error")
+        if params["id"] == "offline":
+            raise requests.ConnectionError("any error")
+        self.done.append((workspace.account, params["id"]))
+
+    def _worker(self):
+        worker = jobqueue.QueueWorker(self.queue, {"delete": self._delete}, self._workspace, "any worker",
+                                      sleep=lambda seconds: None)
+        self.addCleanup(worker.close)
+        return worker
+
+    def test_run_until_empty(self):
+        self.queue.enqueue_many([("coach", "delete", {"id": 1}, 0), ("athlete", "delete", {"id": 2}, 0),
+                                 ("coach", "delete", {"id": 3}, 0)])
+
+        self.assertEqual(self._worker().run(until_empty=True), 3)
+
+        self.assertEqual(self.done, [("coach", 1), ("athlete", 2), ("coach", 3)])
+        self.assertEqual(sorted(self.workspaces), ["athlete", "coach"])
+        self.assertEqual(self.queue.counts(), {jobqueue.DONE: 3})
+
+    def test_failures(self):
+        self.queue.enqueue_many([("coach", "delete", {"id": "missing"}, 0), ("coach", "delete", {"id": "offline"}, 0),
+                                 ("coach", "export", {}, 0)])
+
+        # network errors are retried until the attempts run out, other errors go to the dead letters at once
+        self.assertEqual(self._worker().run(until_empty=True), 7)
+
+        self.assertEqual([(job.payload, job.attempts, error) for job, error in self.queue.dead_letters()], [
+            ({"id": "missing"}, 1, "LookupError: any error"),
+            ({"id": "offline"}, 5, "ConnectionError: any error"),
+            ({}, 1, "Unknown operation 'export'")
+        ])
+        self.assertEqual(self.workspaces["coach"].resets, 5)
+        # every retry lists the catalog again
+        self.assertEqual(self.workspaces["coach"].refreshes, 4)
+
+    def test_renew_lease_of_running_job(self):
+        queue = jobqueue.JobQueue(self.queue.filename, lease_seconds=0.3)
+        self.addCleanup(queue.close)
+        queue.enqueue("coach", "import", {})
+        taken_over = []
+
+        def slow_import(workspace, params):
+            time.sleep(1)
+            taken_over.append(self.queue.claim("other worker"))
+
+        worker = jobqueue.QueueWorker(queue, {"import": slow_import}, self._workspace, "any worker")
+        self.addCleanup(worker.close)
+
+        self.assertIsNotNone(worker.run_once())
+        self.assertEqual(taken_over, [None])
+        self.assertEqual(queue.counts(), {jobqueue.DONE: 1})
+
+    def test_is_retryable(self):
+        def http_error(status):
+            response = requests.Response()
+            response.status_code = status
+            return requests.HTTPError(response=response)
+
+        self.assertTrue(jobqueue.is_retryable(http_error(429)))
+        self.assertTrue(jobqueue.is_retryable(http_error(503)))
+        self.assertFalse(jobqueue.is_retryable(http_error(404)))
+        self.assertTrue(jobqueue.is_retryable(requests.Timeout()))
+        self.assertFalse(jobqueue.is_retryable(ValueError()))
+
+
+if __name__ == '__main__':
+    unittest.main()
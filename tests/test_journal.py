@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from garminworkouts.journal import ImportJournal
+
+
+class ImportJournalTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "import.jsonl")
+
+    def test_resume_skips_done_operations(self):
+        with ImportJournal(self.filename) as journal:
+            with journal.operation("import", "workout a"):
+                pass
+            with self.assertRaises(RuntimeError):
+                with journal.operation("import", "workout b"):
+                    raise RuntimeError("any error")
+
+        with ImportJournal(self.filename, resume=True) as journal:
+            self.assertTrue(journal.is_done("import", "workout a"))
+            self.assertFalse(journal.is_done("import", "workout b"))
+            self.assertEqual(journal.pending(), [("import", "workout b")])
+
+    def test_resume_after_torn_write(self):
+        with ImportJournal(self.filename) as journal:
+            with journal.operation("import", "workout a"):
+                pass
+        with open(self.filename, "a") as f:
+            f.write('{"operation": "imp')
+
+        with ImportJournal(self.filename, resume=True) as journal:
+            with journal.operation("import", "workout b"):
+                pass
+
+        with ImportJournal(self.filename, resume=True) as journal:
+            self.assertTrue(journal.is_done("import", "workout a"))
+            self.assertTrue(journal.is_done("import", "workout b"))
+
+    def test_start_without_resume_truncates_journal(self):
+        with ImportJournal(self.filename) as journal:
+            with journal.operation("import", "workout a"):
+                pass
+
+        with ImportJournal(self.filename) as journal:
+            self.assertFalse(journal.is_done("import", "workout a"))
+
+    def test_disabled_journal(self):
+        journal = ImportJournal()
+        with journal.operation("import", "workout a"):
+            pass
+        self.assertTrue(journal.is_done("import", "workout a"))
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import shlex
+import tempfile
+import unittest
+
+from garminworkouts.__main__ import _check_arguments, _parser, _unwatched_directories
+
+_README = os.path.join(os.path.dirname(os.path.dirname(__file__)), "README.md")
+_PLACEHOLDERS = {"[YOUR_FTP]": "250", "[WORKOUT_ID]": "188952654", "[DATE]": "2026-10-20"}
+# output directories must exist and be writeable when arguments are parsed
+_DIRECTORIES = {"/mnt/GARMIN/NewFiles", "bundles", "decoded_workouts"}
+
+
+def _documented_commands(directory):
+    with open(_README) as f:
+        for line in f:
+            if line.startswith("$ python -m garminworkouts"):
+                for placeholder, value in _PLACEHOLDERS.items():
+                    line = line.replace(placeholder, value)
+                argv = [directory if arg in _DIRECTORIES else arg for arg in shlex.split(line)[4:]]
+                yield argv[:argv.index(">")] if ">" in argv else argv
+
+
+class MainTestCase(unittest.TestCase):
+
+    def test_documented_commands(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        commands = list(_documented_commands(directory.name))
+        self.assertGreater(len(commands), 30)
+
+        parser = _parser()
+        for argv in commands:
+            with self.subTest(argv=argv):
+                args = parser.parse_args(argv)
+                _check_arguments(parser, args)
+                self.assertTrue(callable(args.func))
+
+    def test_unwatched_directories(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name in ("workouts/inc", "inc/nested", "other"):
+            os.makedirs(os.path.join(directory.name, name))
+        watched = [os.path.join(directory.name, "workouts")]
+        directories = {os.path.join(directory.name, name) for name in ("workouts/inc", "inc/nested", "inc", "gone")}
+
+        unwatched = _unwatched_directories(directories, watched)
+
+        self.assertEqual(unwatched, [os.path.join(directory.name, "inc")])
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from garminworkouts.manifest import BuildManifest
+
+
+class BuildManifestTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        os.mkdir(os.path.join(self.directory, "inc"))
+
+        self.warmup = self._write("inc/warmup-short.yaml", '{ power: 50, duration: "5:00" }\n')
+        self.cooldown = self._write("inc/cooldown.yaml", '{ power: 40, duration: "5:00" }\n')
+        self.with_warmup = self._write("a.yaml", 'name: "A"\nsteps:\n  - !include inc/warmup-short.yaml\n'
+                                                 '  - !include inc/cooldown.yaml\n')
+        self.without_warmup = self._write("b.yaml", 'name: "B"\nsteps:\n  - !include inc/cooldown.yaml\n')
+        self.sources = [self.with_warmup, self.without_warmup]
+        self.filename = os.path.join(self.directory, "manifest.json")
+
+    def _write(self, name, content):
+        filename = os.path.join(self.directory, name)
+        with open(filename, "w") as f:
+            f.write(content)
+        return os.path.normpath(filename)
+
+    def _import_all(self, parameters):
+        manifest = BuildManifest(self.filename)
+        changed = list(manifest.changed_sources(self.sources, parameters))
+        for source, config, include_graph in changed:
+            manifest.record(source, include_graph, parameters, {config["name"]: "hash-" + config["name"]})
+        manifest.save()
+        return [source for source, _, _ in changed]
+
+    def test_changed_sources(self):
+        parameters = {"ftp": 250}
+        self.assertEqual(self._import_all(parameters), self.sources)
+        self.assertEqual(self._import_all(parameters), [])
+
+        self._write("inc/warmup-short.yaml", '{ power: 55, duration: "5:00" }\n')
+        self.assertEqual(self._import_all(parameters), [self.with_warmup])
+
+        self._write("inc/cooldown.yaml", '{ power: 45, duration: "5:00" }\n')
+        self.assertEqual(self._import_all(parameters), self.sources)
+
+        self.assertEqual(self._import_all({"ftp": 260}), self.sources)
+
+    def test_dependents_and_payload_hashes(self):
+        self._import_all(None)
+
+        manifest = BuildManifest(self.filename)
+
+        self.assertEqual(manifest.dependents(self.warmup), [self.with_warmup])
+        self.assertEqual(manifest.dependents(self.cooldown), self.sources)
+        self.assertEqual(manifest.payload_hash("A"), "hash-A")
+        self.assertIsNone(manifest.payload_hash("C"))
+
+    def test_directories(self):
+        self._import_all(None)
+
+        self.assertEqual(BuildManifest(self.filename).directories(),
+                         {os.path.normpath(self.directory), os.path.dirname(self.warmup)})
+
+    def test_without_file(self):
+        manifest = BuildManifest()
+
+        self.assertEqual(len(list(manifest.changed_sources(self.sources))), 2)
+        manifest.save()
+        self.assertFalse(os.path.exists(self.filename))
+
+
+if __name__ == '__main__':
+    unittest.main()
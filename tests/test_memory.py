@@ -0,0 +1,76 @@
+import os
+import unittest
+
+from garminworkouts import compiler
+from garminworkouts.models.workout import Workout
+from garminworkouts.models.workoutindex import WorkoutIndex
+from garminworkouts.models.workoutrecord import WorkoutRecord
+from garminworkouts.utils.memprofile import MemoryProfiler
+
+MIB = 1024 * 1024
+
+
+# peaks depend on the Python version and the allocator, CI checks the ceilings on its Python 3.9 job only
+@unittest.skipUnless(os.environ.get("MEMORY_BUDGET_TESTS"), "set MEMORY_BUDGET_TESTS=1 to check memory ceilings")
+class MemoryBudgetTestCase(unittest.TestCase):
+    # ceilings leave about 40% headroom over the peaks measured on Python 3.9 and 3.11, going over them is a regression
+    _LIBRARY_SIZE = 10000
+
+    @staticmethod
+    def _workout_config(i):
+        interval = [
+            {"type": "interval", "duration": "5:00", "power": str(100 + i % 20)},
+            {"type": "recovery", "duration": "3:00", "power": "55"}
+        ]
+        return {
+            "name": "Workout %05d" % i,
+            "id": "workout-%d" % i,
+            "steps": [
+                {"type": "warmup", "duration": "10:00", "power": "50"},
+                [interval] * 3,
+                {"type": "cooldown", "duration": "10:00", "power": "50"}
+            ]
+        }
+
+    def _peak(self, fn):
+        with MemoryProfiler(top=0) as profiler:
+            with profiler.phase(self.id()) as report:
+                result = fn()
+        return report.peak - report.start, result
+
+    def test_compile_library(self):
+        workouts = (("library.yaml", Workout(MemoryBudgetTestCase._workout_config(i), 250, 0.05))
+                    for i in range(MemoryBudgetTestCase._LIBRARY_SIZE))
+
+        # only payload bytes of compiled workouts are kept, not the workouts themselves
+        peak, compiled = self._peak(lambda: compiler.compile_workouts(workouts))
+
+        self.assertEqual(len(compiled), MemoryBudgetTestCase._LIBRARY_SIZE)
+        self.assertLess(peak, 32 * MIB)
+
+    def test_index_listing(self):
+        listing = ({"workoutId": i, "workoutName": "Workout %05d" % i, "ownerId": 1,
+                    "description": "FTP 250, TSS 60, NP 200, IF 0.80 [gw:workout-%d]" % i,
+                    "updateDate": "2020-02-11T14:37:56.0", "workoutSegments": [], "createdDate": "2020-02-11"}
+                   for i in range(MemoryBudgetTestCase._LIBRARY_SIZE))
+
+        peak, index = self._peak(lambda: WorkoutIndex(WorkoutRecord.from_json(workout) for workout in listing))
+
+        self.assertEqual(len(index), MemoryBudgetTestCase._LIBRARY_SIZE)
+        self.assertLess(peak, 8 * MIB)
+
+    def test_long_workout(self):
+        # 5000 one minute steps, the description is computed from a 300000 seconds long power series
+        config = {
+            "name": "Long workout",
+            "steps": [{"type": "interval", "duration": "1:00", "power": str(50 + i % 100)} for i in range(5000)]
+        }
+
+        peak, payload = self._peak(lambda: Workout(config, 250, 0.05).create_workout())
+
+        self.assertEqual(len(payload["workoutSegments"][0]["workoutSteps"]), 5000)
+        self.assertLess(peak, 16 * MIB)
+
+
+if __name__ == '__main__':
+    unittest.main()
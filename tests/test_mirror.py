@@ -0,0 +1,62 @@
+import io
+import os
+import tempfile
+import unittest
+
+from garminworkouts import mirror
+from garminworkouts.models.workoutrecord import WorkoutRecord
+from garminworkouts.utils import jsoncodec
+
+
+class FakeConnection(object):
+    def get_workout(self, workout_id):
+        return {"workoutId": workout_id, "workoutName": "Workout %s" % workout_id}
+
+
+class MirrorTestCase(unittest.TestCase):
+    _RECORDS = [
+        WorkoutRecord(1, "Sweet Spot 1", update_date="2023-01-01 10:00:00.0"),
+        WorkoutRecord(2, "Sweet Spot 2", update_date="2023-02-01 10:00:00.0"),
+        WorkoutRecord(3, "Threshold", update_date="2023-03-01 10:00:00.0"),
+    ]
+
+    def test_select_records(self):
+        self.assertEqual([r.workout_id for r in mirror.select_records(MirrorTestCase._RECORDS, ["3"])], [3])
+        self.assertEqual([r.workout_id for r in mirror.select_records(MirrorTestCase._RECORDS, [], "Sweet*")], [1, 2])
+        self.assertEqual(len(list(mirror.select_records(MirrorTestCase._RECORDS, select_all=True))), 3)
+
+    def test_changed_records(self):
+        state = {"1": "2023-01-01 10:00:00.0", "2": "2022-12-01 10:00:00.0"}
+
+        changed = mirror.changed_records(MirrorTestCase._RECORDS, state)
+
+        self.assertEqual([r.workout_id for r in changed], [2, 3])
+
+    def test_fetch_workouts_in_order(self):
+        workout_ids = list(range(20))
+
+        workouts = list(mirror.fetch_workouts(FakeConnection(), workout_ids, workers=3))
+
+        self.assertEqual([w["workoutId"] for w in workouts], workout_ids)
+
+    def test_write_ndjson(self):
+        f = io.BytesIO()
+
+        count = mirror.write_ndjson(mirror.fetch_workouts(FakeConnection(), [1, 2]), f)
+
+        self.assertEqual(count, 2)
+        self.assertEqual([jsoncodec.loads(line) for line in f.getvalue().splitlines()],
+                         [{"workoutId": 1, "workoutName": "Workout 1"}, {"workoutId": 2, "workoutName": "Workout 2"}])
+
+    def test_state_round_trip(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        filename = os.path.join(directory.name, "state.json")
+
+        self.assertEqual(mirror.read_state(filename), {})
+        mirror.write_state(filename, {"1": "2023-01-01 10:00:00.0"})
+        self.assertEqual(mirror.read_state(filename), {"1": "2023-01-01 10:00:00.0"})
+
+
+if __name__ == '__main__':
+    unittest.main()
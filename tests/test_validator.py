@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from garminworkouts import validator
+
+
+class ValidatorTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _write(self, name, content):
+        filename = os.path.join(self.directory, name)
+        with open(filename, "w") as f:
+            f.write(content)
+        return filename
+
+    def test_valid_files(self):
+        cycling = self._write("cycling.yaml", 'name: "Any"\nsteps:\n  - { power: 50, duration: "10:00" }\n')
+        running = self._write("running.yaml", '- name: "Run"\n  steps:\n    - { type: "run", target: EASY_PACE }\n')
+        target_pace = {"EASY_PACE": {"type": "pace", "min": "5:00", "max": "6:00"}}
+
+        results = validator.validate_files([cycling, running], target_pace=target_pace)
+
+        self.assertEqual([(result["workouts"], result["errors"]) for result in results], [(1, []), (1, [])])
+
+    def test_invalid_files(self):
+        interval = '  - { power: 50, duration: "1:00" }\n  - { power: 60, duration: "1:00" }\n'
+        files = [
+            self._write("missing_include.yaml", 'name: "Any"\nsteps:\n  - !include inc/missing.yaml\n'),
+            self._write("no_steps.yaml", 'name: "Any"\n'),
+            self._write("duration.yaml", 'name: "Any"\nsteps:\n  - { power: 50, duration: "99:00" }\n'),
+            self._write("pace.yaml", 'name: "Run"\nsteps:\n  - { type: "run", target: UNKNOWN_PACE }\n'),
+            self._write("too_long.yaml", 'name: "Any"\nsteps:\n' + interval * 26),
+            self._write("id.yaml", 'name: "Any"\nid: "sweet spot]"\nsteps:\n  - { power: 50 }\n'),
+        ]
+
+        results = validator.validate_files(files, target_pace={})
+
+        self.assertEqual([len(result["errors"]) for result in results], [1, 1, 1, 1, 1, 1])
+        self.assertIn("FileNotFoundError", results[0]["errors"][0]["message"])
+        self.assertEqual(results[1]["errors"][0], {"workout": "Any", "message": "Workout steps are missing"})
+        self.assertIn("Minutes must be between 0 and 59", results[2]["errors"][0]["message"])
+        self.assertIn("UNKNOWN_PACE", results[3]["errors"][0]["message"])
+        self.assertIn("52 steps", results[4]["errors"][0]["message"])
+        self.assertIn("'sweet spot]'", results[5]["errors"][0]["message"])
+
+    def test_validate_in_processes(self):
+        files = [self._write("%d.yaml" % i, 'name: "W%d"\nsteps:\n  - { power: 50 }\n' % i) for i in range(5)]
+
+        results = validator.validate_files(files, processes=2)
+
+        self.assertEqual([result["file"] for result in results], files)
+
+    def test_shard_files(self):
+        files = ["sample_workouts/%d.yaml" % i for i in range(100)]
+
+        shards = [validator.shard_files(files, i, 4) for i in range(4)]
+
+        self.assertEqual(sorted(sum(shards, [])), sorted(files))
+        self.assertEqual(validator.shard_files(files[:50], 1, 4), [f for f in shards[1] if f in files[:50]])
+        self.assertRaises(ValueError, validator.shard_files, files, 4, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from garminworkouts import watcher
+
+
+class FakeWatcher(object):
+    def __init__(self, events):
+        self.events = list(events)
+        self.timeouts = []
+
+    def poll(self, timeout=None):
+        self.timeouts.append(timeout)
+        return self.events.pop(0) if self.events else set()
+
+
+class WatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _write(self, name, content):
+        filename = os.path.join(self.directory, name)
+        with open(filename, "w") as f:
+            f.write(content)
+        return filename
+
+    def test_polling_watcher(self):
+        filename = self._write("workout.yaml", "name: A\n")
+        polling_watcher = watcher.PollingWatcher([self.directory], interval=0.01)
+
+        self.assertEqual(polling_watcher.poll(0.05), set())
+
+        os.mkdir(os.path.join(self.directory, "inc"))
+        included = self._write("inc/warmup.yaml", "{ power: 50 }\n")
+        self.assertEqual(polling_watcher.poll(0.05), {included})
+
+        os.remove(filename)
+        self.assertEqual(polling_watcher.poll(0.05), {filename})
+
+    def test_polling_watcher_add_directories(self):
+        os.mkdir(os.path.join(self.directory, "workouts"))
+        os.mkdir(os.path.join(self.directory, "inc"))
+        included = self._write("inc/warmup.yaml", "{ power: 50 }\n")
+        polling_watcher = watcher.PollingWatcher([os.path.join(self.directory, "workouts")], interval=0.01)
+
+        polling_watcher.add_directories([os.path.join(self.directory, "inc")])
+        self.assertEqual(polling_watcher.poll(0.05), set())
+
+        self._write("inc/warmup.yaml", "{ power: 55, duration: '5:00' }\n")
+        self.assertEqual(polling_watcher.poll(0.05), {included})
+
+    def test_create_watcher(self):
+        created = watcher.create_watcher([self.directory])
+        self.addCleanup(created.close)
+
+        filename = self._write("workout.yaml", "name: A\n")
+
+        self.assertIn(filename, created.poll(5))
+
+    def test_wait_for_changes_debounces(self):
+        fake_watcher = FakeWatcher([{"a.yaml.swp"}, {"a.yaml"}, {"b.yaml", "b.yaml~"}, {"inc/c.yml"}])
+
+        changed = watcher.wait_for_changes(fake_watcher, debounce=0.25)
+
+        self.assertEqual(changed, {"a.yaml", "b.yaml", "inc/c.yml"})
+        self.assertEqual(fake_watcher.timeouts, [None, None, 0.25, 0.25, 0.25])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -47,6 +47,37 @@ class FunctionalTestCase(unittest.TestCase):
         value = {"k1": "v1", "k2": {"k3": "v3", "k4": []}}
         self.assertEqual(functional.filter_empty(value), {"k1": "v1", "k2": {"k3": "v3"}})
 
+    def test_filter_empty_keeps_emptied_containers(self):
+        value = {"k1": {"k2": None}, "k3": [[], 0, ""]}
+        self.assertEqual(functional.filter_empty(value), {"k1": {}, "k3": [0, ""]})
+
+    def test_filter_empty_does_not_modify_value(self):
+        value = {"k1": "v1", "k2": [{"k3": None}]}
+        functional.filter_empty(value)
+        self.assertEqual(value, {"k1": "v1", "k2": [{"k3": None}]})
+
+    def test_filter_empty_in_place(self):
+        value = {"k1": "v1", "k2": [{"k3": None, "k4": "v4"}, None], "k5": {}}
+        filtered = functional.filter_empty(value, in_place=True)
+        self.assertIs(filtered, value)
+        self.assertEqual(value, {"k1": "v1", "k2": [{"k4": "v4"}]})
+
+    def test_filter_empty_deeply_nested(self):
+        depth = 10000
+        value = [1]
+        for _ in range(depth):
+            value = [value, None]
+        for in_place in [False, True]:
+            with self.subTest(in_place=in_place):
+                filtered = functional.filter_empty(value, in_place)
+                for _ in range(depth):
+                    filtered = filtered[0]
+                self.assertEqual(filtered, [1])
+
+    def test_iter_filter_empty(self):
+        values = [{"k1": None}, {"k2": "v2"}]
+        self.assertEqual(list(functional.iter_filter_empty(values)), [{}, {"k2": "v2"}])
+
 
 if __name__ == '__main__':
     unittest.main()
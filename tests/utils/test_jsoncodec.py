@@ -0,0 +1,46 @@
+import importlib
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from garminworkouts.utils import jsoncodec
+
+
+class JsonCodecTestCase(unittest.TestCase):
+    def test_dumps_loads(self):
+        value = {"workoutName": "Łódź 5x4", "steps": [1, 2.5, None, True]}
+        self.assertEqual(jsoncodec.loads(jsoncodec.dumps(value)), value)
+
+    def test_dumps_keeps_key_order(self):
+        self.assertEqual(jsoncodec.dumps({"b": 1, "a": 2}), b'{"b":1,"a":2}')
+
+    def test_canonical_dumps_sorts_keys(self):
+        self.assertEqual(jsoncodec.canonical_dumps({"b": 1, "a": {"d": 1, "c": 2}}), b'{"a":{"c":2,"d":1},"b":1}')
+
+    def test_content_hash(self):
+        value = {"b": 1, "a": 2}
+        self.assertEqual(jsoncodec.content_hash(value), jsoncodec.content_hash({"a": 2, "b": 1}))
+        self.assertEqual(jsoncodec.content_hash(value), jsoncodec.content_hash(jsoncodec.canonical_dumps(value)))
+
+    def test_canonical_dumps_is_identical_for_every_backend(self):
+        value = {"workoutName": "Łódź 5x4 / tempo", "steps": [0.1, 1e-7, 2.5, np.float64(0.3), np.int64(7)],
+                 "targets": np.array([1.05, 0.95]), "description": None, "b": True}
+        outputs = {}
+        for backend in ("orjson", "ujson", "json"):
+            # every backend before this one is hidden, the stdlib fallback is always available
+            hidden = {name: None for name in ("orjson", "ujson")[:("orjson", "ujson", "json").index(backend)]}
+            with mock.patch.dict(sys.modules, hidden):
+                codec = importlib.reload(jsoncodec)
+                if codec.BACKEND == backend:
+                    outputs[backend] = codec.canonical_dumps(value)
+        importlib.reload(jsoncodec)
+
+        self.assertIn("json", outputs)
+        self.assertEqual(len(set(outputs.values())), 1, outputs)
+        self.assertEqual(jsoncodec.loads(outputs["json"])["targets"], [1.05, 0.95])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch
+
+from garminworkouts.utils import memprofile
+from garminworkouts.utils.memprofile import MemoryProfiler
+
+
+class MemoryProfilerTestCase(unittest.TestCase):
+
+    def test_phase_without_tracing(self):
+        profiler = MemoryProfiler()
+
+        with profiler.phase("any phase") as report:
+            self.assertIsNone(report)
+
+        self.assertEqual(profiler.phases, [])
+        self.assertEqual(profiler.format_report(), "")
+
+    def test_phase(self):
+        with MemoryProfiler(top=3) as profiler:
+            with profiler.phase("allocate"):
+                retained = [bytearray(1024) for _ in range(1000)]
+                transient = bytearray(4 * 1024 * 1024)
+                del transient
+
+        report, = profiler.phases
+        self.assertEqual(report.name, "allocate")
+        self.assertGreaterEqual(report.peak - report.start, 5 * 1024 * 1024)
+        self.assertGreaterEqual(report.retained, 1000 * 1024)
+        self.assertLess(report.retained, 2 * 1024 * 1024)
+        self.assertLessEqual(len(report.top_sites), 3)
+        self.assertEqual(report.top_sites[0].traceback[0].filename, __file__)
+        self.assertEqual(len(retained), 1000)
+
+    def test_nested_phases(self):
+        with MemoryProfiler() as profiler:
+            with profiler.phase("outer"):
+                with profiler.phase("inner"):
+                    transient = bytearray(4 * 1024 * 1024)
+                    del transient
+
+        inner, outer = profiler.phases
+        self.assertEqual((inner.name, outer.name), ("inner", "outer"))
+        # the peak of a nested phase is also the peak of the enclosing one
+        self.assertGreaterEqual(inner.peak - inner.start, 4 * 1024 * 1024)
+        self.assertGreaterEqual(outer.peak, inner.peak)
+
+    def test_without_reset_peak(self):
+        # Python 3.8 has no tracemalloc.reset_peak(), a new overall peak is still attributed to its phase
+        with patch.object(memprofile, "_reset_peak", None), MemoryProfiler() as profiler:
+            with profiler.phase("small"):
+                small = bytearray(1024 * 1024)
+                del small
+            with profiler.phase("large"):
+                large = bytearray(8 * 1024 * 1024)
+                del large
+
+        small, large = profiler.phases
+        self.assertGreaterEqual(small.peak - small.start, 1024 * 1024)
+        self.assertGreaterEqual(large.peak - large.start, 8 * 1024 * 1024)
+
+    def test_format_report(self):
+        with MemoryProfiler(top=1) as profiler:
+            with profiler.phase("allocate"):
+                retained = bytearray(2 * 1024 * 1024)
+
+        lines = profiler.format_report().splitlines()
+        self.assertRegex(lines[0], r"^allocate: peak \d+\.\d MiB, retained \+2\.\d MiB$")
+        self.assertRegex(lines[1], r"^  .*test_memprofile\.py:\d+: \+2\.\d MiB in \+\d+ blocks  retained = ")
+        self.assertEqual(len(retained), 2 * 1024 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from garminworkouts.utils.ratelimit import RateLimiter
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def _clock(self):
+        return self.now
+
+    def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+    def test_acquire(self):
+        limiter = RateLimiter(2.0, burst=2, clock=self._clock, sleep=self._sleep)
+
+        waits = [limiter.acquire() for _ in range(4)]
+
+        self.assertEqual(waits, [0, 0, 0.5, 1.0])
+        self.assertEqual(self.sleeps, [0.5, 1.0])
+
+    def test_refill(self):
+        limiter = RateLimiter(1.0, clock=self._clock, sleep=self._sleep)
+
+        self.assertEqual(limiter.acquire(), 0)
+        self.now = 10.0
+        self.assertEqual(limiter.acquire(), 0)
+        self.assertEqual(limiter.acquire(), 1.0)
+
+    def test_invalid_rate(self):
+        self.assertRaises(ValueError, RateLimiter, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
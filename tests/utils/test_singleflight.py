@@ -0,0 +1,103 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from garminworkouts.utils import singleflight
+from garminworkouts.utils.singleflight import SingleFlight, file_lock
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def _count_followers(self):
+        # every caller joining a running call waits for its done event, the wait is counted before it blocks
+        followers = threading.Semaphore(0)
+
+        class Done(threading.Event):
+            def wait(self, timeout=None):
+                followers.release()
+                return super(Done, self).wait(timeout)
+
+        call_class = singleflight._Call
+
+        def create_call():
+            call = call_class()
+            call.done = Done()
+            return call
+
+        patcher = patch.object(singleflight, "_Call", create_call)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return followers
+
+    def _wait_for_followers(self, followers, count):
+        for _ in range(count):
+            self.assertTrue(followers.acquire(timeout=5))
+
+    def _run_concurrently(self, single_flight, fn, count=5):
+        results = []
+        errors = []
+        started = threading.Barrier(count)
+
+        def worker():
+            started.wait()
+            try:
+                results.append(single_flight.do("any-key", fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_do_shares_result(self):
+        single_flight = SingleFlight()
+        followers = self._count_followers()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            self._wait_for_followers(followers, 4)
+            return "any-result"
+
+        results, errors = self._run_concurrently(single_flight, fn)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(results), [("any-result", False)] + [("any-result", True)] * 4)
+
+    def test_do_shares_error(self):
+        single_flight = SingleFlight()
+        followers = self._count_followers()
+
+        def fn():
+            self._wait_for_followers(followers, 4)
+            raise IOError("any error")
+
+        results, errors = self._run_concurrently(single_flight, fn)
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 5)
+
+    def test_do_runs_again_when_done(self):
+        single_flight = SingleFlight()
+
+        self.assertEqual(single_flight.do("any-key", lambda: 1), (1, False))
+        self.assertEqual(single_flight.do("any-key", lambda: 2), (2, False))
+
+    def test_file_lock(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        filename = os.path.join(directory.name, "cookies.lock")
+
+        with file_lock(filename):
+            self.assertTrue(os.path.exists(filename))
+        with file_lock(None):
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()